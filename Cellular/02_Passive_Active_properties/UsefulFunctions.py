@@ -3,8 +3,11 @@ from neuron import h
 import matplotlib.pyplot as plt
 import neurom as nm
 from neurom import view
-from hoc2swc import neuron2swc
+from hoc2swc import neuron2swc  # also finds Cellular/shared when not downloaded by the notebook
 import numpy as np
+import instrumentation
+from checkpoint import Checkpoint
+from early_stop import run_until
 
 import ipywidgets as widgets
 from IPython.display import display, clear_output
@@ -13,6 +16,7 @@ from IPython.display import display, clear_output
 simulations_records = []  # stimulations
 voltage_records = []  # voltage recordings
 current_records = []  # current recordings
+last_stop = {}  # end time and stop reason of the last init_run
 
 
 def reset():
@@ -45,18 +49,38 @@ def record_current(stimulation_dict):
     current_records.append({"vec": vec, "loc": stimulation_dict["loc"]})
 
 
-def init_run(v_i, t_stop):
-    """Initialize and run a simulation"""
-    # Record time
-    rec_t = h.Vector()
-    rec_t.record(h._ref_t)
+@instrumentation.instrument()
+def init_run(v_i, t_stop, checkpoint=None, stop=()):
+    """
+    Initialize and run a simulation. With a checkpoint.Checkpoint saved at rest before
+    the first stimulus, the simulation continues from it instead of from t=0.
+    early_stop conditions in stop can end the run before t_stop, see last_stop.
+    """
     # Record current for all stimuli
     for stimulation_dict in simulations_records:
         record_current(stimulation_dict)
+
+    if checkpoint is not None:
+        first_stim = min(d["stim"].delay for d in simulations_records)
+        if not checkpoint.at_rest or checkpoint.v_init != v_i or first_stim < checkpoint.t_checkpoint:
+            raise ValueError("The checkpoint must be saved at rest from v_i, before the first stimulus")
+        # Before the checkpoint the cell sat at v_i and no current was injected
+        rest_records = [(d["vec"], v_i) for d in voltage_records] + [(d["vec"], 0) for d in current_records]
+        with instrumentation.span("simulation"):
+            rec_t = checkpoint.run(t_stop, rest_records, stop)
+            instrumentation.add("neuron_steps", round((h.t - checkpoint.t_checkpoint) / h.dt))
+        last_stop.update(checkpoint.stop)
+        return rec_t
+
+    # Record time
+    rec_t = h.Vector()
+    rec_t.record(h._ref_t)
     # Setup simulation and run
     h.load_file("stdrun.hoc")
-    h.finitialize(v_i)  # initial voltage
-    h.continuerun(t_stop)  # final time
+    with instrumentation.span("simulation"):
+        h.finitialize(v_i)  # initial voltage
+        last_stop.update(run_until(t_stop, stop))  # final time
+        instrumentation.add("neuron_steps", round(h.t / h.dt))
     return rec_t
 
 
@@ -89,7 +113,17 @@ def plot_morphology(fname="cell_01"):
     neuron1 = nm.load_morphology(fname)
     view.plot_morph(neuron1)
 
-def chage_passive_prop(cell):
+def grid_location(cell, site):
+    """Name of a recording or stimulation site of a PassiveGrid protocol, as str(segment)"""
+    return str(getattr(cell, site["section"])(site["x"]))
+
+
+def chage_passive_prop(cell, grid=None):
+    """
+    Widget to change the dendrite passive properties of cell and simulate the response.
+    If a passive_sweep.PassiveGrid over dend.diam, dend.Ra and dend.cm is given, values
+    inside the grid are interpolated from its precomputed traces instead of simulated.
+    """
     reset()
 
     # --- Layout settings ---
@@ -107,8 +141,15 @@ def chage_passive_prop(cell):
     # --- Output area for plots ---
     output = widgets.Output()
 
+    # State at the onset of the first pulse, shared by every click, as long as the
+    # model is found at rest before it
+    start = None
+    at_rest = True
+
     # --- What happens when you click the button ---
+    @instrumentation.instrument("chage_passive_prop.click_button")
     def click_button(b):
+        nonlocal start, at_rest
         with output:
             clear_output(wait=True)  # clear old plots
 
@@ -118,6 +159,22 @@ def chage_passive_prop(cell):
             cell.dend.cm = var3_box.value
 
             print(f"Updated parameters:\n  diam={cell.dend.diam}, Ra={cell.dend.Ra}, cm={cell.dend.cm}")
+
+            params = {"dend.diam": var1_box.value, "dend.Ra": var2_box.value, "dend.cm": var3_box.value}
+            use_grid = grid is not None and type(cell).__name__ == grid.model and sorted(grid.names) == sorted(params)
+            if use_grid and grid.contains(params):
+                print("Interpolating from the precomputed grid...")
+                t = grid.time
+                voltages = [{"vec": grid.interpolate(params), "loc": grid_location(cell, grid.protocol["record"])}]
+                currents = [
+                    {"vec": stim["amplitude"] * ((t >= stim["delay"]) & (t < stim["delay"] + stim["duration"])),
+                     "loc": grid_location(cell, stim)}
+                    for stim in grid.protocol["stimuli"]
+                ]
+                tvi_plots(t, voltages, currents, vmax=0)
+                plt.show()
+                return
+
             print("Running simulation...")
 
             # Setup new simulation
@@ -126,12 +183,20 @@ def chage_passive_prop(cell):
             locations = np.linspace(0, 1, 3)
             for p in zip(locations, delays):
                 iclamp(cell.dend(p[0]), amplitude=0.4, delay=p[1], duration=50)
-            record_voltage(cell.soma(0.5))
 
             # Run and plot results
             v_init = -70
             t_stop = 700
-            t = init_run(v_init, t_stop)
+            # At rest the pre-stimulus state does not depend on diam, Ra or cm, so the
+            # checkpoint only has to be redone when cells were created or deleted
+            if at_rest and (start is None or not start.compatible()):
+                start = Checkpoint(delays.min(), v_init)
+                # Otherwise the pre-stimulus state depends on the parameters: every
+                # later click runs from t=0 without saving a checkpoint first
+                at_rest = start.at_rest
+            # Recorded after the checkpoint, which keeps the Vectors of its save alive
+            record_voltage(cell.soma(0.5))
+            t = init_run(v_init, t_stop, start if at_rest else None)
             tvi_plots(t, voltage_records, current_records, vmax=0)
             plt.show()
 
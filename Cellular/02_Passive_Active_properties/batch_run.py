@@ -0,0 +1,64 @@
+# Many independent variants of a cell simulated together in one NEURON run
+from neuron import h
+import numpy as np
+
+from cell_spec import build, vary
+
+
+def run_population(spec, changes_list, stimuli_list=None, record=(("soma", 0.5),),
+                   v_init=-70, t_stop=700, dt=0.025, threads=1):
+    """
+    Build one copy of the cell per variant in the same model, integrate them all in a
+    single finitialize/continuerun and split the recordings back per variant. The
+    copies are not connected, so every variant behaves as if simulated alone.
+
+    Parameters
+    ----------
+    spec : cell spec (see cell_spec), e.g. passive_neuron_1d_3d.PASSIVE_1D_3D
+    changes_list : one dictionary of changes per variant, as taken by cell_spec.vary
+    stimuli_list : one list of stimuli per variant, each stimulus a dictionary with
+                   section, x, delay, amplitude and duration; or a single list of
+                   stimuli given to every variant
+    record : (section, x) sites recorded in every variant
+    v_init, t_stop, dt : initial voltage [mV], duration and time step [ms]
+    threads : number of NEURON threads the variants are distributed over
+
+    Returns
+    -------
+    time : 1D array [ms]
+    voltages : array (variants x sites x samples) [mV]
+    """
+    n_variants = len(changes_list)
+    if stimuli_list is None:
+        stimuli_list = [[]] * n_variants
+    elif stimuli_list and isinstance(stimuli_list[0], dict):
+        stimuli_list = [stimuli_list] * n_variants
+    if len(stimuli_list) != n_variants:
+        raise ValueError(f"{len(stimuli_list)} stimulus lists for {n_variants} variants")
+
+    cells, stims, records = [], [], []
+    for n, (changes, stimuli) in enumerate(zip(changes_list, stimuli_list)):
+        cell = build(vary(spec, changes), prefix=f"variant_{n}_")
+        for stim in stimuli:
+            iclamp = h.IClamp(getattr(cell, stim["section"])(stim["x"]))
+            iclamp.delay = stim["delay"]
+            iclamp.amp = stim["amplitude"]
+            iclamp.dur = stim["duration"]
+            stims.append(iclamp)
+        records.append([h.Vector().record(getattr(cell, sec)(x)._ref_v) for sec, x in record])
+        cells.append(cell)
+    rec_t = h.Vector().record(h._ref_t)
+
+    pc = h.ParallelContext()
+    pc.nthread(threads)
+    try:
+        h.load_file("stdrun.hoc")
+        h.dt = dt
+        h.steps_per_ms = 1.0 / dt
+        h.finitialize(v_init)
+        h.continuerun(t_stop)
+    finally:
+        pc.nthread(1)
+
+    voltages = np.array([[vec.as_numpy() for vec in variant] for variant in records])
+    return rec_t.as_numpy().copy(), voltages
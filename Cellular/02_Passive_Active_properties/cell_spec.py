@@ -0,0 +1,108 @@
+# Declarative cell specifications and a builder for the toy models
+#
+# A spec is a plain dictionary, so it can be saved as JSON or sent to worker processes:
+#
+#     {
+#         "sections": {                     # created and connected in this order
+#             "soma": {"L": 20, "diam": 20, "Ra": 123.0, "cm": 1},
+#             "dend": {"parent": ["soma", 1], "L": 200, "diam": 1, "nseg": 5, "Ra": 300.0, "cm": 1},
+#         },
+#         "mechanisms": [                   # inserted in this order
+#             {"name": "pas", "sections": ["soma", "dend"], "params": {"g": 0.0003, "e": -70}},
+#         ],
+#     }
+import copy
+import json
+
+from neuron import h
+
+GEOMETRY = ("L", "diam", "nseg", "Ra", "cm")
+
+
+class Cell:
+    """Container for the sections of a cell built from a spec, available as attributes"""
+
+    def __init__(self, spec=None, prefix=""):
+        if spec is not None:
+            build(spec, self, prefix)
+
+
+def build(spec, target=None, prefix=""):
+    """
+    Instantiate a spec: create the sections, set their geometry, connect them and
+    insert the mechanisms with their parameters.
+
+    Parameters
+    ----------
+    spec : cell spec dictionary
+    target : object that receives one attribute per section, a new Cell by default
+    prefix : prepended to the NEURON section names, to tell variants apart
+
+    Returns
+    -------
+    target, with the sections as attributes and target.sections = {name: section}
+    """
+    if target is None:
+        target = Cell()
+
+    sections = {}
+    for name, geometry in spec["sections"].items():
+        sec = h.Section(name=prefix + name)
+        for attribute in GEOMETRY:
+            if attribute in geometry:
+                setattr(sec, attribute, geometry[attribute])
+        sections[name] = sec
+
+    # Topology or how sections are connected
+    for name, geometry in spec["sections"].items():
+        if "parent" in geometry:
+            parent, x = geometry["parent"]
+            sections[name].connect(sections[parent](x))
+
+    # Setting range variables on the section sets them on all its segments
+    for mechanism in spec["mechanisms"]:
+        for name in mechanism["sections"]:
+            sec = sections[name]
+            sec.insert(mechanism["name"])
+            for param, value in mechanism.get("params", {}).items():
+                setattr(sec, f"{param}_{mechanism['name']}", value)
+
+    for name, sec in sections.items():
+        setattr(target, name, sec)
+    target.sections = sections
+    return target
+
+
+def vary(spec, changes):
+    """
+    Copy of spec with some values changed. Keys are "section.attribute" for geometry
+    (e.g. "dend.diam") and "mechanism.param" for mechanism parameters (e.g. "pas.g",
+    changed in every entry of that mechanism).
+    """
+    spec = copy.deepcopy(spec)
+    for key, value in changes.items():
+        owner, attribute = key.split(".")
+        if owner in spec["sections"]:
+            spec["sections"][owner][attribute] = value
+            continue
+        entries = [m for m in spec["mechanisms"] if m["name"] == owner]
+        if not entries:
+            raise KeyError(f"{owner} is neither a section nor a mechanism of the spec")
+        for mechanism in entries:
+            mechanism.setdefault("params", {})[attribute] = value
+    return spec
+
+
+def build_variants(spec, changes_list):
+    """Build one cell per dictionary of changes, section names prefixed with variant_<n>_"""
+    return [build(vary(spec, changes), prefix=f"variant_{n}_") for n, changes in enumerate(changes_list)]
+
+
+def save_spec(spec, filename):
+    with open(filename, "w") as f:
+        json.dump(spec, f, indent=2)
+
+
+def load_spec(filename):
+    with open(filename) as f:
+        return json.load(f)
@@ -0,0 +1,6 @@
+# The notebooks download the modules of Cellular/shared next to this folder's code,
+# the tests find them in place
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared"))
@@ -0,0 +1,153 @@
+# Green's-function superposition for passive cells: cached impulse responses and FFT convolution
+from neuron import h
+import numpy as np
+
+
+def square_pulse(time, delay, duration, amplitude):
+    """Current step sampled on time, same shape as an IClamp [nA]"""
+    return amplitude * ((time >= delay) & (time < delay + duration))
+
+
+def _play_currents(sites, currents, dt):
+    """IClamps at sites whose amplitude follows the current arrays, one value per time step"""
+    clamps, vectors = [], []
+    for seg, current in zip(sites, currents):
+        stim = h.IClamp(seg)
+        stim.delay = 0
+        stim.dur = 1e9
+        vec = h.Vector(current)
+        vec.play(stim._ref_amp, dt)
+        clamps.append(stim)
+        vectors.append(vec)
+    return clamps, vectors
+
+
+def _simulate(inputs, outputs, currents, n_samples, dt, v_init):
+    """Voltage at outputs (outputs x samples) for currents played at inputs"""
+    h.load_file("stdrun.hoc")
+    clamps, vectors = _play_currents(inputs, currents, dt)
+    records = [h.Vector().record(seg._ref_v) for seg in outputs]
+
+    h.dt = dt
+    h.steps_per_ms = 1.0 / dt
+    h.finitialize(v_init)
+    h.continuerun((n_samples - 1) * dt)
+
+    return np.array([rec.as_numpy()[:n_samples] for rec in records])
+
+
+class GreensFunction:
+    """
+    Linear response of a passive cell between input and recording sites.
+
+    One NEURON run per input site gives the response of every recording site to a unit
+    charge injected in a single time step. The response to any combination of currents
+    at the input sites is then the resting potential plus the sum of the convolutions of
+    the currents with these impulse responses, evaluated with FFTs for whole batches
+    of stimulus patterns at once. Only valid for cells with passive (linear) membranes.
+
+        gf = GreensFunction([cell.dend(0), cell.dend(1)], [cell.soma(0.5)])
+        gf.compute()
+        v = gf.response(currents)  # currents: (patterns x inputs x samples) [nA]
+    """
+
+    def __init__(self, inputs, outputs, dt=0.025, duration=200.0, v_init=-70):
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.dt = dt
+        self.n_kernel = int(round(duration / dt)) + 1
+        self.v_init = v_init
+        self.kernels = None  # (outputs x inputs x samples) [mV per nA per time step]
+        self.resting = None  # (outputs) [mV]
+        self.baseline = None  # (outputs x samples) relaxation from v_init without input [mV]
+
+    @property
+    def input_names(self):
+        return [str(seg) for seg in self.inputs]
+
+    @property
+    def output_names(self):
+        return [str(seg) for seg in self.outputs]
+
+    def compute(self):
+        """Run the baseline and one impulse simulation per input site"""
+        n_inputs = len(self.inputs)
+        silent = np.zeros((n_inputs, self.n_kernel))
+        baseline = _simulate(self.inputs, self.outputs, silent, self.n_kernel, self.dt, self.v_init)
+        self.resting = baseline[:, -1]
+
+        self.kernels = np.empty((len(self.outputs), n_inputs, self.n_kernel))
+        for i in range(n_inputs):
+            impulse = silent.copy()
+            impulse[i, 0] = 1.0
+            v = _simulate(self.inputs, self.outputs, impulse, self.n_kernel, self.dt, self.v_init)
+            self.kernels[:, i] = v - baseline
+        # Keep the relaxation from v_init separate from the linear response
+        self.baseline = baseline
+        return self
+
+    def save(self, filename):
+        """Cache the impulse responses in a .npz file"""
+        np.savez(filename, kernels=self.kernels, resting=self.resting, baseline=self.baseline,
+                 dt=self.dt, v_init=self.v_init, inputs=self.input_names, outputs=self.output_names)
+
+    def load(self, filename):
+        """Load impulse responses cached by save, checking they belong to the same sites"""
+        data = np.load(filename)
+        if list(data["inputs"]) != self.input_names or list(data["outputs"]) != self.output_names:
+            raise ValueError(f"{filename} was computed for other input or recording sites")
+        if float(data["dt"]) != self.dt or float(data["v_init"]) != self.v_init:
+            raise ValueError(f"{filename} was computed with another dt or v_init")
+        self.kernels = data["kernels"]
+        self.resting = data["resting"]
+        self.baseline = data["baseline"]
+        self.n_kernel = self.kernels.shape[-1]
+        return self
+
+    def response(self, currents):
+        """
+        Voltage at the recording sites for currents injected at the input sites.
+
+        Parameters
+        ----------
+        currents : array (inputs x samples) or (patterns x inputs x samples) with the
+                   injected currents [nA], sampled every dt from t=0
+
+        Returns
+        -------
+        array (outputs x samples) or (patterns x outputs x samples) [mV]
+        """
+        if self.kernels is None:
+            raise RuntimeError("Impulse responses not computed, call compute() or load() first")
+        currents = np.asarray(currents, dtype=float)
+        n_samples = currents.shape[-1]
+
+        # Zero padding makes the circular FFT convolution linear
+        n_fft = int(2 ** np.ceil(np.log2(n_samples + self.n_kernel - 1)))
+        kernels_f = np.fft.rfft(self.kernels, n_fft)
+        currents_f = np.fft.rfft(currents, n_fft)
+        voltage_f = np.einsum("oif,...if->...of", kernels_f, currents_f)
+        voltage = np.fft.irfft(voltage_f, n_fft)[..., :n_samples]
+
+        # Resting trajectory from v_init, extended with the resting potential
+        baseline = np.empty((len(self.outputs), n_samples))
+        n_base = min(n_samples, self.n_kernel)
+        baseline[:, :n_base] = self.baseline[:, :n_base]
+        baseline[:, n_base:] = self.resting[:, None]
+
+        return voltage + baseline
+
+    def validate(self, currents):
+        """
+        Validation mode: compare the superposition with a real NEURON run of one stimulus
+        pattern (inputs x samples).
+
+        Returns
+        -------
+        predicted, simulated : arrays (outputs x samples) [mV]
+        max_error : largest absolute difference [mV]
+        """
+        currents = np.asarray(currents, dtype=float)
+        predicted = self.response(currents)
+        simulated = _simulate(self.inputs, self.outputs, currents, currents.shape[-1], self.dt, self.v_init)
+        return predicted, simulated, np.max(np.abs(predicted - simulated))
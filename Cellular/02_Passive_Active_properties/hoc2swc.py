@@ -1,4 +1,11 @@
-import os, re
+import os, re, sys
+
+try:
+    import instrumentation
+except ImportError:
+    # Not downloaded next to this file by the notebook: use the copy of a clone
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "shared"))
+    import instrumentation
 
 class TransientCWD:
     import os
@@ -228,6 +235,7 @@ def _hoc2swc(hoc_path, mod_path, swc_path):
     neuron2swc(swc_path)
 
 
+@instrumentation.instrument()
 def neuron2swc(swc_path, swap_yz=False):
     from neuron import h
 
@@ -303,6 +311,7 @@ def swc_type_from_section_name(section_name):
     return "5"
 
 
+@instrumentation.instrument()
 def hoc2swc(hoc_path, swc_path, mod_path=None, separate_process=True):
 
     # If not spec'd, assume mod files are in the hoc path
@@ -0,0 +1,69 @@
+# Frequency-domain passive analysis with NEURON's Impedance class
+from neuron import h
+import pandas as pd
+
+
+def segments(sections=None):
+    """All segments of the given sections (default: every section), in order"""
+    if sections is None:
+        sections = h.allsec()
+    return [seg for sec in sections for seg in sec]
+
+
+def impedance_map(reference, frequencies=(0,), sections=None, v_init=-70):
+    """
+    Input resistance, transfer impedance and voltage attenuation between every segment
+    and a reference site (usually the soma), computed from the linearised cable
+    equations without any time-domain simulation.
+
+    Parameters
+    ----------
+    reference : segment used as reference, e.g. cell.soma(0.5)
+    frequencies : frequencies [Hz], 0 gives the DC values
+    sections : sections to include, default all
+    v_init : voltage at which the membrane is linearised [mV]
+
+    Returns
+    -------
+    DataFrame with one row per segment and frequency:
+    section, x, frequency,
+    input_impedance : |Z| looking into the segment [MΩ]
+    transfer_impedance : |Z| between segment and reference [MΩ]
+    attenuation_to_reference : V(reference) / V(segment) for current injected at the segment
+    attenuation_from_reference : V(segment) / V(reference) for current injected at the reference
+    """
+    h.load_file("stdrun.hoc")
+    h.finitialize(v_init)
+
+    imp = h.Impedance()
+    imp.loc(reference.x, sec=reference.sec)
+    segs = segments(sections)
+
+    rows = []
+    for frequency in frequencies:
+        # Passing 1 includes the dstate/dv terms of active channels
+        imp.compute(frequency, 1)
+        z_reference = imp.input(reference.x, sec=reference.sec)
+        for seg in segs:
+            rows.append({
+                "section": seg.sec.name(),
+                "x": seg.x,
+                "frequency": frequency,
+                "input_impedance": imp.input(seg.x, sec=seg.sec),
+                "transfer_impedance": imp.transfer(seg.x, sec=seg.sec),
+                "attenuation_to_reference": imp.ratio(seg.x, sec=seg.sec),
+                "attenuation_from_reference": imp.transfer(seg.x, sec=seg.sec) / z_reference,
+            })
+
+    return pd.DataFrame(rows)
+
+
+def input_resistance(seg, frequency=0, v_init=-70):
+    """Input resistance (|Z| at frequency) of one segment [MΩ]"""
+    h.load_file("stdrun.hoc")
+    h.finitialize(v_init)
+
+    imp = h.Impedance()
+    imp.loc(seg.x, sec=seg.sec)
+    imp.compute(frequency, 1)
+    return imp.input(seg.x, sec=seg.sec)
@@ -1,55 +1,26 @@
-from neuron import h
+from cell_spec import build
 
-class PassiveNeuron_1Dend:
-    def __init__(self):
-        # Define all the sections first: soma, dendrite and axon
-        self.soma = h.Section(name="soma")
-        self.dend = h.Section(name="dend")
-        self.axon = h.Section(name="axon")
-
-        # Passive properties: cell geometry
+# Passive properties: cell geometry and leak channels
+PASSIVE_1DEND = {
+    "sections": {
         # Soma section (black in plot)
-        self.soma.L = 20  # length (µm)
-        self.soma.diam = 20  # diameter (µm)
-        self.soma.Ra = 123.0  # axial resistivity (Ω*cm)
-        self.soma.cm = 1  # capacitance (µF/cm^2)
-
+        "soma": {"L": 20, "diam": 20, "Ra": 123.0, "cm": 1},  # length (µm), diameter (µm), axial resistivity (Ω*cm), capacitance (µF/cm^2)
         # Dendrite section (red in plot)
-        self.dend.L = 200  # length (µm)
-        self.dend.diam = 1  # diameter (µm)
-        self.dend.nseg = 5  # number of segments
-        self.dend.Ra = 300.0  # axial resistivity (Ω*cm)
-        self.dend.cm = 1  # capacitance (µF/cm^2)
-
+        "dend": {"parent": ["soma", 1], "L": 200, "diam": 1, "nseg": 5, "Ra": 300.0, "cm": 1},
         # Axon section (blue in plot)
-        self.axon.diam = 3
-        self.axon.L = 100  # length (µm)
-        self.axon.nseg = 5  # diameter (µm)
-        self.axon.Ra = 123.0  # axial resistivity (Ω*cm)
-        self.axon.cm = 1  # capacitance (µF/cm^2)
+        "axon": {"parent": ["soma", 0], "L": 100, "diam": 3, "nseg": 5, "Ra": 123.0, "cm": 1},
+    },
+    "mechanisms": [
+        # Conductance of the leak channels (in S/cm2) and leak reversal potential,
+        # it influences the steady state membrane potential
+        {"name": "pas", "sections": ["soma", "dend", "axon"], "params": {"g": 0.0003, "e": -70}},
+    ],
+}
 
-        # Topology or how sections are connected
-        self.dend.connect(self.soma(1))
-        self.axon.connect(self.soma(0))
-        
-        # Passive properties: conductance and reversal potential of leak channels
-        self.soma.insert("pas")
-        for seg in self.soma:
-            seg.pas.g = 0.0003  # Conductance of the leak channels (in S/cm2)
-            seg.pas.e = (
-                -70
-            )  # Leak reversal potential, it influences the steady state membrane potential
 
-        self.dend.insert("pas")
-        for seg in self.dend:
-            seg.pas.g = 0.0003  # Conductance of the leak channels (in S/cm2)
-            seg.pas.e = (
-                -70
-            )  # Leak reversal potential, it influences the steady state membrane potential
+class PassiveNeuron_1Dend:
+    spec = PASSIVE_1DEND
 
-        self.axon.insert("pas")
-        for seg in self.axon:
-            seg.pas.g = 0.0003  # Conductance of the leak channels (in S/cm2)
-            seg.pas.e = (
-                -70
-            )  # Leak reversal potential, it influences the steady state membrane potential
\ No newline at end of file
+    def __init__(self):
+        # Creates soma, dend and axon from the spec
+        build(self.spec, self)
@@ -0,0 +1,201 @@
+# Parallel sweeps over passive parameters of the toy models, with cached soma traces
+import hashlib
+import importlib
+import itertools
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+# Model class name -> module defining it
+MODELS = {
+    "PassiveNeuron_1Dend": "passive_neuron_1dend",
+    "PassiveNeuron_1D_3D": "passive_neuron_1d_3d",
+    "ActiveNeuron_1D_3D": "active_neuron_1d_3d",
+}
+
+# Same protocol as the chage_passive_prop widget: three pulses along the dendrite, soma recorded
+DEFAULT_PROTOCOL = {
+    "stimuli": [
+        {"section": "dend", "x": 0.0, "delay": 100, "amplitude": 0.4, "duration": 50},
+        {"section": "dend", "x": 0.5, "delay": 300, "amplitude": 0.4, "duration": 50},
+        {"section": "dend", "x": 1.0, "delay": 500, "amplitude": 0.4, "duration": 50},
+    ],
+    "record": {"section": "soma", "x": 0.5},
+    "v_init": -70,
+    "t_stop": 700,
+    "dt": 0.025,
+}
+
+# Cells built by this process, reused between runs: {(model, parameter names): cell}
+_cells = {}
+
+
+def simulate(model, params, protocol=DEFAULT_PROTOCOL):
+    """
+    Run the protocol on a toy model with some passive parameters changed.
+
+    Parameters
+    ----------
+    model : name of the model class, one of MODELS
+    params : dictionary {"section.attribute": value}, e.g. {"dend.diam": 2.0, "dend.g_pas": 0.0001}
+    protocol : dictionary with stimuli, recording site, v_init, t_stop and dt (see DEFAULT_PROTOCOL)
+
+    Returns
+    -------
+    1D array with the recorded voltage [mV], sampled every protocol["dt"] ms
+    """
+    from neuron import h
+
+    key = (model, tuple(sorted(params)))
+    if key not in _cells:
+        _cells[key] = getattr(importlib.import_module(MODELS[model]), model)()
+    cell = _cells[key]
+
+    for name, value in params.items():
+        section, attribute = name.split(".")
+        setattr(getattr(cell, section), attribute, value)
+
+    stims = []
+    for stim in protocol["stimuli"]:
+        iclamp = h.IClamp(getattr(cell, stim["section"])(stim["x"]))
+        iclamp.delay = stim["delay"]
+        iclamp.amp = stim["amplitude"]
+        iclamp.dur = stim["duration"]
+        stims.append(iclamp)
+
+    record = protocol["record"]
+    rec_v = h.Vector().record(getattr(cell, record["section"])(record["x"])._ref_v)
+
+    h.load_file("stdrun.hoc")
+    h.dt = protocol["dt"]
+    h.steps_per_ms = 1.0 / protocol["dt"]
+    h.finitialize(protocol["v_init"])
+    h.continuerun(protocol["t_stop"])
+
+    return rec_v.as_numpy().copy()
+
+
+def _simulate_point(args):
+    return simulate(*args)
+
+
+def cache_key(model, params, protocol):
+    """Stable hash of a simulation, used as the file name of its cached trace"""
+    description = json.dumps(
+        {"model": model, "params": {k: float(v) for k, v in sorted(params.items())}, "protocol": protocol},
+        sort_keys=True,
+    )
+    return hashlib.sha1(description.encode()).hexdigest()
+
+
+class PassiveGrid:
+    """
+    Soma traces of a toy model over a regular grid of passive parameters.
+
+    The grid points are simulated in parallel worker processes and every trace is
+    cached, in memory and (if cache_dir is given) as a .npy file, keyed by model,
+    protocol and parameter values. Any point inside the grid can then be looked up
+    or interpolated without running NEURON.
+
+        grid = PassiveGrid("PassiveNeuron_1Dend", {"dend.diam": [0.5, 1, 2], "dend.Ra": [100, 300]})
+        grid.run(workers=4)
+        v = grid.interpolate({"dend.diam": 1.5, "dend.Ra": 200})
+    """
+
+    def __init__(self, model, axes, protocol=DEFAULT_PROTOCOL, cache_dir=None):
+        self.model = model
+        self.names = list(axes)
+        self.axes = [np.sort(np.asarray(axes[name], dtype=float)) for name in self.names]
+        self.protocol = protocol
+        self.cache_dir = cache_dir
+        self.time = np.arange(0, protocol["t_stop"] + protocol["dt"] / 2, protocol["dt"])
+        self._traces = {}
+        self._interpolator = None
+
+    @property
+    def shape(self):
+        return tuple(len(axis) for axis in self.axes)
+
+    def points(self):
+        """All parameter combinations of the grid, in C order"""
+        return [dict(zip(self.names, values)) for values in itertools.product(*self.axes)]
+
+    def _cache_file(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _cached(self, key):
+        if key in self._traces:
+            return self._traces[key]
+        if self.cache_dir and os.path.exists(self._cache_file(key)):
+            self._traces[key] = np.load(self._cache_file(key))
+            return self._traces[key]
+        return None
+
+    def run(self, workers=None):
+        """Simulate every grid point that is not cached yet, in parallel"""
+        points = self.points()
+        keys = [cache_key(self.model, p, self.protocol) for p in points]
+        missing = [(key, p) for key, p in zip(keys, points) if self._cached(key) is None]
+
+        if missing:
+            jobs = [(self.model, p, self.protocol) for _, p in missing]
+            # Each worker builds the cell once and reuses it for all its points
+            context = multiprocessing.get_context("spawn")
+            with context.Pool(workers) as pool:
+                traces = pool.map(_simulate_point, jobs, chunksize=max(len(jobs) // (4 * (workers or os.cpu_count())), 1))
+
+            if self.cache_dir:
+                os.makedirs(self.cache_dir, exist_ok=True)
+            for (key, _), trace in zip(missing, traces):
+                self._traces[key] = trace
+                if self.cache_dir:
+                    np.save(self._cache_file(key), trace)
+
+        self._interpolator = None
+        return len(missing)
+
+    def traces(self):
+        """Array (*grid shape x time) with the soma voltage of every grid point"""
+        stacked = [self._cached(cache_key(self.model, p, self.protocol)) for p in self.points()]
+        if any(trace is None for trace in stacked):
+            raise RuntimeError("Some grid points have not been simulated, call run() first")
+        return np.array(stacked).reshape(self.shape + (-1,))
+
+    def contains(self, params):
+        """True if params has the grid parameters and lies inside the grid"""
+        return all(
+            name in params and axis[0] <= params[name] <= axis[-1]
+            for name, axis in zip(self.names, self.axes)
+        )
+
+    def lookup(self, params):
+        """Trace of the grid point nearest to params"""
+        index = tuple(int(np.argmin(np.abs(axis - params[name]))) for name, axis in zip(self.names, self.axes))
+        return self.traces()[index]
+
+    def interpolate(self, params):
+        """Multilinear interpolation of the trace at params between the surrounding grid points"""
+        from scipy.interpolate import RegularGridInterpolator
+
+        if self._interpolator is None:
+            # Axes with a single value cannot be interpolated along, drop them
+            keep = [i for i, axis in enumerate(self.axes) if len(axis) > 1]
+            values = self.traces().reshape(tuple(len(self.axes[i]) for i in keep) + (-1,))
+            self._interpolator = (keep, RegularGridInterpolator([self.axes[i] for i in keep], values))
+
+        keep, interpolator = self._interpolator
+        if not keep:
+            return self.traces().reshape(-1, len(self.time))[0]
+        return interpolator([[params[self.names[i]] for i in keep]])[0]
+
+    def sensitivity(self, feature=None):
+        """
+        Map of a scalar feature over the grid. By default the peak depolarisation of the
+        recorded voltage above its initial value [mV].
+        """
+        traces = self.traces()
+        if feature is None:
+            return traces.max(axis=-1) - traces[..., 0]
+        return np.apply_along_axis(lambda v: feature(self.time, v), -1, traces)
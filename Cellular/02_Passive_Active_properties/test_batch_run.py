@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from active_neuron_1d_3d import ACTIVE_1D_3D
+from batch_run import run_population
+
+CHANGES = [{}, {"dend.diam": 2.0}, {"hh.gkbar": 0.05}, {"pas.g": 0.0001, "branch_0.L": 100}]
+STIMULI = [{"section": "dend", "x": 1.0, "delay": 10, "amplitude": 1.0, "duration": 30}]
+RECORD = (("soma", 0.5), ("dend", 1.0))
+
+
+def test_population_equals_separate_runs():
+    time, voltages = run_population(ACTIVE_1D_3D, CHANGES, STIMULI, RECORD, t_stop=60)
+    assert voltages.shape == (len(CHANGES), 2, len(time))
+    # The stimulus makes the soma spike, so variants do differ
+    assert voltages[:, 0].max() > 0
+
+    for changes, variant in zip(CHANGES, voltages):
+        _, alone = run_population(ACTIVE_1D_3D, [changes], STIMULI, RECORD, t_stop=60)
+        np.testing.assert_array_equal(alone[0], variant)
+
+    _, threaded = run_population(ACTIVE_1D_3D, CHANGES, STIMULI, RECORD, t_stop=60, threads=2)
+    np.testing.assert_array_equal(threaded, voltages)
+
+
+def test_stimuli_per_variant():
+    stimuli_list = [STIMULI, []]
+    _, voltages = run_population(ACTIVE_1D_3D, [{}, {}], stimuli_list, t_stop=30)
+    assert voltages[0, 0].max() > voltages[1, 0].max()
+
+    with pytest.raises(ValueError):
+        run_population(ACTIVE_1D_3D, [{}, {}], [STIMULI], t_stop=30)
@@ -0,0 +1,83 @@
+import pytest
+from neuron import h
+
+from active_neuron_1d_3d import ACTIVE_1D_3D, ActiveNeuron_1D_3D
+from cell_spec import build, build_variants, load_spec, save_spec, vary
+from passive_neuron_1dend import PASSIVE_1DEND, PassiveNeuron_1Dend
+
+
+def hand_coded_1dend():
+    """PassiveNeuron_1Dend as it was written before the specs"""
+    soma, dend, axon = h.Section(name="soma"), h.Section(name="dend"), h.Section(name="axon")
+    soma.L, soma.diam, soma.Ra, soma.cm = 20, 20, 123.0, 1
+    dend.L, dend.diam, dend.nseg, dend.Ra, dend.cm = 200, 1, 5, 300.0, 1
+    axon.diam, axon.L, axon.nseg, axon.Ra, axon.cm = 3, 100, 5, 123.0, 1
+    dend.connect(soma(1))
+    axon.connect(soma(0))
+    for sec in (soma, dend, axon):
+        sec.insert("pas")
+        for seg in sec:
+            seg.pas.g = 0.0003
+            seg.pas.e = -70
+    return soma, dend, axon
+
+
+def describe(sections):
+    """Geometry, topology and mechanism parameters of every segment"""
+    rows = []
+    for sec in sections:
+        parent = sec.parentseg()
+        rows.append((sec.L, sec.nseg, sec.Ra, parent and (parent.sec.name(), parent.x)))
+        for seg in sec:
+            mechanisms = [(mech.name(), [(var.name(), var[0]) for var in mech]) for mech in seg]
+            rows.append((seg.x, seg.diam, seg.cm, seg.area(), seg.ri(), mechanisms))
+    return rows
+
+
+def soma_trace(soma, dend):
+    stim = h.IClamp(dend(1))
+    stim.delay, stim.dur, stim.amp = 5, 20, 0.3
+    v = h.Vector().record(soma(0.5)._ref_v)
+    h.load_file("stdrun.hoc")
+    h.dt = 0.025
+    h.finitialize(-70)
+    h.continuerun(50)
+    return v.to_python()
+
+
+def test_passive_1dend_matches_hand_coded():
+    cell = PassiveNeuron_1Dend()
+    soma, dend, axon = hand_coded_1dend()
+
+    assert describe([cell.soma, cell.dend, cell.axon]) == describe([soma, dend, axon])
+    assert soma_trace(cell.soma, cell.dend) == soma_trace(soma, dend)
+
+
+def test_active_1d_3d_parameters():
+    cell = ActiveNeuron_1D_3D()
+    assert cell.dend.Ra == 123.0
+    assert [cell.sections[f"branch_{i}"].Ra for i in range(4)] == [130.0] * 4
+    assert cell.soma(0.5).hh.gkbar == 0.1 and cell.soma(0.5).hh.gnabar == 0.4
+    assert not hasattr(cell.dend(0.5), "hh")
+    assert all(seg.pas.g == 0.0003 and seg.pas.e == -70 for sec in cell.sections.values() for seg in sec)
+
+
+def test_vary_and_json_round_trip(tmp_path):
+    spec = vary(PASSIVE_1DEND, {"dend.diam": 2.0, "pas.g": 0.0001})
+    assert spec["sections"]["dend"]["diam"] == 2.0
+    assert spec["mechanisms"][0]["params"]["g"] == 0.0001
+    # The original spec is left unchanged
+    assert PASSIVE_1DEND["sections"]["dend"]["diam"] == 1
+    with pytest.raises(KeyError):
+        vary(PASSIVE_1DEND, {"hh.gkbar": 0.1})
+
+    save_spec(ACTIVE_1D_3D, tmp_path / "spec.json")
+    loaded = load_spec(tmp_path / "spec.json")
+    assert describe(build(loaded).sections.values()) == describe(ActiveNeuron_1D_3D().sections.values())
+
+
+def test_build_variants_names():
+    first, second = build_variants(PASSIVE_1DEND, [{}, {"dend.L": 400}])
+    assert first.dend.name() == "variant_0_dend" and second.dend.name() == "variant_1_dend"
+    assert (first.dend.L, second.dend.L) == (200, 400)
+    assert second.dend.parentseg().sec == second.soma
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from greens_function import GreensFunction, square_pulse
+from passive_neuron_1d_3d import PassiveNeuron_1D_3D
+
+DT = 0.025
+
+
+@pytest.fixture(scope="module")
+def cell():
+    return PassiveNeuron_1D_3D()
+
+
+@pytest.fixture(scope="module")
+def greens(cell):
+    return GreensFunction([cell.dend(1), cell.branch_0(0.5)], [cell.soma(0.5), cell.dend(0.5)],
+                          dt=DT, duration=100).compute()
+
+
+def patterns(n_samples):
+    time = np.arange(n_samples) * DT
+    return np.array([
+        [square_pulse(time, 10, 20, 0.3), square_pulse(time, 40, 5, -0.2)],
+        [square_pulse(time, 5, 100, 0.1), np.sin(time / 3) * 0.05],
+    ])
+
+
+def test_superposition_matches_simulation(greens):
+    for currents in patterns(6001):
+        predicted, simulated, max_error = greens.validate(currents)
+        assert predicted.shape == simulated.shape == (2, 6001)
+        assert max_error < 1e-9
+
+
+def test_batch_equals_single_patterns(greens):
+    currents = patterns(2001)
+    batch = greens.response(currents)
+    assert batch.shape == (2, 2, 2001)
+    for pattern, single in zip(currents, batch):
+        np.testing.assert_allclose(greens.response(pattern), single, atol=1e-12)
+
+
+def test_cache_round_trip(cell, greens, tmp_path):
+    greens.save(tmp_path / "kernels.npz")
+    loaded = GreensFunction(greens.inputs, greens.outputs, dt=DT).load(tmp_path / "kernels.npz")
+    currents = patterns(3001)[0]
+    np.testing.assert_array_equal(loaded.response(currents), greens.response(currents))
+
+    with pytest.raises(ValueError):
+        GreensFunction([cell.dend(0)], greens.outputs, dt=DT).load(tmp_path / "kernels.npz")
+    with pytest.raises(ValueError):
+        GreensFunction(greens.inputs, greens.outputs, dt=0.05).load(tmp_path / "kernels.npz")
@@ -0,0 +1,38 @@
+import pytest
+from neuron import h
+
+from impedance import impedance_map, input_resistance
+from passive_neuron_1dend import PassiveNeuron_1Dend
+
+
+def steady_state(cell, site, amplitude=0.1):
+    """Soma and site voltage at the end of a long current step at site, minus rest [mV]"""
+    stim = h.IClamp(site)
+    stim.delay, stim.dur, stim.amp = 0, 1e9, amplitude
+    h.load_file("stdrun.hoc")
+    h.finitialize(-70)
+    h.continuerun(500)
+    return cell.soma(0.5).v + 70, site.v + 70
+
+
+def test_dc_values_match_steady_state():
+    cell = PassiveNeuron_1Dend()
+    table = impedance_map(cell.soma(0.5), sections=[cell.soma, cell.dend, cell.axon])
+    assert len(table) == 1 + 5 + 5
+    dend = table[(table["section"] == cell.dend.name()) & (table["x"] == 0.9)].iloc[0]
+
+    v_soma, _ = steady_state(cell, cell.soma(0.5))
+    assert input_resistance(cell.soma(0.5)) == pytest.approx(v_soma / 0.1, rel=1e-4)
+
+    v_soma, v_dend = steady_state(cell, cell.dend(0.9))
+    assert dend["input_impedance"] == pytest.approx(v_dend / 0.1, rel=1e-4)
+    assert dend["transfer_impedance"] == pytest.approx(v_soma / 0.1, rel=1e-4)
+    assert dend["attenuation_to_reference"] == pytest.approx(v_soma / v_dend, rel=1e-4)
+
+
+def test_attenuation_grows_with_frequency():
+    cell = PassiveNeuron_1Dend()
+    table = impedance_map(cell.soma(0.5), frequencies=(0, 100), sections=[cell.dend])
+    tip = table[table["x"] == 0.9].set_index("frequency")
+    assert tip.loc[100, "attenuation_to_reference"] < tip.loc[0, "attenuation_to_reference"]
+    assert tip.loc[100, "input_impedance"] < tip.loc[0, "input_impedance"]
@@ -0,0 +1,35 @@
+import numpy as np
+
+from passive_sweep import DEFAULT_PROTOCOL, PassiveGrid, simulate
+
+# First pulse of the widget protocol only, to keep the runs short
+PROTOCOL = dict(DEFAULT_PROTOCOL, stimuli=DEFAULT_PROTOCOL["stimuli"][:1], t_stop=200)
+AXES = {"dend.diam": [2.0, 0.5], "dend.Ra": [100, 300]}
+
+
+def test_grid_matches_single_runs(tmp_path):
+    grid = PassiveGrid("PassiveNeuron_1Dend", AXES, PROTOCOL, cache_dir=str(tmp_path))
+    assert grid.run(workers=2) == 4
+
+    traces = grid.traces()
+    assert traces.shape == (2, 2, len(grid.time))
+    for index, params in zip(np.ndindex(grid.shape), grid.points()):
+        np.testing.assert_array_equal(traces[index], simulate("PassiveNeuron_1Dend", params, PROTOCOL))
+    # Axes are sorted
+    assert grid.points()[0] == {"dend.diam": 0.5, "dend.Ra": 100}
+
+    # A new grid over the same cache simulates nothing
+    cached = PassiveGrid("PassiveNeuron_1Dend", AXES, PROTOCOL, cache_dir=str(tmp_path))
+    assert cached.run(workers=2) == 0
+    np.testing.assert_array_equal(cached.traces(), traces)
+
+    assert grid.contains({"dend.diam": 1.0, "dend.Ra": 300})
+    assert not grid.contains({"dend.diam": 3.0, "dend.Ra": 300})
+    assert not grid.contains({"dend.diam": 1.0})
+
+    np.testing.assert_array_equal(grid.lookup({"dend.diam": 1.9, "dend.Ra": 120}), traces[1, 0])
+    np.testing.assert_allclose(grid.interpolate({"dend.diam": 0.5, "dend.Ra": 300}), traces[0, 1])
+    np.testing.assert_allclose(grid.interpolate({"dend.diam": 1.25, "dend.Ra": 300}),
+                               (traces[0, 1] + traces[1, 1]) / 2)
+
+    np.testing.assert_allclose(grid.sensitivity(), traces.max(axis=-1) - traces[..., 0])
@@ -3,19 +3,107 @@ import numpy as np
 import pandas as pd
 import h5py
 import csv
-import glob
+import os
 import ipywidgets as widgets
 from IPython.display import display
 import efel
 from json2html import json2html
 import IPython
 
+from trace_plotting import plot_sweeps
+import spike_detection
+from noise_estimation import baseline_noise, connection_noise
+from failure_classification import classify_failures, failure_table
+from epsp_kernel import RISE_LEVELS, epsp_crossings, epsp_features
+import instrumentation
+from data_catalog import catalog, parse_name
+import sweep_store
+from connection_store import read_sweeps
+from data_cache import cache
+from bootstrap import bootstrap_cis
+from sweep_alignment import aligned_mean_trace
+import preprocessing
+from psp_detection import psp_template, detect_events
 
+
+# Samples of the presynaptic stimulations in the connection files
+STIMULATION_INDICES = np.array([1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500, 10000])
+CONNECTION_FS = 10000  # sampling rate of the connection files [Hz]
+
+
+@instrumentation.instrument()
 def get_data(fn):
     """Read  data file and format for plotting"""
     d = np.fromfile(fn)    
+    instrumentation.add("bytes_read", d.nbytes)
     return d[::2], d[1::2]
 
+def load_sweeps(file_list, reader=get_data):
+    """
+    Read a list of data files of the same protocol and stack them.
+    reader reads one file. Sweeps shorter than the longest one
+    are padded with NaN, which the plots and the spike detection skip.
+    Every sweep must start like the time axis of the longest one.
+
+    Returns
+    -------
+    time : 1D array with the time axis of the longest sweep [ms]
+    sweeps : 2D array (sweeps x samples)
+    """
+    data = [reader(fn) for fn in file_list]
+    time = max((t for t, _ in data), key=len)
+    for fn, (t, _) in zip(file_list, data):
+        if not np.array_equal(t, time[:len(t)]):
+            raise ValueError(f"{fn} does not share the time axis of the longest sweep")
+
+    sweeps = np.full((len(data), len(time)), np.nan)
+    for row, (_, v) in zip(sweeps, data):
+        row[:len(v)] = v
+
+    return time, sweeps
+
+def load_protocol(exp_name, role, file_list, reader=get_data):
+    """
+    Sweeps of a protocol, from the sweep_store file when it holds every sweep of
+    file_list unchanged since the conversion (see SweepStore.holds), otherwise from
+    the .dat files in file_list. role is "response" or "stimulus".
+    """
+    if file_list and os.path.exists(sweep_store.STORE_NAME):
+        with sweep_store.SweepStore() as store:
+            if store.holds(exp_name, role, file_list):
+                sweeps = [parse_name(os.path.basename(fn))["sweep"] for fn in file_list]
+                return store.read(exp_name, role, sweeps=sweeps)
+    return load_sweeps(file_list, reader)
+
+def protocol_loader(data, exp_name, role, preprocess=False):
+    """
+    Cache key and loader of the sweeps of one channel of a protocol of the catalog data.
+    With preprocess=True responses are filtered with the settings of the protocol.
+    Only these stacked arrays are cached, not the files they are read from.
+    """
+    files = data.files(exp_name, channel=sweep_store.CHANNELS[role], kind="dat")
+
+    def load():
+        t, sweeps = load_protocol(exp_name, role, files)
+        if preprocess and role == "response":
+            fs = 1000.0 / (t[1] - t[0])
+            sweeps = preprocessing.cached(f"{exp_name}_{role}", files, fs, preprocessing.config_for(exp_name),
+                                          lambda: sweeps)
+        return t, sweeps
+    return ("protocol", exp_name, role, preprocess), load
+
+def connection_loader(data, exp_name, align=False, preprocess=False):
+    """
+    Cache key and loader of the sweeps, mean trace and sweep lags (None without align)
+    of a connection of the catalog data
+    """
+    def load():
+        traces = load_traces(data.files(exp_name, kind="h5")[0], preprocess)
+        if align:
+            return (traces, *aligned_mean_trace(traces, STIMULATION_INDICES))
+        return traces, np.mean(traces, axis=0), None
+    return ("connection", exp_name, align, preprocess), load
+
 def extract_PSP_window(trace, time, stimulation_index, time_before=50, time_after=300):
     """Extract a time window with a single EPSP trace"""
     psp_trace = trace[stimulation_index - time_before : stimulation_index + time_after]
@@ -45,51 +133,33 @@ def extract_EPSP_features(psp_trace, psp_time, stimulation_time):
     latency : time between the AP of the presynaptic cell and 5% amplitude rise of the EPSP [s]
     """
 
-    # find absolute values of the psp trace
-    max_psp = np.max(psp_trace)
-    min_psp = np.min(psp_trace)
-    amplitude_psp = np.abs(max_psp - min_psp)
-
-    # compute percentages of amplitudes
-    twenty_amplitude = amplitude_psp * 80.0 / 100.0
-    eighty_amplitude = amplitude_psp * 20.0 / 100.0
-    five_amplitude = amplitude_psp * 95.0 / 100.0
-    amplitude = eighty_amplitude - twenty_amplitude
-
-    # compute amplitude percentages on the psp trace
-    psp_percent = {
-        "five": -(five_amplitude - max_psp),
-        "twenty": -(twenty_amplitude - max_psp),
-        "eighty": -(eighty_amplitude - max_psp),
-    }
-
-    # find corresponding index of an array
-    five_index = np.where(psp_trace >= psp_percent["five"])[0][0]
-    twenty_index = np.where(psp_trace >= psp_percent["twenty"])[0][0]
-    eighty_index = np.where(psp_trace >= psp_percent["eighty"])[0][0]
-
-    # extract time points for percentage points of the trace
-    psp_times = {
-        "five": psp_time[five_index],
-        "twenty": psp_time[twenty_index],
-        "eighty": psp_time[eighty_index],
-    }
-    
+    levels, times, amplitude_psp = epsp_crossings(psp_trace, psp_time)
+
+    # amplitude percentages on the psp trace and the interpolated times they are reached
+    psp_percent = dict(zip(RISE_LEVELS, levels))
+    psp_times = dict(zip(RISE_LEVELS, times))
+    amplitude = -0.6 * amplitude_psp
+
     # calculate time features of a PSP
     tau_rise = np.abs((psp_times["twenty"] - psp_times["eighty"]))
     latency = np.abs((psp_times["five"]) - stimulation_time)
 
     return psp_percent, psp_times, amplitude, tau_rise, latency
 
-def load_traces(filename):
-    data = h5py.File(filename, "r")
-    data.keys()
-
-    traces = []
-    for key in data.keys():
-        traces.append(data.get(key))
-
-    return np.array(traces)
+@instrumentation.instrument()
+def load_traces(filename, preprocess=False):
+    """
+    All sweeps of a connection file (sweeps x samples), in either connection_store layout.
+    With preprocess=True they are filtered and baseline-subtracted with the "connection"
+    settings of preprocessing, cached in preprocessed/ next to the file.
+    """
+    if preprocess:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        return preprocessing.cached(name, [filename], CONNECTION_FS, preprocessing.config_for(name),
+                                    lambda: read_sweeps(filename))
+    traces = read_sweeps(filename)
+    instrumentation.add("bytes_read", traces.nbytes)
+    return traces
 
 def extract_tau_latency(psp_trace, psp_time, stimulation_time):
     """
@@ -109,94 +179,46 @@ def extract_tau_latency(psp_trace, psp_time, stimulation_time):
     latency : time between the AP of the presynaptic cell and 5% amplitude rise of the EPSP [s]
     """
 
-    # find absolute values of the psp trace
-    max_psp = np.max(psp_trace)
-    min_psp = np.min(psp_trace)
-    amplitude_psp = np.abs(max_psp - min_psp)
-
-    # compute percentages of amplitudes
-    twenty_amplitude = amplitude_psp * 80.0 / 100.0
-    eighty_amplitude = amplitude_psp * 20.0 / 100.0
-    five_amplitude = amplitude_psp * 95.0 / 100.0
-    amplitude = eighty_amplitude - twenty_amplitude
-
-    # compute amplitude percentages on the psp trace
-    psp_percent = {
-        "five": -(five_amplitude - max_psp),
-        "twenty": -(twenty_amplitude - max_psp),
-        "eighty": -(eighty_amplitude - max_psp),
-    }
-
-    # find corresponding index of an array
-    five_index = np.where(psp_trace >= psp_percent["five"])[0][0]
-    twenty_index = np.where(psp_trace >= psp_percent["twenty"])[0][0]
-    eighty_index = np.where(psp_trace >= psp_percent["eighty"])[0][0]
-
-    # extract time points for percentage points of the trace
-    psp_times = {
-        "five": psp_time[five_index],
-        "twenty": psp_time[twenty_index],
-        "eighty": psp_time[eighty_index],
-    }
-
-    # calculate time features of a PSP
-    tau_rise = np.abs((psp_times["twenty"] - psp_times["eighty"]))
-    latency = np.abs((psp_times["five"]) - stimulation_time)
-
-    return amplitude_psp*1000, tau_rise, latency
+    return epsp_features(psp_trace, psp_time, stimulation_time)
 
-def extract_all_amps_taus_latencies(trace, stimulation_indices, time):
-    taus = np.array([])
-    latencies = np.array([])
-    amplitudes = np.array([])
-
-
-    for index in stimulation_indices:
-        psp_trace, psp_time = extract_PSP_window(trace, time, index)
-        amp, tau_rise, latency = extract_tau_latency(psp_trace, psp_time, time[index])
-
-        taus = np.append(taus, tau_rise)
-        latencies = np.append(latencies, latency)
-        amplitudes = np.append(amplitudes, amp)
 
+def extract_all_amps_taus_latencies(trace, stimulation_indices, time, time_before=50, time_after=300):
+    """
+    Amplitudes, rise times and latencies of the EPSPs after every stimulation index.
+    trace can be a single sweep or a 2D array (sweeps x samples), the outputs then
+    have shape (sweeps x stimuli).
+    """
+    windows = np.asarray(stimulation_indices)[:, None] + np.arange(-time_before, time_after)
+    psp_traces = np.asarray(trace)[..., windows]
 
-    return amplitudes, taus, latencies
+    return epsp_features(psp_traces, time[windows], time[stimulation_indices])
 
 def compute_noise(trace, stimulation_index, time_before=50):
-    pre_psp_trace = trace[0 : stimulation_index - time_before]
-    noise_max = np.max(trace)
-    noise_min = np.min(trace)
-    noise_amp = np.abs(noise_max - noise_min)
-    return noise_amp * 1000
+    """Peak-to-peak baseline noise [mV] of a sweep (or of every sweep of a 2D array)"""
+    return baseline_noise(trace, stimulation_index, time_before)["peak_to_peak"]
 
 def calculate_failure_rate(amplitudes, latencies, noise_std):
-    failure = 0
-    total = 0
+    classes = classify_failures(amplitudes, latencies, noise_std)
+    failed_amps = list(amplitudes[classes["failed"]])
+    correct_amps = list(amplitudes[classes["success"]])
 
-    latency_average = np.mean(latencies.mean(axis=0))
-    failed_amps, correct_amps = [], []
-    for amps, lats in zip(amplitudes, latencies):
-        for amp, lat in zip(amps, lats):
-            if amp < 1.5 * noise_std or lat > 2.5 * np.mean(latency_average):
-                failure += 1
-                failed_amps.append(amp)
-            else:
-                correct_amps.append(amp)
-            total += 1
-
-    return failure, total, failed_amps, correct_amps
+    return classes["failures"], classes["total"], failed_amps, correct_amps
 
 
 resp_list_global = []
-def choose_protocol():
+def choose_protocol(preprocess=False):
     """
     Shows a dropdown with experiment names and plots the corresponding
     response and stimulation traces once selected.
     Works reliably inside Jupyter / JupyterLab.
+    With preprocess=True the responses are low-pass filtered (see preprocessing).
     """
     global resp_list_global 
     
-    exp_list = ['exp_FirePattern', 'exp_IV']
+    # Protocols of the .dat files, from the manifest of the working directory
+    data = catalog()
+    data.update()
+    exp_list = data.protocols(kind="dat")
 
     dropdown = widgets.Dropdown(
         options=exp_list,
@@ -206,15 +228,13 @@ def choose_protocol():
 
     output = widgets.Output()
 
+    @instrumentation.instrument("choose_protocol.plot_experiment")
     def plot_experiment(exp_name):
         global resp_list_global
         output.clear_output(wait=True)
         with output:
-            resp_path = f'{exp_name}_ch6_*.dat'
-            stim_path = f'{exp_name}_ch7_*.dat'
-
-            resp_list = sorted(glob.glob(resp_path))
-            stim_list = sorted(glob.glob(stim_path))
+            resp_list = data.files(exp_name, channel=6, kind="dat")
+            stim_list = data.files(exp_name, channel=7, kind="dat")
 
             # store globally so other functions can use it
             resp_list_global = resp_list 
@@ -226,17 +246,17 @@ def choose_protocol():
             # Response
             fig1, ax1 = plt.subplots(figsize=(15, 3))
             ax1.set_title(f'{exp_name} — Response')
-            for fv in resp_list:
-                t, v = get_data(fv)
-                ax1.plot(t, v)
+            if resp_list:
+                t, sweeps = cache.get(*protocol_loader(data, exp_name, "response", preprocess))
+                plot_sweeps(ax1, t, sweeps, colors=[f'C{i % 10}' for i in range(len(sweeps))])
             plt.show()
 
             # Stimulation
             fig2, ax2 = plt.subplots(figsize=(15, 3))
             ax2.set_title(f'{exp_name} — Stimulation')
-            for fv in stim_list:
-                t, v = get_data(fv)
-                ax2.plot(t, v)
+            if stim_list:
+                t, sweeps = cache.get(*protocol_loader(data, exp_name, "stimulus", preprocess))
+                plot_sweeps(ax2, t, sweeps, colors=[f'C{i % 10}' for i in range(len(sweeps))])
             plt.show()
 
     # Create interactive connection
@@ -246,7 +266,17 @@ def choose_protocol():
     ui = widgets.VBox([dropdown, output])
     display(ui)
 
-def choose_answer():
+    # Load the other protocols in the background, so switching is instant
+    for exp_name in exp_list:
+        for role, channel in sweep_store.CHANNELS.items():
+            if data.files(exp_name, channel=channel, kind="dat"):
+                cache.prefetch(*protocol_loader(data, exp_name, role, preprocess))
+
+def choose_answer(fast=True):
+    """
+    Shows a dropdown to analyse the sweeps selected in choose_protocol. With fast=True the
+    supra-threshold features come from the vectorized spike detector, otherwise from eFEL.
+    """
     global resp_list_global
 
     exp_list = ['Sub-threshold', 'Supra-threshold'] 
@@ -259,12 +289,38 @@ def choose_answer():
     
     output = widgets.Output()
 
+    def selected_responses():
+        """Responses of the protocol selected in choose_protocol, from the shared cache"""
+        exp_name = parse_name(os.path.basename(resp_list_global[0]))["protocol"]
+        return protocol_loader(catalog(), exp_name, "response")
+
+    def sweeps_of(t, v):
+        """Each sweep without the NaN padding of load_sweeps"""
+        for fv, sweep in zip(resp_list_global, v):
+            valid = ~np.isnan(sweep)
+            yield fv, t[valid], sweep[valid]
+
+    @instrumentation.instrument("choose_answer.run_analysis")
     def run_analysis(answer):
         output.clear_output(wait=True)
         with output:
-            if answer == "Supra-threshold":
-                for fv in resp_list_global:
-                    t, v = get_data(fv)
+            if not resp_list_global:
+                print("Select a protocol with choose_protocol first")
+                return
+            t_all, v_all = cache.get(*selected_responses())
+
+            if answer == "Supra-threshold" and fast:
+                t, v = t_all, v_all
+
+                stim_start = 378.9 # in ms
+                stim_end = 3681.0
+                spikes = spike_detection.detect_spikes(t, v)
+                features = spike_detection.spike_features(t, v, spikes, stim_start, stim_end)
+                features.index = resp_list_global
+                print(features)
+
+            if answer == "Supra-threshold" and not fast:
+                for fv, t, v in sweeps_of(t_all, v_all):
                     #t, i = get_data(file_c1)
 
                     stim_start = 378.9 # in ms
@@ -278,8 +334,7 @@ def choose_answer():
                     IPython.display.HTML(json2html.convert(json=feature_values))
 
             if answer == "Sub-threshold": 
-                for fv in resp_list_global:
-                    t, v = get_data(fv)
+                for fv, t, v in sweeps_of(t_all, v_all):
 
                     stim_start = 378.9 # in ms
                     stim_end = 3681.0
@@ -297,19 +352,28 @@ def choose_answer():
     ui = widgets.VBox([dropdown, output])
     display(ui)
 
+    # Read the selected sweeps in the background
+    if resp_list_global:
+        cache.prefetch(*selected_responses())
+
 
 #mean_trace_global = None   # <-- will store the output of the function
 
-def choose_connection():
+def choose_connection(align=False, preprocess=False):
     """
     Shows a dropdown with connection h5 file names and plots the corresponding
     experimental traces. Returns a dictionary that will hold the mean trace.
+    With align=True the sweeps are aligned around every stimulation before
+    averaging (see sweep_alignment), and result['lags'] holds their lags in samples.
+    With preprocess=True the sweeps are filtered and baseline-subtracted first.
     """
 
-    exp_list = ['connection_c1', 'connection_c2', 'connection_c4']
+    data = catalog()
+    data.update()
+    exp_list = data.protocols(kind="h5", pattern=r"connection_c\d+$")
 
     # A safe container to store the mean trace after selection
-    result = {"mean_trace": None}
+    result = {"mean_trace": None, "lags": None}
 
     dropdown = widgets.Dropdown(
         options=exp_list,
@@ -319,25 +383,22 @@ def choose_connection():
 
     output = widgets.Output()
 
+    @instrumentation.instrument("choose_connection.plot_traces")
     def plot_traces(exp_name):
         """Plots all sweeps and stores the mean trace."""
         with output:
             output.clear_output()
 
-            # Read the H5 file
-            with h5py.File(f'{exp_name}.h5', "r") as data:
-                traces = np.array([data[key][()] for key in data.keys()])
-
-            # Compute mean trace
-            mean_trace = np.mean(traces, axis=0)
+            # Sweeps and mean trace, read from the H5 file once
+            traces, mean_trace, lags = cache.get(*connection_loader(data, exp_name, align, preprocess))
             result["mean_trace"] = mean_trace  # store it safely
+            result["lags"] = lags
 
             # Plot sweeps and mean
             plt.figure(figsize=(8, 4))
-            for trace in traces:
-                plt.plot(trace, "b--", alpha=0.4)
-
-            plt.plot(mean_trace, "r", linewidth=2, label='mean')
+            samples = np.arange(traces.shape[1])
+            plot_sweeps(plt.gca(), samples, traces, colors="b", linestyles="--", alpha=0.4)
+            plot_sweeps(plt.gca(), samples, mean_trace, colors="r", linewidths=2, label='aligned mean' if align else 'mean')
             plt.ylabel('V (V)')
             plt.xlabel('time (ms)')
             plt.title(f"{exp_name}")
@@ -351,48 +412,61 @@ def choose_connection():
 
     display(dropdown, output)
 
+    # Load the other connections in the background, so switching is instant
+    for exp_name in exp_list:
+        cache.prefetch(*connection_loader(data, exp_name, align, preprocess))
+
     # Return the dictionary that will hold the mean trace
     return result
 
 
 
-def compute_failure_rate(files):
+def connection_features(files, preprocess=False):
+    """
+    EPSP features and baseline noise of the connections in files, keyed by their
+    position in files. With preprocess=True the sweeps are filtered before the
+    analysis (see load_traces).
+
+    Returns
+    -------
+    amplitudes, taus, latencies : dictionaries {connection: 2D array (sweeps x stimuli)}
+    noise : DataFrame of connection_noise, one row per sweep
+    """
     traces_collection = {}
     for n, file in enumerate(files):
-        traces_collection[n] = load_traces(file)
+        traces_collection[n] = load_traces(file, preprocess)
 
     time = np.arange(0, 1.3, 0.0001)
-    stimulation_indices = np.array([1000, 1500, 2000, 2500, 3000, 3500, 4000, 4500, 10000])
+    stimulation_indices = STIMULATION_INDICES
 
     taus_collection = {}
     latencies_collection = {}
     amplitudes_collection = {}
 
     for key in traces_collection:
-        traces = traces_collection[key]
         all_amplitudes, all_taus, all_latencies = extract_all_amps_taus_latencies(
-            traces[0], stimulation_indices, time
+            traces_collection[key], stimulation_indices, time
         )
 
-        for trace in traces[1:]:
-            amps, taus, latencies = extract_all_amps_taus_latencies(trace, stimulation_indices, time)
-            all_taus = np.vstack([all_taus, taus])
-            all_latencies = np.vstack([all_latencies, latencies])
-            all_amplitudes = np.vstack([all_amplitudes, amps])
-
         taus_collection[key] = all_taus
         latencies_collection[key] = all_latencies
         amplitudes_collection[key] = all_amplitudes 
 
-    noise_collection = {}
-    for key in traces_collection:
-        noise = []
-        for psp_trace in traces:
-            noise.append(compute_noise(psp_trace, stimulation_indices[0]))
+    # Peak-to-peak baseline noise of every sweep, spread over sweeps per connection
+    noise = connection_noise(traces_collection, stimulation_indices[0])
+
+    return amplitudes_collection, taus_collection, latencies_collection, noise
 
-        noise_collection[key] = np.array(noise)
 
-    noise_std = pd.DataFrame(noise_collection).std()
+@instrumentation.instrument()
+def compute_failure_rate(files, preprocess=False):
+    """
+    Failures of the three connections in files, as lists of number of failures,
+    number of EPSPs, failed and successful amplitudes. With preprocess=True the
+    sweeps are filtered before the analysis (see load_traces).
+    """
+    amplitudes_collection, _, latencies_collection, noise = connection_features(files, preprocess)
+    noise_std = noise.groupby("connection")["peak_to_peak"].std()
 
     fails0, total, failed_amps0, correct_amps0 = calculate_failure_rate(
     amplitudes_collection[0], latencies_collection[0], noise_std.iloc[0]
@@ -408,4 +482,55 @@ def compute_failure_rate(files):
     conn0 = [fails0, total, failed_amps0, correct_amps0]
     conn1 = [fails1, _, failed_amps1, correct_amps1]
     conn2 = [fails2, _, failed_amps2, correct_amps2]
+
     return conn0, conn1, conn2
+
+
+@instrumentation.instrument()
+def failure_tables(files, preprocess=False):
+    """
+    Per-pulse breakdown of the failures of the connections in files (see
+    failure_classification.failure_table), as one DataFrame indexed by connection
+    (position in files) and pulse.
+    """
+    amplitudes_collection, _, latencies_collection, noise = connection_features(files, preprocess)
+    noise_std = noise.groupby("connection")["peak_to_peak"].std()
+
+    return pd.concat({
+        key: failure_table(amplitudes_collection[key], latencies_collection[key], noise_std[key])
+        for key in sorted(amplitudes_collection)
+    }, names=["connection"])
+
+
+@instrumentation.instrument()
+def connection_cis(files, n_resamples=10000, workers=1, preprocess=False, **kwargs):
+    """
+    Bootstrap confidence intervals of failure rate, amplitudes, rise times, latencies
+    and paired-pulse ratios of the connections in files (see bootstrap.bootstrap_cis),
+    as one DataFrame indexed by connection (position in files) and statistic.
+    """
+    amplitudes_collection, taus_collection, latencies_collection, noise = connection_features(files, preprocess)
+
+    cis = {}
+    for key in sorted(amplitudes_collection):
+        peak_to_peak = noise[noise["connection"] == key].sort_values("sweep")["peak_to_peak"]
+        cis[key] = bootstrap_cis(amplitudes_collection[key], taus_collection[key], latencies_collection[key],
+                                 peak_to_peak, n_resamples=n_resamples, workers=workers, **kwargs)
+
+    return pd.concat(cis, names=["connection"])
+
+
+def spontaneous_events(filename, threshold=4.0, preprocess=False, time_after=300):
+    """
+    Event table of the PSPs anywhere in the sweeps of a connection file, found by
+    template matching (see psp_detection). The template is the EPSP of the mean trace
+    after the first stimulation; the evoked column marks events starting within
+    time_after samples after a stimulation.
+    """
+    traces = load_traces(filename, preprocess)
+    template = psp_template(traces.mean(axis=0), STIMULATION_INDICES[0], time_after=time_after)
+    events = detect_events(traces, template, 1 / CONNECTION_FS, threshold)
+
+    since_stimulation = events["index"].to_numpy()[:, None] - STIMULATION_INDICES
+    events["evoked"] = ((since_stimulation >= 0) & (since_stimulation < time_after)).any(axis=1)
+    return events
@@ -0,0 +1,98 @@
+# Adaptive amplitude sweeps: f–I and I–V curves refined where they change fastest
+import multiprocessing
+
+import numpy as np
+import pandas as pd
+
+from stimuli import PULSE_PROTOCOL, init_pulse_worker, pulse_worker
+
+# Pulse of SquarePulses_stim, with the end of the pulse averaged for the steady-state voltage [ms]
+DEFAULT_PROTOCOL = dict(PULSE_PROTOCOL, steady_window=50)
+
+
+def measure(amplitude):
+    """
+    Firing rate and steady-state voltage of this worker's cell for one current step.
+
+    Returns
+    -------
+    dictionary with amplitude [nA], spike_count, rate [Hz] and steady_voltage [mV],
+    the mean voltage over the last steady_window ms of the pulse
+    """
+    protocol = pulse_worker["protocol"]
+    pulse_worker["stim"].amp = amplitude
+    rec_t = pulse_worker["start"].run(protocol["t_stop"])
+
+    pulse_start = protocol["delay"]
+    pulse_end = protocol["delay"] + protocol["duration"]
+    spikes = pulse_worker["spike_times"].as_numpy()
+    spike_count = int(np.sum((spikes >= pulse_start) & (spikes < pulse_end)))
+
+    time = rec_t.as_numpy()
+    window = (time >= pulse_end - protocol["steady_window"]) & (time < pulse_end)
+    return {
+        "amplitude": amplitude,
+        "spike_count": spike_count,
+        "rate": 1000.0 * spike_count / protocol["duration"],
+        "steady_voltage": float(np.mean(pulse_worker["rec_v"].as_numpy()[window])),
+    }
+
+
+def intervals_to_refine(curve, quantities, tolerance, min_step):
+    """
+    Midpoints of the intervals between consecutive amplitudes where one of the
+    quantities changes by more than tolerance times its whole range, and that are
+    still wider than min_step.
+    """
+    curve = curve.sort_values("amplitude")
+    amplitudes = curve["amplitude"].to_numpy()
+    refine = np.zeros(len(amplitudes) - 1, dtype=bool)
+    for quantity in quantities:
+        values = curve[quantity].to_numpy()
+        scale = np.ptp(values)
+        if scale > 0:
+            refine |= np.abs(np.diff(values)) > tolerance * scale
+    refine &= np.diff(amplitudes) > min_step
+    return list((amplitudes[:-1][refine] + amplitudes[1:][refine]) / 2)
+
+
+def adaptive_sweep(morph_filename, amplitudes=np.arange(0.01, 5.0, 0.5), quantities=("rate", "steady_voltage"),
+                   tolerance=0.05, min_step=0.01, max_rounds=10, workers=4, protocol=DEFAULT_PROTOCOL):
+    """
+    f–I and I–V curve of a morphology from a coarse amplitude grid refined in rounds.
+
+    Each round simulates, in parallel, the midpoints of the intervals where the firing
+    rate or the steady-state voltage changes by more than tolerance times its range,
+    so points concentrate around rheobase and other transitions. The sweep stops
+    when no interval needs refining (or after max_rounds). The amplitudes can then be
+    passed to stimuli.SquarePulses_stim to plot and save the traces.
+
+    Parameters
+    ----------
+    morph_filename : morphology file, as taken by instantiate_neuron.NEURON
+    amplitudes : initial amplitude grid [nA]
+    quantities : columns used to decide where to refine, "rate" and/or "steady_voltage"
+    tolerance : largest change between neighbouring points, as a fraction of the range
+    min_step : intervals narrower than this are not split further [nA]
+    max_rounds : maximum number of refinement rounds
+    workers : number of worker processes, each holding one instance of the cell
+    protocol : pulse timing, v_init, spike threshold and steady-state window
+
+    Returns
+    -------
+    DataFrame sorted by amplitude with amplitude, spike_count, rate, steady_voltage
+    and round (0 for the initial grid)
+    """
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=init_pulse_worker, initargs=(morph_filename, protocol)) as pool:
+        rows = [dict(row, round=0) for row in pool.map(measure, list(amplitudes), chunksize=1)]
+        curve = pd.DataFrame(rows)
+
+        for n in range(1, max_rounds + 1):
+            new_amplitudes = intervals_to_refine(curve, quantities, tolerance, min_step)
+            if not new_amplitudes:
+                break
+            rows = [dict(row, round=n) for row in pool.map(measure, new_amplitudes, chunksize=1)]
+            curve = pd.concat([curve, pd.DataFrame(rows)], ignore_index=True)
+
+    return curve.sort_values("amplitude", ignore_index=True)
@@ -0,0 +1,141 @@
+# Bootstrap confidence intervals of synaptic features, vectorized over resamples
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Resamples evaluated together, bounds the (resamples x sweeps x stimuli) failure masks
+CHUNK_SIZE = 1000
+
+
+def resample_indices(n_sweeps, n_resamples, rng):
+    """Sweep indices drawn with replacement (resamples x sweeps)"""
+    return rng.integers(0, n_sweeps, size=(n_resamples, n_sweeps))
+
+
+def index_counts(indices, n_sweeps):
+    """How many times every sweep appears in each resample (resamples x sweeps)"""
+    n_resamples = len(indices)
+    offsets = indices + n_sweeps * np.arange(n_resamples)[:, None]
+    return np.bincount(offsets.ravel(), minlength=n_resamples * n_sweeps).reshape(n_resamples, n_sweeps)
+
+
+def _weighted_mean(counts, values):
+    """Mean over the resampled sweeps of values (sweeps x stimuli), ignoring NaNs"""
+    finite = np.isfinite(values)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (counts @ np.where(finite, values, 0)) / (counts @ finite)
+
+
+def statistic_names(n_stimuli):
+    names = ["failure_rate"]
+    for feature in ("amplitude", "tau_rise", "latency"):
+        names += [f"{feature}_{k}" for k in range(1, n_stimuli + 1)]
+    names += [f"ppr_{k}" for k in range(2, n_stimuli + 1)]
+    return names
+
+
+def statistics(counts, amplitudes, tau_rise, latencies, peak_to_peak, amplitude_factor=1.5, latency_factor=2.5):
+    """
+    Features of every resample from its sweep counts, without looping over resamples.
+
+    The failure rate follows failure_classification.classify_failures, with the noise
+    level being the standard deviation of the baseline peak-to-peak noise over the
+    resampled sweeps, as in compute_failure_rate. Amplitude, rise time and latency are
+    the means per stimulus, and the paired-pulse ratio of stimulus k is its mean
+    amplitude over the one of the first stimulus.
+
+    Parameters
+    ----------
+    counts : (resamples x sweeps) number of draws of each sweep
+    amplitudes, tau_rise, latencies : (sweeps x stimuli) EPSP features
+    peak_to_peak : (sweeps) baseline peak-to-peak noise of every sweep
+
+    Returns
+    -------
+    2D array (resamples x statistics), columns named by statistic_names
+    """
+    counts = np.asarray(counts, dtype=float)
+    n_sweeps, n_stimuli = amplitudes.shape
+    n = counts.sum(axis=1)
+
+    # Weighted standard deviation with the same ddof=1 as pandas
+    mean_noise = counts @ peak_to_peak / n
+    variance = (counts @ peak_to_peak ** 2 / n - mean_noise ** 2) * n / (n - 1)
+    noise_std = np.sqrt(np.maximum(variance, 0))
+
+    latency_average = counts @ latencies.sum(axis=1) / (n * n_stimuli)
+
+    failed = ((amplitudes[None] < amplitude_factor * noise_std[:, None, None])
+              | (latencies[None] > latency_factor * latency_average[:, None, None]))
+    failure_rate = np.einsum("rs,rsp->r", counts, failed) / (n * n_stimuli)
+
+    mean_amplitude = _weighted_mean(counts, amplitudes)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ppr = mean_amplitude[:, 1:] / mean_amplitude[:, :1]
+
+    return np.column_stack([failure_rate, mean_amplitude, _weighted_mean(counts, tau_rise),
+                            _weighted_mean(counts, latencies), ppr])
+
+
+def _resample_chunk(args):
+    seed, n_resamples, features, kwargs = args
+    rng = np.random.default_rng(seed)
+    n_sweeps = len(features[0])
+    counts = index_counts(resample_indices(n_sweeps, n_resamples, rng), n_sweeps)
+    return statistics(counts, *features, **kwargs)
+
+
+def bootstrap_cis(amplitudes, tau_rise, latencies, peak_to_peak, n_resamples=10000, confidence=0.95,
+                  workers=1, seed=0, **kwargs):
+    """
+    Percentile bootstrap confidence intervals of the features of one connection.
+
+    Sweeps are resampled with replacement; each resample is a row of sweep indices,
+    turned into sweep counts so that all the features of a chunk of resamples come
+    from a few matrix products. Chunks get independent seeds, so the result does not
+    depend on the number of workers.
+
+    Parameters
+    ----------
+    amplitudes, tau_rise, latencies : (sweeps x stimuli) EPSP features, e.g. from
+                                      Relevant_functions.extract_all_amps_taus_latencies
+    peak_to_peak : (sweeps) baseline peak-to-peak noise, see noise_estimation
+    n_resamples : number of bootstrap resamples
+    confidence : confidence level of the intervals
+    workers : threads sharing the chunks of resamples (numpy releases the GIL in
+              the matrix products)
+    seed : seed of the random generator
+    kwargs : amplitude_factor and latency_factor of the failure classification
+
+    Returns
+    -------
+    DataFrame indexed by statistic with estimate (all sweeps), ci_low, ci_high and sd
+    """
+    features = tuple(np.atleast_2d(np.asarray(f, dtype=float)) for f in (amplitudes, tau_rise, latencies))
+    features += (np.asarray(peak_to_peak, dtype=float),)
+    n_sweeps, n_stimuli = features[0].shape
+
+    sizes = [CHUNK_SIZE] * (n_resamples // CHUNK_SIZE)
+    if n_resamples % CHUNK_SIZE:
+        sizes.append(n_resamples % CHUNK_SIZE)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(s, size, features, kwargs) for s, size in zip(seeds, sizes)]
+
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_resample_chunk, jobs))
+    else:
+        chunks = [_resample_chunk(job) for job in jobs]
+    samples = np.vstack(chunks)
+
+    alpha = (1 - confidence) / 2
+    estimate = statistics(np.ones((1, n_sweeps)), *features, **kwargs)[0]
+    low, high = np.nanquantile(samples, [alpha, 1 - alpha], axis=0)
+
+    return pd.DataFrame({
+        "estimate": estimate,
+        "ci_low": low,
+        "ci_high": high,
+        "sd": np.nanstd(samples, axis=0),
+    }, index=pd.Index(statistic_names(n_stimuli), name="statistic"))
@@ -0,0 +1,75 @@
+# Single 2D dataset layout for the connection_c*.h5 files
+#
+# The original files hold one top-level dataset per sweep (v0, v1, ...). Converted
+# files hold one dataset "sweeps" (sweeps x samples), chunked over all sweeps, whose
+# attributes keep the original dataset names and the sampling step. The readers below
+# accept both layouts.
+import os
+
+import h5py
+import numpy as np
+
+DATASET = "sweeps"
+
+CHUNK_SAMPLES = 1024
+
+
+def is_consolidated(f):
+    return DATASET in f and f[DATASET].ndim == 2
+
+
+def convert(filename, output=None, dt=0.0001, compression=None):
+    """
+    Rewrite a connection file with all its sweeps in one (sweeps x samples) dataset.
+
+    Rows follow the order of the original datasets (the order load_traces always used).
+    A chunk spans every sweep, so a time window across all sweeps is a single read.
+
+    Parameters
+    ----------
+    filename : connection file with one dataset per sweep
+    output : converted file, by default filename is replaced
+    dt : sampling step stored as attribute [s]
+    compression : optional HDF5 compression filter, e.g. "gzip"
+    """
+    with h5py.File(filename, "r") as f:
+        if is_consolidated(f):
+            return
+        names = list(f.keys())
+        traces = np.array([f[name][()] for name in names])
+
+    target = output or filename + ".tmp"
+    with h5py.File(target, "w") as f:
+        dataset = f.create_dataset(
+            DATASET, data=traces, compression=compression,
+            chunks=(traces.shape[0], min(CHUNK_SAMPLES, traces.shape[1])),
+        )
+        dataset.attrs["sweep_names"] = names
+        dataset.attrs["dt"] = dt
+    if output is None:
+        os.replace(target, filename)
+
+
+def read_sweeps(filename, start=None, stop=None):
+    """All sweeps of a connection file, optionally only samples start:stop (sweeps x samples)"""
+    window = slice(start, stop)
+    with h5py.File(filename, "r") as f:
+        if is_consolidated(f):
+            return f[DATASET][:, window]
+        return np.array([f[name][window] for name in f.keys()])
+
+
+def read_window(filename, index, before, after):
+    """
+    Samples index - before to index + after of every sweep (sweeps x samples), e.g.
+    the window around one stimulation. One hyperslab read on converted files.
+    """
+    return read_sweeps(filename, max(index - before, 0), index + after)
+
+
+def sweep_names(filename):
+    """Names of the original per-sweep datasets, in row order"""
+    with h5py.File(filename, "r") as f:
+        if is_consolidated(f):
+            return [str(name) for name in f[DATASET].attrs["sweep_names"]]
+        return list(f.keys())
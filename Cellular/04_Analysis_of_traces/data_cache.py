@@ -0,0 +1,98 @@
+# Bounded LRU cache of decoded arrays, filled in the background for the analysis widgets
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import instrumentation
+
+
+def nbytes(value):
+    """Memory used by the arrays of a value (array, or tuple/list/dict of arrays)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(v) for v in value)
+    return 0
+
+
+class DataCache:
+    """
+    Least-recently-used cache of loaded data, bounded by the memory of its arrays.
+
+    get(key, loader) returns the cached value or calls loader(). prefetch(key, loader)
+    does the same in a background thread, so a later get only waits for a load
+    that is still running, and returns at once if it is finished.
+
+        cache.prefetch(("connection", "connection_c2"), lambda: load_traces("connection_c2.h5"))
+        traces = cache.get(("connection", "connection_c2"), lambda: load_traces("connection_c2.h5"))
+    """
+
+    def __init__(self, max_bytes=512 * 2 ** 20, workers=1):
+        self.max_bytes = max_bytes
+        self.values = OrderedDict()
+        self.sizes = {}
+        self.pending = {}  # key -> Future of a load in progress
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.values
+
+    @property
+    def total_bytes(self):
+        with self.lock:
+            return sum(self.sizes.values())
+
+    def _store(self, key, value):
+        with self.lock:
+            self.values[key] = value
+            self.sizes[key] = nbytes(value)
+            self.values.move_to_end(key)
+            # Evict the least recently used values, always keeping the newest one
+            while len(self.values) > 1 and sum(self.sizes.values()) > self.max_bytes:
+                old, _ = self.values.popitem(last=False)
+                del self.sizes[old]
+
+    def _load(self, key, loader):
+        try:
+            value = loader()
+            self._store(key, value)
+            return value
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+
+    def get(self, key, loader):
+        """Cached value of key, loaded with loader() if needed"""
+        with self.lock:
+            if key in self.values:
+                self.values.move_to_end(key)
+                instrumentation.add("cache_hits")
+                return self.values[key]
+            future = self.pending.get(key)
+        if future is not None:
+            instrumentation.add("cache_prefetched")
+            return future.result()
+        instrumentation.add("cache_misses")
+        return self._load(key, loader)
+
+    def prefetch(self, key, loader):
+        """Start loading key in the background unless it is cached or already loading"""
+        with self.lock:
+            if key in self.values or key in self.pending:
+                return
+            self.pending[key] = self.executor.submit(self._load, key, loader)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+            self.sizes.clear()
+
+
+# Shared by the widgets of Relevant_functions
+cache = DataCache()
@@ -0,0 +1,133 @@
+# Catalog of the experiment files of a data directory, kept in a JSON manifest
+import json
+import os
+import re
+
+import h5py
+import pandas as pd
+
+MANIFEST_NAME = "data_manifest.json"
+
+# exp_IV_ch6_35.dat: protocol exp_IV, channel 6 (ch6 response, ch7 stimulus), sweep 35
+DAT_PATTERN = re.compile(r"^(?P<protocol>.+)_ch(?P<channel>\d+)_(?P<sweep>\d+)\.dat$")
+
+EXTENSIONS = (".dat", ".h5")
+
+
+def parse_name(name):
+    """Protocol, channel and sweep number encoded in a data file name (None when absent)"""
+    match = DAT_PATTERN.match(name)
+    if match:
+        return {"protocol": match["protocol"], "channel": int(match["channel"]), "sweep": int(match["sweep"])}
+    return {"protocol": os.path.splitext(name)[0], "channel": None, "sweep": None}
+
+
+def inspect_file(path):
+    """Manifest entry of one file: name fields, size, dtype, samples and H5 dataset shapes"""
+    name = os.path.basename(path)
+    stat = os.stat(path)
+    entry = dict(parse_name(name), name=name, kind=os.path.splitext(name)[1][1:],
+                 size=stat.st_size, mtime=stat.st_mtime)
+
+    if entry["kind"] == "dat":
+        # Interleaved float64 time and value samples, see Relevant_functions.get_data
+        entry["dtype"] = "float64"
+        entry["n_samples"] = stat.st_size // (2 * 8)
+    else:
+        datasets = {}
+        with h5py.File(path, "r") as f:
+            def add(key, obj):
+                if isinstance(obj, h5py.Dataset):
+                    datasets[key] = {"shape": list(obj.shape), "dtype": str(obj.dtype)}
+            f.visititems(add)
+        entry["datasets"] = datasets
+        dtypes = {d["dtype"] for d in datasets.values()}
+        entry["dtype"] = dtypes.pop() if len(dtypes) == 1 else None
+        lengths = {d["shape"][-1] for d in datasets.values() if d["shape"]}
+        entry["n_samples"] = lengths.pop() if len(lengths) == 1 else None
+
+    return entry
+
+
+class Catalog:
+    """
+    Manifest of the .dat and .h5 files of a directory, saved as data_manifest.json in it.
+
+    update() lists the directory and only opens files that are new or whose size or
+    modification time changed, so repeated calls are cheap. Loaders and widgets then
+    query the manifest instead of globbing and opening files.
+
+        catalog = Catalog("data")
+        catalog.files("exp_IV", channel=6)  # response sweeps, ordered by sweep number
+    """
+
+    def __init__(self, directory=".", manifest=MANIFEST_NAME):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, manifest)
+        self.entries = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.entries = {entry["name"]: entry for entry in json.load(f)}
+
+    def update(self):
+        """Rescan the directory, inspect new or changed files and save the manifest. Returns the number of changes."""
+        present = {}
+        with os.scandir(self.directory) as it:
+            for item in it:
+                if item.is_file() and item.name.endswith(EXTENSIONS):
+                    present[item.name] = item.stat()
+
+        changes = 0
+        for name in list(self.entries):
+            if name not in present:
+                del self.entries[name]
+                changes += 1
+        for name, stat in present.items():
+            entry = self.entries.get(name)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+                self.entries[name] = inspect_file(os.path.join(self.directory, name))
+                changes += 1
+
+        if changes or not os.path.exists(self.manifest_path):
+            self.save()
+        return changes
+
+    def save(self):
+        with open(self.manifest_path, "w") as f:
+            json.dump(sorted(self.entries.values(), key=lambda e: e["name"]), f, indent=1)
+
+    def query(self, protocol=None, channel=None, kind=None):
+        """Entries matching the given fields, ordered by protocol, channel and sweep number"""
+        entries = [
+            e for e in self.entries.values()
+            if (protocol is None or e["protocol"] == protocol)
+            and (channel is None or e["channel"] == channel)
+            and (kind is None or e["kind"] == kind)
+        ]
+        return sorted(entries, key=lambda e: (e["protocol"], e["channel"] or 0, e["sweep"] or 0, e["name"]))
+
+    def files(self, protocol=None, channel=None, kind=None):
+        """Paths of the matching files, ordered by sweep number"""
+        return [os.path.normpath(os.path.join(self.directory, e["name"])) for e in self.query(protocol, channel, kind)]
+
+    def protocols(self, kind=None, pattern=None):
+        """Sorted protocol names, optionally only those matching the regular expression pattern"""
+        names = {e["protocol"] for e in self.query(kind=kind)}
+        if pattern is not None:
+            names = {name for name in names if re.match(pattern, name)}
+        return sorted(names)
+
+    def table(self):
+        """The manifest as a DataFrame, one row per file"""
+        return pd.DataFrame(self.query()).drop(columns="datasets", errors="ignore")
+
+
+# Catalogs already loaded in this session, by directory
+_catalogs = {}
+
+
+def catalog(directory="."):
+    """Catalog of directory, loaded once per session, update() picks up changed files"""
+    if directory not in _catalogs:
+        _catalogs[directory] = Catalog(directory)
+    return _catalogs[directory]
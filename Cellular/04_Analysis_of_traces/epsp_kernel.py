@@ -0,0 +1,66 @@
+# Fused EPSP kernel: 5%, 20% and 80% rise crossings of a batch of PSP windows
+import numpy as np
+
+# Fractions of the amplitude, measured from the minimum of the window
+RISE_LEVELS = {"five": 0.05, "twenty": 0.2, "eighty": 0.8}
+
+
+def epsp_crossings(psp_traces, psp_time):
+    """
+    Finds the first crossing of the 5%, 20% and 80% rise levels for a batch of PSP
+    windows in a single pass. The first sample at or above a level is the first one
+    where the running maximum reaches it, and the crossing time is linearly
+    interpolated between that sample and the previous one.
+
+    Parameters
+    ----------
+    psp_traces : array (... x samples) with voltage windows [V]
+    psp_time : array with the times of the windows, broadcastable to psp_traces [s]
+
+    Returns
+    -------
+    levels : array (... x 3) with the voltage at 5%, 20% and 80% of the amplitude
+    times : array (... x 3) with the interpolated crossing times [s]
+    amplitude : array (...) with the max - min amplitude of each window [V]
+    """
+    psp_traces = np.asarray(psp_traces, dtype=float)
+    psp_time = np.broadcast_to(np.asarray(psp_time, dtype=float), psp_traces.shape)
+
+    max_psp = psp_traces.max(axis=-1)
+    min_psp = psp_traces.min(axis=-1)
+    amplitude = np.abs(max_psp - min_psp)
+    fractions = np.array(list(RISE_LEVELS.values()))
+    levels = min_psp[..., None] + amplitude[..., None] * fractions
+
+    # Number of samples whose running maximum is still below each level
+    running_max = np.maximum.accumulate(psp_traces, axis=-1)
+    index = (running_max[..., None, :] < levels[..., None]).sum(axis=-1)
+    previous = np.maximum(index - 1, 0)
+
+    v1 = np.take_along_axis(psp_traces, index, axis=-1)
+    v0 = np.take_along_axis(psp_traces, previous, axis=-1)
+    t1 = np.take_along_axis(psp_time, index, axis=-1)
+    t0 = np.take_along_axis(psp_time, previous, axis=-1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fraction = np.where(index > 0, (levels - v0) / (v1 - v0), 0.0)
+    times = t0 + np.nan_to_num(fraction) * (t1 - t0)
+
+    return levels, times, amplitude
+
+
+def epsp_features(psp_traces, psp_time, stimulation_time):
+    """
+    Batch version of extract_tau_latency.
+
+    Returns
+    -------
+    amplitude : array with EPSP amplitudes [mV]
+    tau_rise : array with the time between the 20% and 80% crossings [s]
+    latency : array with the time between stimulation and the 5% crossing [s]
+    """
+    _, times, amplitude = epsp_crossings(psp_traces, psp_time)
+    tau_rise = np.abs(times[..., 1] - times[..., 2])
+    latency = np.abs(times[..., 0] - stimulation_time)
+
+    return amplitude * 1000, tau_rise, latency
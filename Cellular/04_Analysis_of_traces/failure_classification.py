@@ -0,0 +1,64 @@
+# Failure classification of EPSPs on (sweeps x stimuli) arrays with boolean masks
+import numpy as np
+import pandas as pd
+
+
+def classify_failures(amplitudes, latencies, noise_std, amplitude_factor=1.5, latency_factor=2.5):
+    """
+    An EPSP is a failure when its amplitude is below amplitude_factor times the noise
+    or its latency is above latency_factor times the average latency of the connection.
+
+    Parameters
+    ----------
+    amplitudes : 2D array (sweeps x stimuli) with EPSP amplitudes [mV]
+    latencies : 2D array (sweeps x stimuli) with EPSP latencies [s]
+    noise_std : noise level of the connection [mV]
+
+    Returns
+    -------
+    dictionary with
+    failed : boolean mask (sweeps x stimuli), True for failures
+    success : boolean mask (sweeps x stimuli), True for successful transmissions
+    failure_rate : failure rate for each stimulus position
+    failures, total : number of failures and of EPSPs
+    mean_amplitude_success, mean_amplitude_failed : mean amplitude of each class [mV]
+    """
+    amplitudes = np.atleast_2d(amplitudes)
+    latencies = np.atleast_2d(latencies)
+    latency_average = np.mean(latencies)
+
+    failed = (amplitudes < amplitude_factor * noise_std) | (latencies > latency_factor * latency_average)
+    success = ~failed
+
+    return {
+        "failed": failed,
+        "success": success,
+        "failure_rate": failed.mean(axis=0),
+        "failures": int(failed.sum()),
+        "total": failed.size,
+        "mean_amplitude_success": amplitudes[success].mean() if success.any() else np.nan,
+        "mean_amplitude_failed": amplitudes[failed].mean() if failed.any() else np.nan,
+    }
+
+
+def failure_table(amplitudes, latencies, noise_std, **kwargs):
+    """
+    Per-stimulus breakdown of classify_failures as a DataFrame, with one row per
+    stimulus position (pulse 1, 2, ...) and the mean amplitude and latency of the
+    successful EPSPs at that position.
+    """
+    amplitudes = np.atleast_2d(amplitudes)
+    latencies = np.atleast_2d(latencies)
+    failed = classify_failures(amplitudes, latencies, noise_std, **kwargs)["failed"]
+    success = ~failed
+    n_success = success.sum(axis=0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return pd.DataFrame({
+            "pulse": np.arange(1, amplitudes.shape[1] + 1),
+            "failures": failed.sum(axis=0),
+            "total": len(failed),
+            "failure_rate": failed.mean(axis=0),
+            "mean_amplitude": np.where(success, amplitudes, 0).sum(axis=0) / n_success,
+            "mean_latency": np.where(success, latencies, 0).sum(axis=0) / n_success,
+        }).set_index("pulse")
@@ -1,11 +1,14 @@
 # Define NEURON class with specific morphology and channel behavior
 from neuron import h
+import instrumentation
 
 class NEURON:
+    @instrumentation.instrument("NEURON.__init__")
     def __init__(self, filename):
         self.build_morphology(filename)
         self.define_biophysics()
         
+    @instrumentation.instrument("NEURON.build_morphology")
     def build_morphology(self, filename):
         """
         Loads a 3D morphology of the neuron
@@ -41,6 +44,7 @@ class NEURON:
             #if 'axon' in sec.name():
             #    self.axonal.append(sec)
     
+    @instrumentation.instrument("NEURON.define_biophysics")
     def define_biophysics(self):
         """
         Distributes passive mechanisms and the different types
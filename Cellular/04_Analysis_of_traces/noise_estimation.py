@@ -0,0 +1,55 @@
+# Pre-stimulus baseline noise of all sweeps, computed in one array operation
+import numpy as np
+import pandas as pd
+
+
+def baseline_noise(traces, stimulation_index, time_before=50):
+    """
+    Baseline statistics of every sweep over the window that ends time_before samples
+    before the first stimulation, i.e. the same window compute_noise uses.
+
+    Parameters
+    ----------
+    traces : array (... x samples) with voltage traces [V]
+    stimulation_index : index of the first stimulation
+    time_before : samples left out before the stimulation
+
+    Returns
+    -------
+    dictionary of arrays with the leading shape of traces, all in [mV]:
+    peak_to_peak, sd and mad (median absolute deviation scaled to match the SD of
+    Gaussian noise)
+    """
+    baseline = np.asarray(traces)[..., : stimulation_index - time_before] * 1000
+    median = np.median(baseline, axis=-1, keepdims=True)
+
+    return {
+        "peak_to_peak": np.ptp(baseline, axis=-1),
+        "sd": np.std(baseline, axis=-1),
+        "mad": 1.4826 * np.median(np.abs(baseline - median), axis=-1),
+    }
+
+
+def connection_noise(traces_collection, stimulation_index, time_before=50):
+    """
+    Baseline noise for the sweeps of several connections, each reduced in one array
+    operation, so connections can have different sweep lengths.
+
+    Parameters
+    ----------
+    traces_collection : dictionary {connection: 2D array (sweeps x samples)}
+    stimulation_index : index of the first stimulation
+    time_before : samples left out before the stimulation
+
+    Returns
+    -------
+    DataFrame with one row per sweep: connection, sweep, peak_to_peak, sd, mad [mV]
+    """
+    frames = []
+    for key, traces in traces_collection.items():
+        noise = pd.DataFrame(baseline_noise(np.atleast_2d(traces), stimulation_index, time_before))
+        noise.insert(0, "connection", key)
+        noise.insert(1, "sweep", np.arange(len(noise)))
+        frames.append(noise)
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,167 @@
+# Batch preprocessing of (sweeps x samples) arrays: drift and baseline removal, zero-phase filters
+import hashlib
+import json
+import os
+import warnings
+
+import h5py
+import numpy as np
+from scipy import signal
+
+# Settings per protocol. Frequencies in Hz, windows in samples. The .dat protocols keep
+# their absolute voltage (voltage_base and spike thresholds depend on it).
+PROTOCOL_CONFIGS = {
+    "connection": {"lowpass": 1000.0, "baseline": (0, 950)},
+    "exp_IV": {"lowpass": 3000.0},
+    "exp_FirePattern": {"lowpass": 3000.0},
+    "exp_APWaveform": {"lowpass": 5000.0},
+}
+
+CHUNK_SWEEPS = 64
+
+
+def config_for(protocol):
+    """Settings of a protocol; connection_c1, connection_c2... share the "connection" entry"""
+    if protocol in PROTOCOL_CONFIGS:
+        return PROTOCOL_CONFIGS[protocol]
+    if protocol.startswith("connection"):
+        return PROTOCOL_CONFIGS["connection"]
+    return {}
+
+
+def _window_mean(sweeps, window):
+    """Mean of the recorded samples of a window, NaN padding left out"""
+    start, stop = window
+    with warnings.catch_warnings():
+        # A window entirely in the padding gives NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(sweeps[..., start:stop], axis=-1, keepdims=True)
+
+
+def _filter_recorded(filter_rows, sweeps):
+    """
+    filter_rows applied to the recorded part of every sweep. Sweeps padded with NaN
+    at the end (see Relevant_functions.load_sweeps) are filtered up to their first
+    NaN, one call per distinct length, and keep their padding: a zero-phase filter
+    would otherwise spread a single NaN over the whole sweep.
+    """
+    flat = sweeps.reshape(-1, sweeps.shape[-1])
+    missing = np.isnan(flat)
+    lengths = np.where(missing.any(axis=-1), missing.argmax(axis=-1), flat.shape[-1])
+
+    out = np.full(flat.shape, np.nan)
+    for length in np.unique(lengths[lengths > 0]):
+        rows = lengths == length
+        out[rows, :length] = filter_rows(flat[rows, :length])
+    return out.reshape(sweeps.shape)
+
+
+def preprocess_chunk(sweeps, fs, lowpass=None, notch=None, notch_q=30.0, baseline=None, drift=None, order=4):
+    """
+    Preprocess an in-memory array (..., samples) in a few array operations.
+
+    Parameters
+    ----------
+    sweeps : array (..., samples)
+    fs : sampling rate [Hz]
+    lowpass : cutoff of a Butterworth low-pass filter [Hz]
+    notch : frequency removed by a notch filter, e.g. 50 [Hz]
+    notch_q : quality factor of the notch
+    baseline : (start, stop) samples whose mean is subtracted from every sweep
+    drift : two (start, stop) sample windows; the straight line through their means is
+            subtracted from every sweep, removing a slow linear drift
+    order : order of the low-pass filter
+
+    Filters run forward and backward (zero phase), so EPSP onsets and peaks keep
+    their timing. NaN padding at the end of shorter sweeps is kept and left out of
+    the filters and the window means.
+    """
+    sweeps = np.array(sweeps, dtype=float)
+
+    if drift is not None:
+        (a, b), (c, d) = drift
+        first, last = _window_mean(sweeps, (a, b)), _window_mean(sweeps, (c, d))
+        centres = (a + b - 1) / 2, (c + d - 1) / 2
+        slope = (last - first) / (centres[1] - centres[0])
+        sweeps -= first + slope * (np.arange(sweeps.shape[-1]) - centres[0])
+    if baseline is not None:
+        sweeps -= _window_mean(sweeps, baseline)
+
+    if notch is not None:
+        b, a = signal.iirnotch(notch, notch_q, fs)
+        sweeps = _filter_recorded(lambda x: signal.filtfilt(b, a, x, axis=-1), sweeps)
+    if lowpass is not None:
+        sos = signal.butter(order, lowpass, btype="low", fs=fs, output="sos")
+        sweeps = _filter_recorded(lambda x: signal.sosfiltfilt(sos, x, axis=-1), sweeps)
+
+    return sweeps
+
+
+def preprocess(sweeps, fs, out=None, chunk_sweeps=CHUNK_SWEEPS, **settings):
+    """
+    preprocess_chunk applied to blocks of chunk_sweeps rows of a (sweeps x samples)
+    array. sweeps and out can be h5py datasets, so data larger than memory is read,
+    processed and written one block at a time.
+
+    Returns
+    -------
+    out, a new array by default
+    """
+    if out is None:
+        out = np.empty(sweeps.shape)
+    for start in range(0, sweeps.shape[0], chunk_sweeps):
+        stop = min(start + chunk_sweeps, sweeps.shape[0])
+        out[start:stop] = preprocess_chunk(sweeps[start:stop], fs, **settings)
+    return out
+
+
+def settings_key(fs, settings):
+    """Short hash identifying the sampling rate and settings"""
+    text = json.dumps({"fs": fs, **settings}, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:12]
+
+
+def cached(name, sources, fs, settings, load, in_memory=True):
+    """
+    Preprocessed sweeps cached in a preprocessed/ folder next to the raw files.
+
+    The cache is rebuilt when the settings or any source file (size or modification
+    time) change. It is written block by block (see preprocess), and with
+    in_memory=False only the blocks that are indexed are read back.
+
+    Parameters
+    ----------
+    name : name of the data, e.g. "connection_c1" or "exp_IV_response"
+    sources : raw files the data comes from
+    fs : sampling rate [Hz]
+    settings : keyword arguments of preprocess_chunk
+    load : function returning the raw (sweeps x samples) array or h5py dataset
+    in_memory : False returns the cached h5py dataset, read-only and open until
+                dataset.file.close()
+
+    Returns
+    -------
+    preprocessed array (sweeps x samples), or h5py dataset
+    """
+    directory = os.path.join(os.path.dirname(sources[0]), "preprocessed")
+    path = os.path.join(directory, f"{name}.{settings_key(fs, settings)}.h5")
+    stamp = json.dumps([[os.path.getsize(f), os.path.getmtime(f)] for f in sources])
+
+    valid = False
+    if os.path.exists(path):
+        with h5py.File(path, "r") as f:
+            valid = f.attrs.get("sources") == stamp
+
+    if not valid:
+        os.makedirs(directory, exist_ok=True)
+        raw = load()
+        with h5py.File(path, "w") as f:
+            f.attrs["sources"] = stamp
+            f.attrs["settings"] = json.dumps({"fs": fs, **settings}, sort_keys=True)
+            dataset = f.create_dataset("sweeps", shape=raw.shape, dtype="float64", chunks=True)
+            preprocess(raw, fs, out=dataset, **settings)
+
+    if in_memory:
+        with h5py.File(path, "r") as f:
+            return f["sweeps"][()]
+    return h5py.File(path, "r")["sweeps"]
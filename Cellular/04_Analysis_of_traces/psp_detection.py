@@ -0,0 +1,132 @@
+# Detection of spontaneous PSPs over whole sweeps by FFT template matching
+import numpy as np
+import pandas as pd
+from scipy import signal
+
+from epsp_kernel import epsp_crossings
+
+
+def psp_template(mean_trace, stimulation_index, time_before=50, time_after=300):
+    """
+    EPSP template from the mean trace around one stimulation, e.g. the mean trace of
+    choose_connection. It starts at the 5% rise crossing (onset), is zero there and
+    its peak is 1 (-1 for hyperpolarizing PSPs).
+
+    Parameters
+    ----------
+    mean_trace : array (samples) [V]
+    stimulation_index : index of the stimulation
+    time_before, time_after : window around the stimulation, as in extract_PSP_window
+
+    Returns
+    -------
+    array (template samples)
+    """
+    window = np.asarray(mean_trace[stimulation_index - time_before:stimulation_index + time_after], dtype=float)
+    window = window - window[:time_before].mean()
+    sign = 1.0 if window.max() >= -window.min() else -1.0
+
+    _, times, _ = epsp_crossings(sign * window, np.arange(len(window)))
+    onset = int(np.floor(times[0]))
+    template = window[onset:] - window[onset]
+    return template / np.abs(template).max()
+
+
+def _sliding_sum(x, n):
+    """Sums of x over every window of n samples along the last axis"""
+    cumulative = np.cumsum(x, axis=-1)
+    cumulative = np.concatenate([np.zeros(x.shape[:-1] + (1,)), cumulative], axis=-1)
+    return cumulative[..., n:] - cumulative[..., :-n]
+
+
+def template_fit(sweeps, template):
+    """
+    Fit of scale * template + offset at every position of every sweep, with the
+    detection criterion of Clements and Bekkers (1997): scale over the standard
+    error of the fit. The correlation with the template is an FFT (overlap-add)
+    convolution over all sweeps at once and the other sums are running sums, so
+    the cost grows linearly with the recording length.
+
+    Parameters
+    ----------
+    sweeps : array (... x samples) [V]
+    template : array (template samples), e.g. from psp_template
+
+    Returns
+    -------
+    scale, criterion : arrays (... x samples - template samples + 1); position i
+                       fits the template starting at sample i
+    """
+    sweeps = np.asarray(sweeps, dtype=float)
+    # Removing the mean of every sweep keeps the running sums of squares precise
+    sweeps = sweeps - sweeps.mean(axis=-1, keepdims=True)
+    template = np.asarray(template, dtype=float)
+    n = len(template)
+    sum_t, sum_t2 = template.sum(), (template ** 2).sum()
+
+    kernel = template[::-1].reshape((1,) * (sweeps.ndim - 1) + (n,))
+    sum_ty = signal.oaconvolve(sweeps, kernel, mode="valid", axes=-1)
+    sum_y = _sliding_sum(sweeps, n)
+    sum_y2 = _sliding_sum(sweeps ** 2, n)
+
+    scale = (sum_ty - sum_t * sum_y / n) / (sum_t2 - sum_t ** 2 / n)
+    offset = (sum_y - scale * sum_t) / n
+    sse = (sum_y2 + scale ** 2 * sum_t2 + n * offset ** 2
+           - 2 * (scale * sum_ty + offset * sum_y - scale * offset * sum_t))
+    standard_error = np.sqrt(np.maximum(sse, 0) / (n - 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        criterion = np.where(standard_error > 0, scale / standard_error, 0.0)
+
+    return scale, criterion
+
+
+def detect_events(sweeps, template, dt, threshold=4.0, min_interval=None):
+    """
+    Spontaneous PSPs of all sweeps: peaks of the detection criterion above threshold.
+    The criterion stays high while the template slides along the decay of an event,
+    so by default a sweep gets at most one event per template length.
+
+    Parameters
+    ----------
+    sweeps : array (sweeps x samples) [V], e.g. load_traces output
+    template : array (template samples), e.g. from psp_template
+    dt : sampling step [s]
+    threshold : smallest detection criterion of an event
+    min_interval : smallest distance between events of a sweep [samples], by
+                   default the template length
+
+    Returns
+    -------
+    DataFrame with one row per event: sweep, index (sample of the onset, where the
+    template starts), onset and peak time [s], amplitude (fitted template scale at its
+    peak) [mV], tau_rise (20% to 80% crossing) [s] and criterion
+    """
+    sweeps = np.atleast_2d(np.asarray(sweeps, dtype=float))
+    template = np.asarray(template, dtype=float)
+    n_samples = sweeps.shape[1]
+    peak = int(np.argmax(np.abs(template)))
+    if min_interval is None:
+        min_interval = len(template)
+
+    scale, criterion = template_fit(sweeps, template)
+
+    # One peak search over all sweeps, separated by padding so that no min_interval
+    # spans two sweeps
+    padded = np.pad(criterion, ((0, 0), (0, min_interval + 1)), constant_values=-np.inf)
+    positions, _ = signal.find_peaks(padded.ravel(), height=threshold, distance=min_interval)
+    sweep, index = np.divmod(positions, padded.shape[1])
+
+    # Rise of every event, from its onset to the template peak
+    samples = np.clip(index[:, None] + np.arange(peak + 1), 0, n_samples - 1)
+    windows = sweeps[sweep[:, None], samples] * np.sign(template[peak])
+    _, times, _ = epsp_crossings(windows, samples * dt)
+
+    return pd.DataFrame({
+        "sweep": sweep,
+        "index": index,
+        "onset": index * dt,
+        "peak_time": (index + peak) * dt,
+        "amplitude": scale[sweep, index] * np.abs(template[peak]) * 1000,
+        "tau_rise": np.abs(times[:, 2] - times[:, 1]),
+        "criterion": criterion[sweep, index],
+    })
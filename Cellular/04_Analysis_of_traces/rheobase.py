@@ -0,0 +1,98 @@
+# Rheobase search: bracketing and bisection on spike occurrence with parallel probes
+import multiprocessing
+
+import pandas as pd
+
+from stimuli import PULSE_PROTOCOL, init_pulse_worker, pulse_worker
+
+
+def spikes_at(amplitude):
+    """True if the current step of amplitude [nA] makes the cell of this worker fire"""
+    stim, spike, start = pulse_worker["stim"], pulse_worker["spike"], pulse_worker["start"]
+    stim.amp = amplitude
+    # The run ends at the first spike, the pre-stimulus period comes from the checkpoint
+    start.run(pulse_worker["protocol"]["t_stop"], conditions=[spike])
+    return spike.met()
+
+
+def find_rheobase(morph_filename, low=0.0, high=1.0, tolerance=0.01, probes=4,
+                  protocol=PULSE_PROTOCOL, max_high=20.0):
+    """
+    Smallest step amplitude that makes the cell spike, to within tolerance.
+
+    Every iteration evaluates `probes` amplitudes at once in worker processes, each
+    holding its own instance of the cell. While no spike is seen the upper amplitudes
+    grow geometrically to bracket the rheobase, then the bracket is split into
+    probes + 1 parts per iteration (plain bisection with probes=1).
+
+    Parameters
+    ----------
+    morph_filename : morphology file, as taken by instantiate_neuron.NEURON
+    low, high : initial guess of amplitudes without and with spikes [nA]
+    tolerance : width of the final bracket [nA]
+    probes : amplitudes simulated in parallel per iteration
+    protocol : pulse timing, v_init and spike threshold (see stimuli.PULSE_PROTOCOL)
+    max_high : give up when no spike is found up to this amplitude [nA]
+
+    Returns
+    -------
+    dictionary with
+    rheobase : smallest amplitude seen spiking [nA]
+    low : largest amplitude seen not spiking [nA]
+    iterations, runs : number of parallel rounds and of simulations
+    probes : DataFrame with iteration, amplitude and spiked for every run
+    """
+    history = []
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(probes, initializer=init_pulse_worker,
+                      initargs=(morph_filename, protocol, True)) as pool:
+
+        def evaluate(amplitudes):
+            """Index of the first spiking amplitude, None if none spiked"""
+            iteration = history[-1]["iteration"] + 1 if history else 0
+            spiked = pool.map(spikes_at, amplitudes, chunksize=1)
+            history.extend({"iteration": iteration, "amplitude": a, "spiked": s}
+                           for a, s in zip(amplitudes, spiked))
+            return spiked.index(True) if any(spiked) else None
+
+        # Bracketing: amplitudes doubling from high until one spikes, clipped to max_high
+        while True:
+            amplitudes = list(dict.fromkeys(min(high * 2 ** i, max_high) for i in range(probes)))
+            first = evaluate(amplitudes)
+            if first is not None:
+                low = amplitudes[first - 1] if first else low
+                high = amplitudes[first]
+                break
+            if amplitudes[-1] >= max_high:
+                raise ValueError(f"{morph_filename} does not spike up to {max_high} nA")
+            low, high = amplitudes[-1], 2 * amplitudes[-1]
+
+        # Bisection: probes amplitudes evenly spread inside the bracket
+        while high - low > tolerance:
+            step = (high - low) / (probes + 1)
+            amplitudes = [low + step * (i + 1) for i in range(probes)]
+            first = evaluate(amplitudes)
+            if first is None:
+                low = amplitudes[-1]
+            else:
+                low = amplitudes[first - 1] if first else low
+                high = amplitudes[first]
+
+    probes_table = pd.DataFrame(history)
+    return {
+        "rheobase": high,
+        "low": low,
+        "iterations": int(probes_table["iteration"].max()) + 1,
+        "runs": len(probes_table),
+        "probes": probes_table,
+    }
+
+
+def rheobase_table(morph_filenames, **kwargs):
+    """find_rheobase for several morphologies, as a DataFrame with one row per file"""
+    rows = []
+    for filename in morph_filenames:
+        result = find_rheobase(filename, **kwargs)
+        rows.append({"morphology": filename, "rheobase": result["rheobase"], "low": result["low"],
+                     "iterations": result["iterations"], "runs": result["runs"]})
+    return pd.DataFrame(rows)
@@ -1,15 +1,76 @@
 import csv
+import gc
+import json
+import os
+from itertools import zip_longest
 import matplotlib.pyplot as plt
 from neuron import h
 import instantiate_neuron as IN
+import instrumentation
+from checkpoint import Checkpoint
+from early_stop import SpikeCount
+
+# Current step of SquarePulses_stim, also simulated by the rheobase and f-I searches
+PULSE_PROTOCOL = {
+    "delay": 100,  # ms
+    "duration": 300,  # ms
+    "t_stop": 500,  # ms
+    "v_init": -65,  # mV
+    "threshold": -20.0,  # mV, spike detection at the soma
+}
+
+# Cell set up by this worker process of an amplitude search, reused between amplitudes
+pulse_worker = {}
+
+
+def init_pulse_worker(morph_filename, protocol=PULSE_PROTOCOL, stop_at_spike=False):
+    """
+    Worker process initializer of the amplitude searches (rheobase, adaptive_sweep):
+    instantiates the cell once with the pulse clamp at the soma, the soma voltage and
+    spike time recordings and a checkpoint at the pulse onset, kept in pulse_worker.
+    With stop_at_spike, pulse_worker["spike"] is a SpikeCount condition that ends a
+    run at the first spike.
+    """
+    # A cell set up before (e.g. in the main process) must be freed before the save
+    pulse_worker.clear()
+    gc.collect()
+
+    cell = IN.NEURON(morph_filename)
+    soma = cell.somatic[0](0.5)
+    stim = h.IClamp(soma)
+    stim.delay = protocol["delay"]
+    stim.dur = protocol["duration"]
+    stim.amp = 0
+
+    rec_v = h.Vector().record(soma._ref_v)
+    spike_times = h.Vector()
+    netcon = h.NetCon(soma._ref_v, None, sec=soma.sec)
+    netcon.threshold = protocol["threshold"]
+    netcon.record(spike_times)
+    # Created before the checkpoint, SaveState also stores NetCons
+    spike = SpikeCount(soma, 1, protocol["threshold"]) if stop_at_spike else None
+
+    start = Checkpoint(protocol["delay"], protocol["v_init"], [rec_v])
+    pulse_worker.update(cell=cell, stim=stim, rec_v=rec_v, spike_times=spike_times, netcon=netcon,
+                        spike=spike, start=start, protocol=protocol)
+
 
 # Defining a function for: cell instantiation and simulation and safe in file
-def SquarePulses_stim(stim_ampl, morph_filename, output_filename, axs=None):
+@instrumentation.instrument()
+def SquarePulses_stim(stim_ampl, morph_filename, output_filename, axs=None, stop=None):
+    """
+    stop : optional function of the cell returning early_stop conditions, e.g.
+           lambda cell: [early_stop.SpikeCount(cell.somatic[0](0.5), 1)]. A sweep then
+           ends when one is met, its columns are shorter, and the met condition and
+           end time of every sweep are written to <output_filename>.stop.json
+           (e.g. Sub_threshold_cell1.stop.json), keeping the CSV numeric.
+    """
     import csv
     from neuron import h
     import instantiate_neuron as IN
     
     data = {}
+    stops = []
     cell = IN.NEURON(morph_filename)
     
     # If no axes were passed, create them
@@ -28,24 +89,34 @@ def SquarePulses_stim(stim_ampl, morph_filename, output_filename, axs=None):
     axs[1].set_xlabel('t (ms)')
     axs[1].set_ylabel('I (nA)')
 
+    # One clamp and one set of recordings reused by every amplitude
+    stim = h.IClamp(cell.somatic[0](0.5))
+    stim.delay = PULSE_PROTOCOL["delay"]
+    stim.dur = PULSE_PROTOCOL["duration"]
+
+    rec_v_soma = h.Vector(); rec_v_soma.record(cell.somatic[0](0.5)._ref_v)
+    rec_i = h.Vector(); rec_i.record(stim._ref_i)
+    conditions = stop(cell) if stop is not None else []
+
+    # Nothing differs between amplitudes before the stimulus onset: simulate it once
+    with instrumentation.span("simulation"):
+        stim.amp = 0
+        start = Checkpoint(stim.delay, PULSE_PROTOCOL["v_init"], [rec_v_soma, rec_i])
+        instrumentation.add("neuron_steps", round(h.t / h.dt))
+
     # Loop over stim amplitudes
     for i, sa in enumerate(stim_ampl):
-        stim = h.IClamp(cell.somatic[0](0.5))         
-        stim.delay = 100
-        stim.dur = 300
-        stim.amp = sa    
-
-        rec_t = h.Vector(); rec_t.record(h._ref_t)
-        rec_v_soma = h.Vector(); rec_v_soma.record(cell.somatic[0](0.5)._ref_v)
-        rec_i = h.Vector(); rec_i.record(stim._ref_i)
-
-        h.load_file('stdrun.hoc')
-        h.finitialize(-65)
-        h.continuerun(500)
+        stim.amp = sa
+
+        with instrumentation.span("simulation"):
+            rec_t = start.run(PULSE_PROTOCOL["t_stop"], conditions=conditions)
+            instrumentation.add("neuron_steps", round((h.t - start.t_checkpoint) / h.dt))
         
         data[f'time_{i}'] = list(rec_t)
         data[f'current_{i}'] = list(rec_i)
         data[f'voltage_{i}'] = list(rec_v_soma)
+        if stop is not None:
+            stops.append({"sweep": i, "amplitude": sa, **start.stop})
         
         axs[0].plot(rec_t, rec_v_soma, label=f"I={sa} nA")
         axs[1].plot(rec_t, rec_i, label=f"I={sa} nA")
@@ -57,6 +128,11 @@ def SquarePulses_stim(stim_ampl, morph_filename, output_filename, axs=None):
     with open(output_filename, 'w') as file:
         writer = csv.writer(file, delimiter=',')
         writer.writerow(data.keys())
-        writer.writerows(zip(*data.values()))
+        writer.writerows(zip_longest(*data.values(), fillvalue=''))  # stopped sweeps are shorter
+
+    # Outcome of the stop conditions next to the CSV
+    if stop is not None:
+        with open(os.path.splitext(output_filename)[0] + '.stop.json', 'w') as file:
+            json.dump(stops, file, indent=1)
 
     return fig, axs
\ No newline at end of file
@@ -0,0 +1,118 @@
+# Alignment of sweeps around each stimulation before averaging, by FFT cross-correlation
+import numpy as np
+
+
+def stimulation_windows(traces, stimulation_indices, time_before=50, time_after=300):
+    """
+    Windows around every stimulation, as in extract_PSP_window.
+
+    Parameters
+    ----------
+    traces : array (..., sweeps, samples), e.g. one connection or (connections x sweeps x samples)
+
+    Returns
+    -------
+    array (..., stimuli, sweeps, window samples)
+    """
+    windows = np.asarray(stimulation_indices)[:, None] + np.arange(-time_before, time_after)
+    return np.moveaxis(np.asarray(traces)[..., windows], -3, -2)
+
+
+def estimate_lags(windows, template, max_lag):
+    """
+    Lag of every sweep relative to the template, from the peak of their FFT
+    cross-correlation refined by a parabola through its three highest points.
+    The first differences are correlated: they carry the EPSP onset and are free of
+    the baseline and of the decay cut by the end of the window, which bias the lag.
+
+    Parameters
+    ----------
+    windows : array (..., sweeps, samples)
+    template : array (..., samples)
+    max_lag : largest lag searched [samples]
+
+    Returns
+    -------
+    array (..., sweeps) of lags [samples], positive when the sweep is late
+    """
+    a = np.diff(windows, axis=-1)
+    b = np.diff(template, axis=-1)
+    n_fft = int(2 ** np.ceil(np.log2(2 * a.shape[-1])))
+    correlation = np.fft.irfft(np.fft.rfft(a, n_fft) * np.conj(np.fft.rfft(b, n_fft))[..., None, :], n_fft)
+
+    # Negative lags are at the end of the circular correlation
+    lags = np.arange(-max_lag, max_lag + 1)
+    correlation = correlation[..., lags % n_fft]
+    peak = np.clip(np.argmax(correlation, axis=-1), 1, 2 * max_lag - 1)
+
+    y0, y1, y2 = (np.take_along_axis(correlation, (peak + k)[..., None], axis=-1)[..., 0] for k in (-1, 0, 1))
+    curvature = y0 - 2 * y1 + y2
+    with np.errstate(invalid="ignore", divide="ignore"):
+        offset = np.where(curvature < 0, 0.5 * (y0 - y2) / curvature, 0.0)
+    return lags[peak] + np.clip(offset, -1, 1)
+
+
+def shift(windows, lags):
+    """Sweeps advanced by lags samples (fractional, linear interpolation, edges extended)"""
+    n = windows.shape[-1]
+    position = np.clip(np.arange(n) + np.asarray(lags)[..., None], 0, n - 1)
+    left = np.minimum(np.floor(position).astype(int), n - 2)
+    fraction = position - left
+    return ((1 - fraction) * np.take_along_axis(windows, left, axis=-1)
+            + fraction * np.take_along_axis(windows, left + 1, axis=-1))
+
+
+def align(windows, max_lag=20, iterations=2):
+    """
+    Align the sweeps of every window to their average.
+
+    The template starts as the plain mean and is replaced by the aligned mean at
+    every iteration. Lags are centred on zero, so the aligned average keeps the mean
+    timing of the sweeps (and their latency).
+
+    Parameters
+    ----------
+    windows : array (..., sweeps, samples)
+    max_lag : largest lag searched [samples]
+    iterations : number of template refinements
+
+    Returns
+    -------
+    aligned : array like windows
+    lags : array (..., sweeps) [samples]
+    """
+    windows = np.asarray(windows, dtype=float)
+    template = windows.mean(axis=-2)
+    for _ in range(iterations):
+        lags = estimate_lags(windows, template, max_lag)
+        lags -= lags.mean(axis=-1, keepdims=True)
+        aligned = shift(windows, lags)
+        template = aligned.mean(axis=-2)
+    return aligned, lags
+
+
+def aligned_mean_trace(traces, stimulation_indices, time_before=50, time_after=300, max_lag=20, iterations=2):
+    """
+    Mean trace with the sweeps aligned separately around every stimulation.
+
+    Outside the stimulation windows the plain mean is kept. All connections and
+    stimulations are aligned in one batch.
+
+    Parameters
+    ----------
+    traces : array (..., sweeps, samples), e.g. load_traces output
+    stimulation_indices : sample indices of the stimulations
+
+    Returns
+    -------
+    mean_trace : array (..., samples)
+    lags : array (..., stimuli, sweeps) [samples]
+    """
+    traces = np.asarray(traces, dtype=float)
+    aligned, lags = align(stimulation_windows(traces, stimulation_indices, time_before, time_after),
+                          max_lag, iterations)
+
+    mean_trace = traces.mean(axis=-2)
+    for k, index in enumerate(stimulation_indices):
+        mean_trace[..., index - time_before:index + time_after] = aligned[..., k, :, :].mean(axis=-2)
+    return mean_trace, lags
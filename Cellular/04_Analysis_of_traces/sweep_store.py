@@ -0,0 +1,175 @@
+# Single HDF5 store for the per-sweep .dat files of a cell
+#
+# Layout, one group per protocol:
+#
+#     /exp_IV/time       (samples)           float64, shared by every sweep [ms]
+#     /exp_IV/sweeps     (sweeps)            sweep numbers from the file names
+#     /exp_IV/response   (sweeps x samples)  float32, ch6 [mV]
+#     /exp_IV/stimulus   (sweeps x samples)  float32, ch7 [nA]
+#
+# Row i of response and stimulus come from the same sweep. Sweeps shorter than the
+# longest one are padded with NaN, as by Relevant_functions.load_sweeps. The size and
+# modification time of every .dat file are kept in the "sources" attribute of its
+# dataset, so that readers can tell when the store is out of date.
+import json
+import os
+
+import h5py
+import numpy as np
+
+from data_catalog import Catalog, parse_name
+
+STORE_NAME = "cell_sweeps.h5"
+
+# Channel of each role in the .dat file names
+CHANNELS = {"response": 6, "stimulus": 7}
+
+CHUNK_SAMPLES = 4096
+
+
+def convert(directory=".", output=STORE_NAME, protocols=None, compression="gzip"):
+    """
+    Gather the .dat sweeps of directory into one HDF5 store.
+
+    Only sweeps recorded on both channels are kept, so stimulus and response stay
+    paired. Shorter sweeps are padded with NaN (see load_sweeps) and both channels
+    must share the time axis of the longest sweep.
+
+    Parameters
+    ----------
+    directory : folder with the .dat files, scanned through its data_catalog manifest
+    output : path of the HDF5 store, overwritten
+    protocols : protocols to convert, default all
+    compression : HDF5 compression filter of the sweep datasets
+
+    Returns
+    -------
+    dictionary {protocol: number of sweeps}
+    """
+    # Imported here, Relevant_functions itself imports this module
+    from Relevant_functions import get_data, load_sweeps
+
+    catalog = Catalog(directory)
+    catalog.update()
+    if protocols is None:
+        protocols = catalog.protocols(kind="dat")
+
+    converted = {}
+    with h5py.File(output, "w") as store:
+        for protocol in protocols:
+            entries = {role: {e["sweep"]: e for e in catalog.query(protocol, channel, "dat")}
+                       for role, channel in CHANNELS.items()}
+            sweeps = sorted(set(entries["response"]) & set(entries["stimulus"]))
+            if not sweeps:
+                continue
+
+            group = store.create_group(protocol)
+            for role, channel in CHANNELS.items():
+                paths = [os.path.join(directory, entries[role][sweep]["name"]) for sweep in sweeps]
+                time, values = load_sweeps(paths, get_data)
+                if "time" not in group:
+                    group.create_dataset("time", data=time)
+                elif not np.array_equal(time, group["time"][()]):
+                    raise ValueError(f"The stimulus and response sweeps of {protocol} do not share their time axis")
+                dataset = group.create_dataset(
+                    role, data=values, dtype="float32", chunks=(1, min(CHUNK_SAMPLES, len(time))),
+                    compression=compression, shuffle=True,
+                )
+                dataset.attrs["channel"] = channel
+                dataset.attrs["sources"] = json.dumps(
+                    {str(sweep): [entries[role][sweep]["size"], entries[role][sweep]["mtime"]] for sweep in sweeps})
+            group.create_dataset("sweeps", data=np.array(sweeps))
+            converted[protocol] = len(sweeps)
+
+    return converted
+
+
+class SweepStore:
+    """
+    Reader of a store written by convert, with random access by sweep and time window.
+    Only the chunks covering the request are read and decompressed.
+
+        with SweepStore("cell_sweeps.h5") as store:
+            t, v = store.read("exp_IV", "response", sweeps=[35, 36], t_start=300, t_stop=800)
+    """
+
+    def __init__(self, path=STORE_NAME):
+        self.file = h5py.File(path, "r")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.file.close()
+
+    def protocols(self):
+        return sorted(self.file.keys())
+
+    def sweeps(self, protocol):
+        """Sweep numbers of a protocol, in row order"""
+        return self.file[protocol]["sweeps"][()]
+
+    def time(self, protocol):
+        return self.file[protocol]["time"][()]
+
+    def holds(self, protocol, role, files):
+        """
+        True if the store has the sweeps of the .dat files of protocol and role, as they
+        were converted: files still on disk must have the same size and modification
+        time, deleted ones are only kept in the store
+        """
+        if protocol not in self.file:
+            return False
+        sources = json.loads(self.file[protocol][role].attrs.get("sources", "{}"))
+        for path in files:
+            stamp = sources.get(str(parse_name(os.path.basename(path))["sweep"]))
+            if stamp is None:
+                return False
+            if os.path.exists(path):
+                stat = os.stat(path)
+                if stamp != [stat.st_size, stat.st_mtime]:
+                    return False
+        return True
+
+    def read(self, protocol, role="response", sweeps=None, t_start=None, t_stop=None):
+        """
+        Parameters
+        ----------
+        protocol : e.g. "exp_IV"
+        role : "response" or "stimulus"
+        sweeps : sweep numbers to read, default all
+        t_start, t_stop : time window [ms], default the whole sweep
+
+        Returns
+        -------
+        time : 1D array [ms]
+        values : 2D array (sweeps x samples), as float64
+        """
+        group = self.file[protocol]
+        time = group["time"][()]
+        start = 0 if t_start is None else int(np.searchsorted(time, t_start))
+        stop = len(time) if t_stop is None else int(np.searchsorted(time, t_stop))
+
+        if sweeps is None:
+            rows = slice(None)
+        else:
+            numbers = list(group["sweeps"][()])
+            missing = [s for s in sweeps if s not in numbers]
+            if missing:
+                raise KeyError(f"Sweeps {missing} not in {protocol}")
+            # h5py needs increasing and unique indices, the requested rows are picked after reading
+            rows, requested = np.unique([numbers.index(s) for s in sweeps], return_inverse=True)
+
+        values = group[role][rows, start:stop].astype(float)
+        if sweeps is not None:
+            values = values[requested]
+        return time[start:stop], values
+
+    def pair(self, protocol, sweeps=None, t_start=None, t_stop=None):
+        """time, stimulus and response of the same sweeps"""
+        time, stimulus = self.read(protocol, "stimulus", sweeps, t_start, t_stop)
+        _, response = self.read(protocol, "response", sweeps, t_start, t_stop)
+        return time, stimulus, response
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from neuron import h
+
+import adaptive_sweep
+import stimuli
+
+needs_mechanisms = pytest.mark.skipif(not hasattr(h, "NaTs2_t"), reason="mechanisms not compiled, run nrnivmodl here")
+
+
+def test_intervals_to_refine():
+    curve = pd.DataFrame({
+        "amplitude": [0.4, 0.0, 0.2, 0.6],
+        "rate": [10.0, 0.0, 0.0, 12.0],
+        "steady_voltage": [-60.0, -65.0, -63.0, -59.0],
+    })
+    # rate jumps between 0.2 and 0.4; the voltage changes by more than 30% of its range in every interval
+    assert adaptive_sweep.intervals_to_refine(curve, ["rate"], 0.3, 0.01) == pytest.approx([0.3])
+    assert adaptive_sweep.intervals_to_refine(curve, ["steady_voltage"], 0.3, 0.01) == pytest.approx([0.1, 0.3])
+    assert adaptive_sweep.intervals_to_refine(curve, ["rate", "steady_voltage"], 0.3, 0.01) == pytest.approx([0.1, 0.3])
+    # Intervals narrower than min_step are left alone
+    assert adaptive_sweep.intervals_to_refine(curve, ["rate"], 0.3, 0.25) == []
+    # A flat quantity never asks for refinement
+    assert adaptive_sweep.intervals_to_refine(curve.assign(rate=1.0), ["rate"], 0.3, 0.01) == []
+
+
+@needs_mechanisms
+def test_refines_around_rheobase():
+    amplitudes = np.array([0.0, 0.5, 1.0])
+    curve = adaptive_sweep.adaptive_sweep("Cell_01.asc", amplitudes, quantities=("rate",), tolerance=0.2,
+                                          min_step=0.05, workers=2)
+
+    assert np.all(np.diff(curve["amplitude"]) > 0)
+    assert curve["round"].max() > 0
+    # Every rate jump left is narrower than min_step
+    assert adaptive_sweep.intervals_to_refine(curve, ["rate"], 0.2, 0.05) == []
+
+    # Each point equals a measurement on the cell of this process
+    stimuli.init_pulse_worker("Cell_01.asc", adaptive_sweep.DEFAULT_PROTOCOL)
+    for row in curve.iloc[[0, -1]].to_dict("records"):
+        assert adaptive_sweep.measure(row["amplitude"]) == {k: row[k] for k in ("amplitude", "spike_count", "rate",
+                                                                                 "steady_voltage")}
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bootstrap import bootstrap_cis, index_counts, resample_indices, statistic_names, statistics
+from failure_classification import classify_failures
+
+
+@pytest.fixture(scope="module")
+def connection():
+    rng = np.random.default_rng(0)
+    amplitudes = rng.lognormal(0, 0.7, size=(40, 9))
+    tau_rise = rng.lognormal(np.log(0.001), 0.3, size=(40, 9))
+    latencies = rng.lognormal(np.log(0.002), 0.6, size=(40, 9))
+    peak_to_peak = rng.normal(0.5, 0.2, size=40)
+    return amplitudes, tau_rise, latencies, peak_to_peak
+
+
+def point_estimates(amplitudes, tau_rise, latencies, peak_to_peak):
+    """Features of the sweeps as computed without resampling"""
+    noise_std = pd.Series(peak_to_peak).std()
+    mean_amplitude = amplitudes.mean(axis=0)
+    return np.concatenate([
+        [classify_failures(amplitudes, latencies, noise_std)["failed"].mean()],
+        mean_amplitude, tau_rise.mean(axis=0), latencies.mean(axis=0),
+        mean_amplitude[1:] / mean_amplitude[0],
+    ])
+
+
+def test_index_counts():
+    indices = resample_indices(5, 3, np.random.default_rng(1))
+    counts = index_counts(indices, 5)
+    for row, count in zip(indices, counts):
+        np.testing.assert_array_equal(count, np.bincount(row, minlength=5))
+
+
+def test_estimate_equals_point_estimate(connection):
+    result = bootstrap_cis(*connection, n_resamples=2000)
+    assert list(result.index) == statistic_names(9)
+    np.testing.assert_allclose(result["estimate"], point_estimates(*connection), rtol=1e-12)
+    assert (result["ci_low"] <= result["estimate"]).all() and (result["estimate"] <= result["ci_high"]).all()
+
+
+def test_resample_matches_resampled_sweeps(connection):
+    indices = resample_indices(40, 5, np.random.default_rng(2))
+    values = statistics(index_counts(indices, 40), *connection)
+    for row, resample in zip(indices, values):
+        np.testing.assert_allclose(resample, point_estimates(*(feature[row] for feature in connection)), rtol=1e-12)
+
+
+def test_independent_of_workers(connection):
+    single = bootstrap_cis(*connection, n_resamples=3500, workers=1)
+    threaded = bootstrap_cis(*connection, n_resamples=3500, workers=3)
+    pd.testing.assert_frame_equal(single, threaded)
+
+
+def test_connection_cis():
+    from Relevant_functions import connection_cis, connection_features
+
+    files = ["connection_c1.h5", "connection_c2.h5"]
+    cis = connection_cis(files, n_resamples=200, seed=3)
+    amplitudes, taus, latencies, noise = connection_features(files)
+    for key in range(len(files)):
+        peak_to_peak = noise[noise["connection"] == key]["peak_to_peak"]
+        expected = bootstrap_cis(amplitudes[key], taus[key], latencies[key], peak_to_peak, n_resamples=200, seed=3)
+        pd.testing.assert_frame_equal(cis.loc[key], expected)
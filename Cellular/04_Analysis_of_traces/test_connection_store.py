@@ -0,0 +1,47 @@
+import shutil
+
+import h5py
+import numpy as np
+import pandas as pd
+import pytest
+
+from connection_store import convert, read_sweeps, read_window, sweep_names
+from Relevant_functions import compute_failure_rate, failure_tables
+
+FILES = ["connection_c1.h5", "connection_c2.h5", "connection_c4.h5"]
+
+
+@pytest.fixture(scope="module")
+def converted(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("connections")
+    paths = []
+    for name in FILES:
+        shutil.copy(name, directory / name)
+        convert(str(directory / name))
+        paths.append(str(directory / name))
+    return paths
+
+
+def test_round_trip(converted):
+    for original, path in zip(FILES, converted):
+        with h5py.File(original, "r") as f:
+            names = list(f.keys())
+            expected = np.array([f[name][()] for name in names])
+        with h5py.File(path, "r") as f:
+            assert list(f.keys()) == ["sweeps"]
+            assert f["sweeps"].chunks[0] == len(expected)
+
+        np.testing.assert_array_equal(read_sweeps(path), expected)
+        np.testing.assert_array_equal(read_sweeps(original), expected)
+        assert sweep_names(path) == sweep_names(original) == names
+        np.testing.assert_array_equal(read_window(path, 1000, 50, 300), expected[:, 950:1300])
+        np.testing.assert_array_equal(read_window(original, 1000, 50, 300), expected[:, 950:1300])
+
+    # Converting again leaves the file alone
+    convert(converted[0])
+    np.testing.assert_array_equal(read_sweeps(converted[0]), read_sweeps(FILES[0]))
+
+
+def test_failure_rate_unchanged(converted):
+    assert compute_failure_rate(FILES) == compute_failure_rate(converted)
+    pd.testing.assert_frame_equal(failure_tables(FILES), failure_tables(converted))
@@ -0,0 +1,56 @@
+import threading
+
+import numpy as np
+
+from data_cache import DataCache, nbytes
+
+
+def array_loader(n, calls):
+    def load():
+        calls.append(n)
+        return np.zeros(n, dtype=np.uint8)
+    return load
+
+
+def test_nbytes():
+    assert nbytes((np.zeros(10), {"a": np.zeros(5, dtype=np.uint8)}, "label")) == 85
+
+
+def test_lru_eviction_by_bytes():
+    cache = DataCache(max_bytes=250)
+    calls = []
+    for key in "abc":
+        cache.get(key, array_loader(100, calls))
+    # c does not fit with a and b, a is the least recently used
+    assert "a" not in cache and "b" in cache and "c" in cache
+    assert cache.total_bytes == 200
+
+    cache.get("b", array_loader(100, calls))
+    cache.get("d", array_loader(100, calls))
+    assert "c" not in cache and "b" in cache
+    assert calls == [100] * 4
+
+    # A value larger than the bound is still kept, alone
+    cache.get("big", array_loader(1000, calls))
+    assert list(cache.values) == ["big"]
+
+
+def test_prefetch_loads_once():
+    cache = DataCache()
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        release.wait(5)
+        calls.append(1)
+        return np.arange(3)
+
+    cache.prefetch("key", slow_loader)
+    cache.prefetch("key", slow_loader)
+    assert "key" not in cache
+    release.set()
+    # get waits for the load in progress instead of starting another
+    np.testing.assert_array_equal(cache.get("key", slow_loader), np.arange(3))
+    np.testing.assert_array_equal(cache.get("key", slow_loader), np.arange(3))
+    assert calls == [1]
+    assert not cache.pending
@@ -0,0 +1,67 @@
+import os
+
+import h5py
+import numpy as np
+
+import data_catalog
+from data_catalog import Catalog, catalog, parse_name
+
+
+def write_dat(path, n_samples):
+    np.zeros(2 * n_samples).tofile(path)
+
+
+def test_parse_name():
+    assert parse_name("exp_IV_ch6_35.dat") == {"protocol": "exp_IV", "channel": 6, "sweep": 35}
+    assert parse_name("connection_c1.h5") == {"protocol": "connection_c1", "channel": None, "sweep": None}
+
+
+def test_catalog_updates_only_changed_files(tmp_path, monkeypatch):
+    for sweep in (9, 10, 11):
+        write_dat(tmp_path / f"exp_IV_ch6_{sweep}.dat", 100)
+    write_dat(tmp_path / "exp_IV_ch7_10.dat", 100)
+    with h5py.File(tmp_path / "connection_c1.h5", "w") as f:
+        f["v0"] = np.zeros(50, dtype="float32")
+        f["v1"] = np.zeros(50, dtype="float32")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    first = Catalog(str(tmp_path))
+    assert first.update() == 5
+    assert first.update() == 0
+    assert os.path.exists(tmp_path / "data_manifest.json")
+
+    # Sweeps are ordered by number, not by name
+    assert [os.path.basename(f) for f in first.files("exp_IV", channel=6)] == [
+        "exp_IV_ch6_9.dat", "exp_IV_ch6_10.dat", "exp_IV_ch6_11.dat"]
+    assert first.protocols() == ["connection_c1", "exp_IV"]
+    assert first.protocols(kind="dat") == ["exp_IV"]
+    assert first.protocols(pattern="conn") == ["connection_c1"]
+
+    entries = {e["name"]: e for e in first.query()}
+    assert entries["exp_IV_ch6_9.dat"]["n_samples"] == 100
+    assert entries["connection_c1.h5"]["datasets"] == {"v0": {"shape": [50], "dtype": "float32"},
+                                                      "v1": {"shape": [50], "dtype": "float32"}}
+    assert entries["connection_c1.h5"]["n_samples"] == 50
+
+    # A new instance reads the manifest and only inspects what changed since
+    write_dat(tmp_path / "exp_IV_ch6_11.dat", 200)
+    os.remove(tmp_path / "exp_IV_ch7_10.dat")
+    inspected = []
+    inspect_file = data_catalog.inspect_file
+
+    def recording_inspect(path):
+        inspected.append(os.path.basename(path))
+        return inspect_file(path)
+
+    monkeypatch.setattr(data_catalog, "inspect_file", recording_inspect)
+    second = Catalog(str(tmp_path))
+    assert len(second.entries) == 5
+    assert second.update() == 2
+    assert inspected == ["exp_IV_ch6_11.dat"]
+    assert second.query("exp_IV", 6)[-1]["n_samples"] == 200
+    assert second.files("exp_IV", channel=7) == []
+    assert len(second.table()) == 4
+
+
+def test_catalog_is_kept_per_directory(tmp_path):
+    assert catalog(str(tmp_path)) is catalog(str(tmp_path))
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from epsp_kernel import epsp_crossings, epsp_features
+from Relevant_functions import (STIMULATION_INDICES, extract_all_amps_taus_latencies, extract_PSP_window,
+                                load_traces)
+
+TIME = np.arange(0, 1.3, 0.0001)
+
+
+def loop_crossings(psp_trace, psp_time):
+    """Crossing samples of extract_tau_latency before the fused kernel"""
+    max_psp = np.max(psp_trace)
+    min_psp = np.min(psp_trace)
+    amplitude_psp = np.abs(max_psp - min_psp)
+
+    indices = [np.where(psp_trace >= max_psp - amplitude_psp * (1 - fraction))[0][0] for fraction in (0.05, 0.2, 0.8)]
+    return np.array(indices), amplitude_psp * 1000
+
+
+def test_linear_rise_is_interpolated_exactly():
+    time = np.arange(100) * 0.001
+    trace = np.concatenate([np.zeros(10), np.linspace(0, 1, 81), np.ones(9)])
+    levels, times, amplitude = epsp_crossings(trace, time)
+
+    np.testing.assert_allclose(levels, [0.05, 0.2, 0.8])
+    np.testing.assert_allclose(times, 0.010 + 0.080 * np.array([0.05, 0.2, 0.8]))
+    assert amplitude == 1
+
+
+@pytest.fixture(scope="module")
+def connection():
+    return load_traces("connection_c1.h5")
+
+
+def test_features_match_loop_within_one_sample(connection):
+    amplitudes, taus, latencies = extract_all_amps_taus_latencies(connection, STIMULATION_INDICES, TIME)
+    assert amplitudes.shape == taus.shape == latencies.shape == (len(connection), len(STIMULATION_INDICES))
+
+    for sweep, trace in enumerate(connection):
+        for stimulus, index in enumerate(STIMULATION_INDICES):
+            psp_trace, psp_time = extract_PSP_window(trace, TIME, index)
+            samples, amplitude = loop_crossings(psp_trace, psp_time)
+            _, times, _ = epsp_crossings(psp_trace, psp_time)
+
+            assert amplitudes[sweep, stimulus] == amplitude
+            # The interpolated crossing lies between the old crossing sample and the one before
+            assert np.all(times <= psp_time[samples])
+            assert np.all(times >= psp_time[np.maximum(samples - 1, 0)])
+            assert latencies[sweep, stimulus] == pytest.approx(abs(psp_time[samples[0]] - TIME[index]), abs=1e-4)
+            assert taus[sweep, stimulus] == pytest.approx(psp_time[samples[2]] - psp_time[samples[1]], abs=1e-4)
+
+
+def test_batch_equals_single_windows(connection):
+    amplitudes, taus, latencies = extract_all_amps_taus_latencies(connection, STIMULATION_INDICES, TIME)
+
+    for sweep, trace in enumerate(connection):
+        for stimulus, index in enumerate(STIMULATION_INDICES):
+            psp_trace, psp_time = extract_PSP_window(trace, TIME, index)
+            single = epsp_features(psp_trace, psp_time, TIME[index])
+            assert (amplitudes[sweep, stimulus], taus[sweep, stimulus], latencies[sweep, stimulus]) == single
@@ -0,0 +1,82 @@
+import numpy as np
+
+from failure_classification import classify_failures, failure_table
+from Relevant_functions import calculate_failure_rate, compute_failure_rate, failure_tables
+
+
+def loop_failure_rate(amplitudes, latencies, noise_std):
+    """calculate_failure_rate before classify_failures, one EPSP at a time"""
+    failure = 0
+    total = 0
+
+    latency_average = np.mean(latencies.mean(axis=0))
+    failed_amps, correct_amps = [], []
+    for amps, lats in zip(amplitudes, latencies):
+        for amp, lat in zip(amps, lats):
+            if amp < 1.5 * noise_std or lat > 2.5 * np.mean(latency_average):
+                failure += 1
+                failed_amps.append(amp)
+            else:
+                correct_amps.append(amp)
+            total += 1
+
+    return failure, total, failed_amps, correct_amps
+
+
+def random_epsps(seed=0, sweeps=20, stimuli=9):
+    rng = np.random.default_rng(seed)
+    amplitudes = rng.lognormal(0, 0.7, size=(sweeps, stimuli))
+    latencies = rng.lognormal(np.log(0.002), 0.6, size=(sweeps, stimuli))
+    return amplitudes, latencies
+
+
+def test_calculate_failure_rate_matches_loop():
+    for seed in range(5):
+        amplitudes, latencies = random_epsps(seed)
+        failure, total, failed_amps, correct_amps = calculate_failure_rate(amplitudes, latencies, 0.6)
+        expected = loop_failure_rate(amplitudes, latencies, 0.6)
+
+        assert 0 < failure < total
+        assert (failure, total) == expected[:2]
+        assert failed_amps == expected[2]
+        assert correct_amps == expected[3]
+
+
+def test_classify_failures_masks():
+    amplitudes = np.array([[1.0, 0.1], [1.0, 1.0]])
+    latencies = np.array([[0.001, 0.001], [0.001, 0.01]])
+    classes = classify_failures(amplitudes, latencies, noise_std=0.2)
+
+    # Too small, then too late (above 2.5 times the mean latency of 0.00325 s)
+    np.testing.assert_array_equal(classes["failed"], [[False, True], [False, True]])
+    np.testing.assert_array_equal(classes["success"], ~classes["failed"])
+    np.testing.assert_array_equal(classes["failure_rate"], [0, 1])
+    assert (classes["failures"], classes["total"]) == (2, 4)
+    assert classes["mean_amplitude_success"] == 1.0
+    assert classes["mean_amplitude_failed"] == 0.55
+
+
+def test_failure_table_per_pulse():
+    amplitudes, latencies = random_epsps(1)
+    classes = classify_failures(amplitudes, latencies, 0.6)
+    table = failure_table(amplitudes, latencies, 0.6)
+
+    assert list(table.index) == list(range(1, 10))
+    np.testing.assert_array_equal(table["failures"], classes["failed"].sum(axis=0))
+    np.testing.assert_array_equal(table["failure_rate"], classes["failure_rate"])
+    for pulse in range(9):
+        success = classes["success"][:, pulse]
+        np.testing.assert_allclose(table["mean_amplitude"].iloc[pulse], amplitudes[success, pulse].mean())
+        np.testing.assert_allclose(table["mean_latency"].iloc[pulse], latencies[success, pulse].mean())
+
+
+def test_failure_tables_of_connections():
+    files = ["connection_c1.h5", "connection_c2.h5", "connection_c4.h5"]
+    connections = compute_failure_rate(files)
+    tables = failure_tables(files)
+
+    assert list(tables.index.names) == ["connection", "pulse"]
+    for key, conn in enumerate(connections):
+        fails, total, failed_amps, correct_amps = conn
+        assert tables.loc[key, "failures"].sum() == fails == len(failed_amps)
+        assert tables.loc[key, "total"].sum() == total == fails + len(correct_amps)
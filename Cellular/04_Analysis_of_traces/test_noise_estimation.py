@@ -0,0 +1,42 @@
+import numpy as np
+
+from noise_estimation import baseline_noise, connection_noise
+from Relevant_functions import compute_noise
+
+
+def test_baseline_noise_matches_per_sweep_loop():
+    rng = np.random.default_rng(1)
+    traces = rng.normal(-0.065, 0.0002, size=(4, 2000))
+    noise = baseline_noise(traces, 1000, time_before=50)
+
+    for sweep, trace in enumerate(traces):
+        baseline = trace[:950] * 1000
+        assert noise["peak_to_peak"][sweep] == np.ptp(baseline)
+        assert noise["sd"][sweep] == np.std(baseline)
+        assert noise["mad"][sweep] == 1.4826 * np.median(np.abs(baseline - np.median(baseline)))
+        assert compute_noise(trace, 1000) == np.ptp(baseline)
+
+
+def test_baseline_noise_ignores_the_stimulation():
+    traces = np.zeros((2, 2000))
+    traces[:, 950:] = 1.0
+    np.testing.assert_array_equal(baseline_noise(traces, 1000)["peak_to_peak"], 0)
+
+
+def test_mad_estimates_gaussian_sd():
+    rng = np.random.default_rng(2)
+    noise = baseline_noise(rng.normal(0, 0.001, size=100000), 100050)
+    np.testing.assert_allclose(noise["mad"], 1.0, rtol=0.02)
+    np.testing.assert_allclose(noise["sd"], 1.0, rtol=0.02)
+
+
+def test_connection_noise_with_different_lengths():
+    rng = np.random.default_rng(3)
+    collection = {"c1": rng.normal(size=(3, 13000)), "c2": rng.normal(size=(2, 9000))}
+    noise = connection_noise(collection, 1000)
+
+    assert list(noise["connection"]) == ["c1"] * 3 + ["c2"] * 2
+    assert list(noise["sweep"]) == [0, 1, 2, 0, 1]
+    for key, traces in collection.items():
+        rows = noise[noise["connection"] == key]
+        np.testing.assert_array_equal(rows["sd"], baseline_noise(traces, 1000)["sd"])
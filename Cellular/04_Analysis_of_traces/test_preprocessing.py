@@ -0,0 +1,95 @@
+import os
+
+import h5py
+import numpy as np
+
+from preprocessing import cached, config_for, preprocess, preprocess_chunk
+
+FS = 10000
+
+
+def epsp(n_samples=4000, onset=1500):
+    t = np.maximum(np.arange(n_samples) - onset, 0)
+    return -0.065 + 1e-3 * (np.exp(-t / 200) - np.exp(-t / 20))
+
+
+def noisy_epsps(seed=0, n_sweeps=10, n_samples=4000):
+    rng = np.random.default_rng(seed)
+    return epsp(n_samples) + rng.normal(0, 1e-4, (n_sweeps, n_samples))
+
+
+def test_blocks_equal_whole_array(tmp_path):
+    sweeps = noisy_epsps(n_sweeps=10)
+    settings = config_for("connection_c1")
+    whole = preprocess_chunk(sweeps, FS, notch=50, **settings)
+
+    np.testing.assert_array_equal(preprocess(sweeps, FS, chunk_sweeps=3, notch=50, **settings), whole)
+
+    with h5py.File(tmp_path / "data.h5", "w") as f:
+        source = f.create_dataset("raw", data=sweeps, chunks=(1, 4000))
+        out = f.create_dataset("out", shape=sweeps.shape, dtype="float64")
+        preprocess(source, FS, out=out, chunk_sweeps=4, notch=50, **settings)
+        np.testing.assert_array_equal(out[()], whole)
+
+
+def test_zero_phase_keeps_timing():
+    n = 4000
+    pulse = np.exp(-0.5 * ((np.arange(n) - 2000) / 30.0) ** 2)
+    filtered = preprocess_chunk(pulse, FS, lowpass=300.0)
+    assert np.argmax(filtered) == 2000
+    np.testing.assert_allclose(filtered[1900:2000], filtered[2100:2000:-1], atol=1e-9)
+
+    # The same causal filter would delay the EPSP peak by 4 samples
+    trace = epsp()
+    assert abs(np.argmax(preprocess_chunk(trace, FS, lowpass=1000.0)) - np.argmax(trace)) <= 1
+
+
+def test_drift_and_baseline():
+    samples = np.arange(1000)
+    drifting = np.array([0.5 + 1e-3 * samples, -2.0 - 3e-4 * samples])
+    np.testing.assert_allclose(preprocess_chunk(drifting, FS, drift=((0, 100), (900, 1000))), 0, atol=1e-12)
+
+    corrected = preprocess_chunk(drifting, FS, baseline=(0, 100))
+    np.testing.assert_allclose(corrected[:, :100].mean(axis=1), 0, atol=1e-12)
+
+
+
+def test_padded_sweeps_keep_their_padding():
+    sweeps = noisy_epsps(n_sweeps=3)
+    padded = sweeps.copy()
+    padded[1, 3000:] = np.nan  # shorter sweep, padded by load_sweeps
+    settings = dict(lowpass=1000.0, notch=50, baseline=(0, 950), drift=((0, 500), (2500, 3500)))
+
+    result = preprocess_chunk(padded, FS, **settings)
+    assert np.isnan(result[1, 3000:]).all()
+    np.testing.assert_allclose(result[1, :3000], preprocess_chunk(sweeps[1, :3000], FS, **settings))
+    np.testing.assert_array_equal(result[[0, 2]], preprocess_chunk(sweeps[[0, 2]], FS, **settings))
+
+
+def test_cache_rebuilds_when_the_source_changes(tmp_path):
+    source = tmp_path / "raw.npy"
+    np.save(source, noisy_epsps(n_sweeps=3))
+    loads = []
+
+    def load():
+        loads.append(1)
+        return np.load(source)
+
+    settings = {"lowpass": 1000.0}
+    first = cached("raw", [str(source)], FS, settings, load)
+    np.testing.assert_array_equal(first, preprocess_chunk(np.load(source), FS, **settings))
+    np.testing.assert_array_equal(cached("raw", [str(source)], FS, settings, load), first)
+    assert len(loads) == 1
+
+    dataset = cached("raw", [str(source)], FS, settings, load, in_memory=False)
+    assert isinstance(dataset, h5py.Dataset)
+    np.testing.assert_array_equal(dataset[1:2], first[1:2])
+    dataset.file.close()
+
+    np.save(source, noisy_epsps(seed=1, n_sweeps=5))
+    os.utime(source, (1, 1))
+    assert cached("raw", [str(source)], FS, settings, load).shape == (5, 4000)
+    assert len(loads) == 2
+    # Other settings get their own file
+    cached("raw", [str(source)], FS, {"lowpass": 500.0}, load)
+    assert len(os.listdir(tmp_path / "preprocessed")) == 2
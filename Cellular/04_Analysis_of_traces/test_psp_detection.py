@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from psp_detection import detect_events, psp_template, template_fit
+
+DT = 1e-4  # s
+
+
+def psp(n_samples, onset, amplitude=1e-3):
+    """Difference of exponentials starting at onset with the given peak [V]"""
+    t = np.maximum(np.arange(n_samples) - onset, 0)
+    shape = np.exp(-t / 100) - np.exp(-t / 10)
+    return amplitude * shape / shape.max()
+
+
+def noisy_sweeps(events, n_samples=20000, noise=5e-5, seed=1):
+    """Sweeps at -65 mV with PSPs at {sweep: [(onset, amplitude)]}"""
+    rng = np.random.default_rng(seed)
+    sweeps = -0.065 + rng.normal(0, noise, (len(events), n_samples))
+    for sweep, onsets in events.items():
+        for onset, amplitude in onsets:
+            sweeps[sweep] += psp(n_samples, onset, amplitude)
+    return sweeps
+
+
+def test_template_starts_at_onset():
+    # Stimulation at 1000, PSP from 1020: the template starts 70 samples into the window
+    for sign in (1, -1):
+        template = psp_template(-0.065 + sign * psp(2000, 1020), 1000)
+        assert template[0] == 0
+        assert len(template) == 350 - 70
+        assert template[np.argmax(np.abs(template))] == sign
+
+
+def test_template_fit_matches_least_squares():
+    rng = np.random.default_rng(0)
+    n = 60
+    template = psp(n, 0) / 1e-3
+    sweeps = rng.normal(0, 1e-4, (2, 300)) + psp(300, 100)
+    scale, criterion = template_fit(sweeps, template)
+    assert scale.shape == (2, 300 - n + 1)
+
+    design = np.column_stack([template, np.ones(n)])
+    for sweep in range(2):
+        for i in (0, 37, 100, 300 - n):
+            window = sweeps[sweep, i:i + n]
+            coefficients = np.linalg.lstsq(design, window, rcond=None)[0]
+            standard_error = np.sqrt(np.sum((window - design @ coefficients) ** 2) / (n - 1))
+            assert scale[sweep, i] == pytest.approx(coefficients[0], rel=1e-6, abs=1e-12)
+            assert criterion[sweep, i] == pytest.approx(coefficients[0] / standard_error, rel=1e-5)
+
+
+@pytest.mark.parametrize("sign", [1, -1])
+def test_detects_known_events(sign):
+    events = {0: [(2000, 1e-3), (9000, 0.5e-3)], 1: [(4000, 2e-3)], 2: []}
+    sweeps = noisy_sweeps({s: [(o, sign * a) for o, a in e] for s, e in events.items()})
+    template = psp_template(-0.065 + sign * psp(1000, 320), 300, time_after=600)
+    table = detect_events(sweeps, template, DT)
+
+    assert list(table["sweep"]) == [0, 0, 1]
+    np.testing.assert_allclose(table["index"], [2000, 9000, 4000], atol=3)
+    np.testing.assert_allclose(table["onset"], table["index"] * DT)
+    np.testing.assert_allclose(table["amplitude"], [1.0, 0.5, 2.0], rtol=0.1)
+    assert (table["criterion"] > 4).all()
+    # 20-80% rise of the difference of exponentials is about 10 samples
+    assert ((table["tau_rise"] > 5 * DT) & (table["tau_rise"] < 20 * DT)).all()
+
+
+def test_min_interval():
+    template = psp_template(-0.065 + psp(1000, 320), 300, time_after=600)
+    # The criterion stays above threshold along the decay: without a minimum interval
+    # one PSP is found many times
+    single = noisy_sweeps({0: [(2000, 1e-3)]})
+    assert len(detect_events(single, template, DT, min_interval=1)) > 1
+    np.testing.assert_allclose(detect_events(single, template, DT)["index"], [2000], atol=3)
+
+    # PSPs further apart than the template are both found by default
+    pair = noisy_sweeps({0: [(2000, 1e-3), (2700, 1e-3)]})
+    np.testing.assert_allclose(detect_events(pair, template, DT)["index"], [2000, 2700], atol=3)
+
+
+def test_evoked_psps_of_a_connection():
+    from Relevant_functions import STIMULATION_INDICES, load_traces, spontaneous_events
+
+    traces = load_traces("connection_c1.h5")
+    template = psp_template(traces.mean(axis=0), STIMULATION_INDICES[0])
+    # On the mean trace every stimulation is followed by the strongest events
+    strongest = detect_events(traces.mean(axis=0), template, DT).nlargest(len(STIMULATION_INDICES), "criterion")
+    delay = np.sort(strongest["index"].to_numpy()) - STIMULATION_INDICES
+    assert ((delay >= 0) & (delay < 100)).all()
+
+    events = spontaneous_events("connection_c1.h5")
+    since_stimulation = events["index"].to_numpy()[:, None] - STIMULATION_INDICES
+    assert (events["evoked"] == ((since_stimulation >= 0) & (since_stimulation < 300)).any(axis=1)).all()
+    assert events.loc[events["evoked"], "sweep"].nunique() == len(traces)
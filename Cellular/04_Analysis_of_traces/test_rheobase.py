@@ -0,0 +1,28 @@
+import pytest
+from neuron import h
+
+import rheobase
+import stimuli
+
+pytestmark = pytest.mark.skipif(not hasattr(h, "NaTs2_t"), reason="mechanisms not compiled, run nrnivmodl here")
+
+
+def test_bracket_holds_the_rheobase():
+    result = rheobase.find_rheobase("Cell_01.asc", tolerance=0.02, probes=2)
+
+    assert 0 < result["rheobase"] - result["low"] <= 0.02
+    table = result["probes"]
+    assert len(table) == result["runs"]
+    # Every probe agrees with the final bracket
+    assert table[table["amplitude"] >= result["rheobase"]]["spiked"].all()
+    assert not table[table["amplitude"] <= result["low"]]["spiked"].any()
+
+    # The same answer from the cell of this process
+    stimuli.init_pulse_worker("Cell_01.asc", stop_at_spike=True)
+    assert rheobase.spikes_at(result["rheobase"])
+    assert not rheobase.spikes_at(result["low"])
+
+
+def test_gives_up_at_max_high():
+    with pytest.raises(ValueError, match="0.05 nA"):
+        rheobase.find_rheobase("Cell_01.asc", high=0.01, probes=2, max_high=0.05)
@@ -0,0 +1,88 @@
+import glob
+
+import efel
+import numpy as np
+import pytest
+
+import spike_detection
+from Relevant_functions import load_sweeps
+
+STIM_START, STIM_END = 378.9, 3681.0
+
+
+def synthetic_sweeps():
+    """-65 mV sweeps with triangular 0 mV spikes peaking at known samples, each followed by a -70 mV AHP"""
+    time = np.arange(2000) * 0.1
+    sweeps = np.full((3, 2000), -65.0)
+    peaks = {0: [500, 900, 1400], 2: [1000]}
+    for sweep, indices in peaks.items():
+        for i in indices:
+            sweeps[sweep, i - 10:i + 11] = -65.0 + 65.0 * (1 - np.abs(np.arange(-10, 11)) / 10)
+            sweeps[sweep, i + 11:i + 31] = -70.0
+    return time, sweeps, peaks
+
+
+def test_detect_spikes_finds_known_peaks():
+    time, sweeps, peaks = synthetic_sweeps()
+    spikes = spike_detection.detect_spikes(time, sweeps)
+
+    assert list(spikes["sweep"]) == [0, 0, 0, 2]
+    assert list(spikes["spike"]) == [0, 1, 2, 0]
+    np.testing.assert_array_equal(spikes["peak_index"], [500, 900, 1400, 1000])
+    np.testing.assert_array_equal(spikes["peak_voltage"], 0.0)
+    # -20 mV is crossed 45/65 of the way up the 1 ms rise
+    np.testing.assert_allclose(spikes["threshold_time"], (np.array([500, 900, 1400, 1000]) - 10) * 0.1 + 45 / 65)
+    np.testing.assert_allclose(spikes["isi"], [np.nan, 40, 50, np.nan])
+
+
+def test_detect_spikes_window():
+    time, sweeps, _ = synthetic_sweeps()
+    spikes = spike_detection.detect_spikes(time, sweeps, stim_start=60, stim_end=120)
+    np.testing.assert_array_equal(spikes["peak_index"], [900, 1000])
+    np.testing.assert_array_equal(spikes["spike"], [0, 0])
+
+
+def test_spike_features_of_synthetic_sweeps():
+    time, sweeps, _ = synthetic_sweeps()
+    spikes = spike_detection.detect_spikes(time, sweeps)
+    features = spike_detection.spike_features(time, sweeps, spikes, 20, 180)
+
+    np.testing.assert_array_equal(features["Spikecount"], [3, 0, 1])
+    np.testing.assert_allclose(features["mean_frequency"], [1000 * 3 / (140 - 20), np.nan, 1000 / (100 - 20)])
+    # Single spikes get an AHP too
+    np.testing.assert_allclose(features["AHP_depth"], [-5, np.nan, -5])
+
+
+@pytest.fixture(scope="module")
+def fire_pattern():
+    return load_sweeps(sorted(glob.glob("exp_FirePattern_ch6_*.dat")))
+
+
+def test_voltage_base_matches_efel(fire_pattern):
+    time, sweeps = fire_pattern
+    fast = spike_detection.voltage_base(time, sweeps, STIM_START)
+    traces = [{"T": time, "V": v, "stim_start": [STIM_START], "stim_end": [STIM_END]} for v in sweeps]
+    reference = [values["voltage_base"][0] for values in efel.get_feature_values(traces, ["voltage_base"])]
+    np.testing.assert_allclose(fast, reference, atol=1e-6)
+
+
+def test_compare_with_efel(fire_pattern):
+    time, sweeps = fire_pattern
+    comparison = spike_detection.compare_with_efel(time, sweeps, STIM_START, STIM_END)
+
+    np.testing.assert_array_equal(comparison["Spikecount"], comparison["Spikecount_efel"])
+    np.testing.assert_allclose(comparison["mean_frequency"], comparison["mean_frequency_efel"], rtol=1e-9)
+    # The troughs are never shallower than eFEL's and stay within the documented bound
+    assert (comparison["AHP_depth"] <= comparison["AHP_depth_efel"]).all()
+    assert (comparison["AHP_depth_diff"] < 0.4).all()
+
+
+def test_compare_with_efel_restores_threshold(fire_pattern):
+    time, sweeps = fire_pattern
+    previous = efel.get_settings().Threshold
+    efel.set_setting("Threshold", -30.0)
+    try:
+        spike_detection.compare_with_efel(time, sweeps[:1], STIM_START, STIM_END, threshold=-10.0)
+        assert efel.get_settings().Threshold == -30.0
+    finally:
+        efel.set_setting("Threshold", previous)
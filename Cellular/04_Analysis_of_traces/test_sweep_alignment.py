@@ -0,0 +1,56 @@
+import numpy as np
+
+from sweep_alignment import aligned_mean_trace, shift
+
+STIMULATION_INDICES = np.array([1000, 2000])
+
+
+def epsp(samples, onset, tau_rise=10.0, tau_decay=80.0):
+    """Double-exponential EPSP starting at onset [samples], peak around 1 mV"""
+    t = np.maximum(samples - onset, 0)
+    return 1.3e-3 * (np.exp(-t / tau_decay) - np.exp(-t / tau_rise))
+
+
+def jittered_sweeps(seed, n_sweeps=30, jitter=4.0, noise=2e-6):
+    rng = np.random.default_rng(seed)
+    samples = np.arange(3000)
+    delays = rng.normal(0, jitter, size=(n_sweeps, len(STIMULATION_INDICES)))
+    traces = np.full((n_sweeps, len(samples)), -0.065) + rng.normal(0, noise, (n_sweeps, len(samples)))
+    for k, index in enumerate(STIMULATION_INDICES):
+        traces += epsp(samples, index + 20 + delays[:, k:k + 1])
+    return traces, delays
+
+
+def test_shift_by_whole_and_half_samples():
+    window = np.arange(10.0)
+    np.testing.assert_array_equal(shift(window, 2), [2, 3, 4, 5, 6, 7, 8, 9, 9, 9])
+    np.testing.assert_array_equal(shift(window, -0.5)[1:], np.arange(9) + 0.5)
+
+
+def test_lags_are_recovered():
+    traces, delays = jittered_sweeps(0)
+    mean_trace, lags = aligned_mean_trace(traces, STIMULATION_INDICES)
+
+    assert lags.shape == (2, 30)
+    expected = (delays - delays.mean(axis=0)).T
+    assert np.sqrt(np.mean((lags - expected) ** 2)) < 0.1
+
+    # The aligned mean has the rise of a single EPSP at the mean latency, the plain mean is smeared
+    samples = np.arange(3000)
+    reference = -0.065 + sum(epsp(samples, index + 20 + delays[:, k].mean()) for k, index in enumerate(STIMULATION_INDICES))
+    plain = traces.mean(axis=0)
+    window = slice(1000, 1100)
+    assert np.abs(mean_trace[window] - reference[window]).max() < 0.2 * np.abs(plain[window] - reference[window]).max()
+    assert np.diff(mean_trace[window]).max() > np.diff(plain[window]).max()
+
+    # Outside the windows the plain mean is kept
+    np.testing.assert_array_equal(mean_trace[:950], plain[:950])
+
+
+def test_connections_in_one_batch():
+    connections = np.array([jittered_sweeps(seed)[0] for seed in (1, 2)])
+    batch_mean, batch_lags = aligned_mean_trace(connections, STIMULATION_INDICES)
+    for traces, mean_trace, lags in zip(connections, batch_mean, batch_lags):
+        single_mean, single_lags = aligned_mean_trace(traces, STIMULATION_INDICES)
+        np.testing.assert_allclose(mean_trace, single_mean, rtol=0, atol=1e-15)
+        np.testing.assert_allclose(lags, single_lags, rtol=0, atol=1e-9)
@@ -0,0 +1,115 @@
+import os
+
+import numpy as np
+import pytest
+
+import sweep_store
+from Relevant_functions import get_data, load_protocol, load_sweeps
+from sweep_store import SweepStore, convert
+
+N_SAMPLES = 500
+
+
+def write_dat(path, values):
+    time = np.arange(len(values)) * 0.1
+    np.column_stack([time, values]).ravel().tofile(path)
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """exp_IV sweeps 8 to 11 on both channels, plus a response without its stimulus"""
+    rng = np.random.default_rng(0)
+    # float32 values, the precision of the store
+    for sweep in (8, 9, 10, 11, 12):
+        write_dat(tmp_path / f"exp_IV_ch6_{sweep}.dat", rng.normal(-65, 5, N_SAMPLES).astype("float32"))
+        if sweep != 12:
+            write_dat(tmp_path / f"exp_IV_ch7_{sweep}.dat", rng.normal(0, 0.1, N_SAMPLES).astype("float32"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_round_trip(data_dir):
+    assert convert() == {"exp_IV": 4}
+
+    with SweepStore() as store:
+        assert store.protocols() == ["exp_IV"]
+        np.testing.assert_array_equal(store.sweeps("exp_IV"), [8, 9, 10, 11])
+        for role, channel in sweep_store.CHANNELS.items():
+            time, values = store.read("exp_IV", role)
+            for row, sweep in enumerate([8, 9, 10, 11]):
+                t, v = get_data(f"exp_IV_ch{channel}_{sweep}.dat")
+                np.testing.assert_array_equal(time, t)
+                np.testing.assert_array_equal(values[row], v)
+
+
+def test_random_access(data_dir):
+    convert()
+    _, reference = load_sweeps([f"exp_IV_ch6_{sweep}.dat" for sweep in (11, 8)])
+
+    with SweepStore() as store:
+        time, values = store.read("exp_IV", sweeps=[11, 8], t_start=10, t_stop=20)
+        np.testing.assert_allclose(time, np.arange(100, 200) * 0.1)
+        np.testing.assert_array_equal(values, reference[:, 100:200])
+
+        time, stimulus, response = store.pair("exp_IV", sweeps=[9])
+        assert stimulus.shape == response.shape == (1, N_SAMPLES)
+
+        with pytest.raises(KeyError):
+            store.read("exp_IV", sweeps=[12])
+
+
+def test_load_protocol_reads_the_requested_sweeps(data_dir):
+    files = [f"exp_IV_ch6_{sweep}.dat" for sweep in (10, 9)]
+    before = load_protocol("exp_IV", "response", files)
+    convert()
+    # Only the store holds them now
+    for name in files:
+        os.remove(name)
+
+    for expected, actual in zip(before, load_protocol("exp_IV", "response", files)):
+        np.testing.assert_array_equal(actual, expected)
+    # Sweep 12 is not in the store, the .dat files are read instead
+    files = ["exp_IV_ch6_11.dat", "exp_IV_ch6_12.dat"]
+    _, values = load_protocol("exp_IV", "response", files)
+    np.testing.assert_array_equal(values, load_sweeps(files)[1])
+
+
+def test_repeated_sweeps(data_dir):
+    convert()
+    with SweepStore() as store:
+        _, values = store.read("exp_IV", sweeps=[9, 11, 9])
+        _, reference = store.read("exp_IV", sweeps=[9, 11])
+    np.testing.assert_array_equal(values, reference[[0, 1, 0]])
+
+
+def test_shorter_sweeps_are_padded(data_dir):
+    for channel in (6, 7):
+        write_dat(f"exp_IV_ch{channel}_9.dat", np.zeros(N_SAMPLES - 100, dtype="float32"))
+    convert()
+
+    files = [f"exp_IV_ch6_{sweep}.dat" for sweep in (8, 9)]
+    with SweepStore() as store:
+        time, values = store.read("exp_IV", sweeps=[8, 9])
+    expected_time, expected = load_sweeps(files)
+    np.testing.assert_array_equal(time, expected_time)
+    np.testing.assert_array_equal(values, expected)
+    assert np.isnan(values[1, -100:]).all()
+
+    # Sweeps must start like the longest one
+    np.arange(20.0).tofile("exp_IV_ch6_9.dat")  # time 0, 2, 4, ... ms
+    with pytest.raises(ValueError, match="exp_IV_ch6_9.dat"):
+        load_sweeps(files)
+
+
+def test_load_protocol_skips_a_stale_store(data_dir):
+    convert()
+    files = [f"exp_IV_ch6_{sweep}.dat" for sweep in (8, 9)]
+    # Same size, new values and modification time
+    write_dat("exp_IV_ch6_9.dat", np.ones(N_SAMPLES, dtype="float32"))
+    os.utime("exp_IV_ch6_9.dat", (1, 1))
+
+    with SweepStore() as store:
+        assert store.holds("exp_IV", "response", files[:1])
+        assert not store.holds("exp_IV", "response", files)
+    _, values = load_protocol("exp_IV", "response", files)
+    np.testing.assert_array_equal(values[1], 1)
@@ -0,0 +1,55 @@
+import numpy as np
+
+from trace_plotting import minmax_envelope
+from Relevant_functions import load_sweeps
+
+
+def test_envelope_keeps_every_bin_extreme():
+    rng = np.random.default_rng(0)
+    x = np.arange(10000) * 0.1
+    traces = rng.normal(size=(3, 10000))
+    traces[1, 4321] = 50  # a spike survives the decimation
+
+    x_env, y_env = minmax_envelope(x, traces, 100)
+
+    assert x_env.shape == (200,) and y_env.shape == (3, 200)
+    for b, chunk in enumerate(np.split(traces, 100, axis=-1)):
+        np.testing.assert_array_equal(y_env[:, 2 * b], chunk.min(axis=-1))
+        np.testing.assert_array_equal(y_env[:, 2 * b + 1], chunk.max(axis=-1))
+        assert x_env[2 * b] == x_env[2 * b + 1] == x[100 * b]
+    assert y_env.max() == 50
+
+
+def test_envelope_leaves_short_traces():
+    x = np.arange(50)
+    traces = np.ones((2, 50))
+    x_env, y_env = minmax_envelope(x, traces, 100)
+    np.testing.assert_array_equal(x_env, x)
+    np.testing.assert_array_equal(y_env, traces)
+
+
+def test_envelope_skips_nan_padding():
+    traces = np.arange(2000, dtype=float).reshape(2, 1000)
+    traces[1, 500:] = np.nan
+    _, y_env = minmax_envelope(np.arange(1000), traces, 10)
+    # The bins of the padding are NaN, the others keep their extremes
+    np.testing.assert_array_equal(y_env[1, :10], [1000, 1099, 1100, 1199, 1200, 1299, 1300, 1399, 1400, 1499])
+    assert np.isnan(y_env[1, 10:]).all()
+
+
+def test_load_sweeps_pads_shorter_sweeps():
+    lengths = {"a": 5, "b": 3, "c": 4}
+
+    def reader(fn):
+        n = lengths[fn]
+        return np.arange(n) * 0.1, np.full(n, float(n))
+
+    time, sweeps = load_sweeps(["a", "b", "c"], reader)
+
+    np.testing.assert_array_equal(time, np.arange(5) * 0.1)
+    assert sweeps.shape == (3, 5)
+    np.testing.assert_array_equal(sweeps[0], 5)
+    np.testing.assert_array_equal(sweeps[1, :3], 3)
+    assert np.isnan(sweeps[1, 3:]).all()
+    np.testing.assert_array_equal(sweeps[2, :4], 4)
+    assert np.isnan(sweeps[2, 4])
@@ -0,0 +1,92 @@
+# Plotting helpers for long sweeps: min/max envelope decimation and zoom refinement
+import numpy as np
+from matplotlib.collections import LineCollection
+
+
+def minmax_envelope(x, traces, n_bins):
+    """
+    Reduce traces to a min/max envelope with n_bins columns. Every bin keeps its
+    minimum and maximum, so spikes survive the decimation.
+
+    Parameters
+    ----------
+    x : 1D array with the shared time axis of the traces
+    traces : 2D array (sweeps x samples) or 1D array with a single trace
+    n_bins : number of bins, usually the width of the axes in pixels
+
+    Returns
+    -------
+    x_env : 1D array with 2 * n_bins time points (each bin start repeated twice)
+    y_env : array with the envelope of every trace, same leading shape as traces
+    """
+    traces = np.asarray(traces)
+    n_samples = traces.shape[-1]
+
+    # Nothing to gain if the trace is already short enough
+    if n_samples <= 2 * n_bins:
+        return np.asarray(x), traces
+
+    starts = np.linspace(0, n_samples, n_bins + 1).astype(int)[:-1]
+    # fmin/fmax skip the NaN padding of sweeps shorter than the others
+    mins = np.fmin.reduceat(traces, starts, axis=-1)
+    maxs = np.fmax.reduceat(traces, starts, axis=-1)
+
+    # Interleave min and max so every bin is drawn as a vertical stroke
+    y_env = np.stack([mins, maxs], axis=-1).reshape(traces.shape[:-1] + (2 * len(starts),))
+    x_env = np.repeat(np.asarray(x)[starts], 2)
+
+    return x_env, y_env
+
+
+class SweepPlot:
+    """
+    Draws a stack of sweeps as one LineCollection of min/max envelopes and
+    recomputes the envelope of the visible window whenever the x limits change.
+    """
+
+    def __init__(self, ax, x, traces, n_bins=None, **line_kwargs):
+        self.ax = ax
+        self.x = np.asarray(x)
+        self.traces = np.atleast_2d(traces)
+        # One bin per pixel of the axes unless told otherwise
+        self.n_bins = n_bins or max(int(ax.get_window_extent().width), 100)
+
+        self.collection = LineCollection(self._segments(0, len(self.x)), **line_kwargs)
+        ax.add_collection(self.collection)
+        ax.autoscale_view()
+        # A closure keeps this object alive, bound methods are only weakly referenced
+        ax.callbacks.connect("xlim_changed", lambda ax: self._refine(ax))
+
+    def _segments(self, start, stop):
+        x_env, y_env = minmax_envelope(self.x[start:stop], self.traces[:, start:stop], self.n_bins)
+        x_env = np.broadcast_to(x_env, y_env.shape)
+        return np.stack([x_env, y_env], axis=-1)
+
+    def _refine(self, ax):
+        """Re-decimate only the visible part of the sweeps"""
+        x_min, x_max = ax.get_xlim()
+        start = max(np.searchsorted(self.x, x_min) - 1, 0)
+        stop = min(np.searchsorted(self.x, x_max) + 1, len(self.x))
+        if stop - start < 2:
+            return
+        self.collection.set_segments(self._segments(start, stop))
+        ax.figure.canvas.draw_idle()
+
+
+def plot_sweeps(ax, x, traces, n_bins=None, **line_kwargs):
+    """
+    Plot all sweeps on ax as a single decimated collection.
+
+    Parameters
+    ----------
+    ax : matplotlib axes
+    x : 1D array with the shared time axis
+    traces : 2D array (sweeps x samples)
+    n_bins : envelope resolution, defaults to the axes width in pixels
+    line_kwargs : passed to LineCollection (colors, linestyles, alpha, ...)
+
+    Returns
+    -------
+    SweepPlot holding the collection and the zoom callback
+    """
+    return SweepPlot(ax, x, traces, n_bins=n_bins, **line_kwargs)
@@ -0,0 +1,126 @@
+"""
+Benchmarks of the trace-analysis functions of 04_Analysis_of_traces on synthetic data.
+
+Usage:
+    python bench_analysis.py --sweeps 100 --samples 13000 --stimuli 9 --noise 0.0001
+    python bench_analysis.py --compare   # flag regressions against the last run with the same scale
+
+Results are appended to results/analysis.jsonl.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+import bench_utils
+import synthetic_data
+
+sys.path.insert(0, bench_utils.SHARED_DIR)
+sys.path.insert(0, os.path.join(bench_utils.CELLULAR_DIR, "04_Analysis_of_traces"))
+import Relevant_functions as rf  # noqa: E402
+import spike_detection  # noqa: E402
+
+
+def run(config, repeat=5):
+    """Generate the synthetic data set described by config and time every function on it"""
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="bench_analysis_")
+
+    files = []
+    for n in range(3):
+        fn = os.path.join(workdir, f"connection_c{n}.h5")
+        synthetic_data.make_connection(
+            fn, n_sweeps=config["sweeps"], n_samples=config["samples"],
+            n_stimuli=config["stimuli"], noise=config["noise"], seed=n,
+        )
+        files.append(fn)
+    indices = synthetic_data.stimulation_indices(config["stimuli"], config["samples"])
+    time = np.arange(config["samples"]) * synthetic_data.DT_H5
+
+    resp_files, _ = synthetic_data.make_sweeps(
+        workdir, n_sweeps=config["dat_sweeps"], n_samples=config["dat_samples"]
+    )
+
+    # File reading
+    n_bytes = sum(os.path.getsize(fn) for fn in resp_files)
+    entry = bench_utils.measure(lambda: [rf.get_data(fn) for fn in resp_files], repeat=repeat)
+    entry["mb_per_s"] = n_bytes / 1e6 / entry["best_s"]
+    results["get_data"] = entry
+
+    entry = bench_utils.measure(rf.load_traces, files[0], repeat=repeat)
+    entry["mb_per_s"] = os.path.getsize(files[0]) / 1e6 / entry["best_s"]
+    results["load_traces"] = entry
+
+    # EPSP features and failures
+    traces = rf.load_traces(files[0])
+    entry = bench_utils.measure(rf.extract_all_amps_taus_latencies, traces, indices, time, repeat=repeat)
+    entry["epsps_per_s"] = traces.shape[0] * len(indices) / entry["best_s"]
+    results["extract_all_amps_taus_latencies"] = entry
+
+    if config["stimuli"] == 9 and config["samples"] >= 13000:
+        entry = bench_utils.measure(rf.compute_failure_rate, files, repeat=repeat)
+        entry["sweeps_per_s"] = 3 * config["sweeps"] / entry["best_s"]
+        results["compute_failure_rate"] = entry
+    else:
+        print("compute_failure_rate skipped: it expects the 9-stimuli, 13000-sample protocol")
+
+    # Spike features: eFEL one trace at a time against the vectorized detector
+    t, sweeps = rf.load_sweeps(resp_files)
+    stim_start, stim_end = 0.1 * t[-1], 0.9 * t[-1]
+    try:
+        import efel
+
+        def efel_features():
+            for v in sweeps:
+                trace = {"T": t, "V": v, "stim_start": [stim_start], "stim_end": [stim_end]}
+                efel.get_feature_values([trace], ["mean_frequency", "AHP_depth", "Spikecount"])
+
+        entry = bench_utils.measure(efel_features, repeat=repeat)
+        entry["sweeps_per_s"] = len(sweeps) / entry["best_s"]
+        results["efel_features"] = entry
+    except ImportError:
+        print("efel_features skipped: eFEL is not installed")
+
+    def fast_features():
+        spikes = spike_detection.detect_spikes(t, sweeps)
+        return spike_detection.spike_features(t, sweeps, spikes, stim_start, stim_end)
+
+    entry = bench_utils.measure(fast_features, repeat=repeat)
+    entry["sweeps_per_s"] = len(sweeps) / entry["best_s"]
+    results["spike_detection"] = entry
+
+    shutil.rmtree(workdir)
+    for entry in results.values():
+        entry.pop("value")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sweeps", type=int, default=21, help="sweeps per connection file")
+    parser.add_argument("--samples", type=int, default=13000, help="samples per connection sweep")
+    parser.add_argument("--stimuli", type=int, default=9, help="stimulations per connection sweep")
+    parser.add_argument("--noise", type=float, default=0.0001, help="noise SD of the connection sweeps (V)")
+    parser.add_argument("--dat-sweeps", type=int, default=11, help="number of .dat sweeps")
+    parser.add_argument("--dat-samples", type=int, default=40999, help="samples per .dat sweep")
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per benchmark")
+    parser.add_argument("--compare", action="store_true", help="compare with the last run at the same scale")
+    args = parser.parse_args()
+
+    config = {
+        "sweeps": args.sweeps, "samples": args.samples, "stimuli": args.stimuli, "noise": args.noise,
+        "dat_sweeps": args.dat_sweeps, "dat_samples": args.dat_samples,
+    }
+    history = bench_utils.load_history("analysis", config)
+    results = run(config, repeat=args.repeat)
+
+    previous = history[-1]["results"] if args.compare and history else None
+    bench_utils.print_report(results, previous)
+    bench_utils.save_results("analysis", config, results)
+
+
+if __name__ == "__main__":
+    main()
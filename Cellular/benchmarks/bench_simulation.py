@@ -0,0 +1,180 @@
+"""
+Benchmarks of cell building and simulation for the models used in the notebooks:
+the toy models of 02_Passive_Active_properties, instantiate_neuron.NEURON on every
+.asc morphology in 04_Analysis_of_traces/data and the cADpyr_L5TPC template of
+03_Action_Potential_na_k_recording.
+
+Every model runs in its own process (NEURON cannot unload cells or mechanisms), from
+the folder of its notebook so the compiled mechanisms are picked up. Compile them
+there with nrnivmodl first, the models whose mechanisms are missing are skipped.
+
+Usage:
+    python bench_simulation.py --tstop 500 --repeat 3
+    python bench_simulation.py --only toy --compare
+
+Results are appended to results/simulation.jsonl.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import bench_utils
+
+PASSIVE_DIR = os.path.join(bench_utils.CELLULAR_DIR, "02_Passive_Active_properties")
+TRACES_DIR = os.path.join(bench_utils.CELLULAR_DIR, "04_Analysis_of_traces")
+AP_DIR = os.path.join(bench_utils.CELLULAR_DIR, "03_Action_Potential_na_k_recording")
+L5TPC_DIR = os.path.join(AP_DIR, "4846377e-b403-4fa8-bfd3-9b95506f9dc3")
+
+TOY_MODELS = [
+    ("passive_neuron_1dend", "PassiveNeuron_1Dend"),
+    ("passive_neuron_1d_3d", "PassiveNeuron_1D_3D"),
+    ("active_neuron_1d_3d", "ActiveNeuron_1D_3D"),
+]
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process [MB]"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kB, macOS bytes
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    value = func(*args)
+    return value, time.perf_counter() - start
+
+
+def build_toy(module_name, class_name):
+    import importlib
+
+    sys.path[:0] = [PASSIVE_DIR, bench_utils.SHARED_DIR]
+    module = importlib.import_module(module_name)
+    # The toy classes set geometry and mechanisms in one go
+    cell, build_s = timed(getattr(module, class_name))
+    return cell, cell.soma, {"morphology_s": build_s, "biophysics_s": 0.0}
+
+
+def build_detailed(filename):
+    sys.path[:0] = [TRACES_DIR, bench_utils.SHARED_DIR]
+    import instantiate_neuron as IN
+
+    cell = IN.NEURON.__new__(IN.NEURON)
+    _, morphology_s = timed(cell.build_morphology, filename)
+    _, biophysics_s = timed(cell.define_biophysics)
+    return cell, cell.somatic[0], {"morphology_s": morphology_s, "biophysics_s": biophysics_s}
+
+
+def build_l5tpc():
+    from neuron import h
+
+    h.load_file("stdrun.hoc")
+    h.celsius = 34
+    h.v_init = -80
+    _, template_s = timed(h.load_file, os.path.join(L5TPC_DIR, "hoc", "cADpyr_L5TPC.hoc"))
+    # The template imports the morphology and assigns biophysics in its init
+    cell, build_s = timed(h.cADpyr_L5TPC, 0, os.path.join(L5TPC_DIR, "morphology"), "C060114A5.asc")
+    return cell, cell.soma[0], {"morphology_s": template_s + build_s, "biophysics_s": 0.0}
+
+
+def run_case(case):
+    """Build, initialise and run one model. Runs inside a fresh worker process."""
+    kind, workdir, args, tstop, dt, amplitude, repeat = case
+    os.chdir(workdir)
+
+    # Importing neuron from the notebook folder loads its compiled mechanisms
+    start = time.perf_counter()
+    from neuron import h
+    load_s = time.perf_counter() - start
+    h.load_file("stdrun.hoc")
+
+    try:
+        builder = {"toy": build_toy, "detailed": build_detailed, "l5tpc": build_l5tpc}[kind]
+        cell, soma, result = builder(*args)
+    except (RuntimeError, AttributeError, ValueError) as error:
+        return {"skipped": f"{type(error).__name__}: {error}"}
+    result["load_s"] = load_s
+    result["build_rss_mb"] = peak_rss_mb()
+    result["compartments"] = sum(sec.nseg for sec in h.allsec())
+
+    stim = h.IClamp(soma(0.5))
+    stim.delay = 100
+    stim.dur = tstop - 200
+    stim.amp = amplitude
+    rec_v = h.Vector().record(soma(0.5)._ref_v)
+
+    h.dt = dt
+    init_times, run_times = [], []
+    for _ in range(repeat):
+        _, init_s = timed(h.finitialize, h.v_init)
+        _, run_s = timed(h.continuerun, tstop)
+        init_times.append(init_s)
+        run_times.append(run_s)
+
+    result["finitialize_s"] = min(init_times)
+    result["run_s"] = min(run_times)
+    result["sim_ms_per_s"] = tstop / result["run_s"]
+    result["steps"] = len(rec_v) - 1
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def cases(only, tstop, dt, repeat):
+    """(name, case) pairs for every model to benchmark"""
+    selected = []
+    if only in (None, "toy"):
+        for module_name, class_name in TOY_MODELS:
+            selected.append((class_name, ("toy", PASSIVE_DIR, (module_name, class_name), tstop, dt, 0.4, repeat)))
+    if only in (None, "detailed"):
+        for filename in sorted(glob.glob(os.path.join(TRACES_DIR, "data", "*.asc"))):
+            name = "NEURON_" + os.path.splitext(os.path.basename(filename))[0]
+            selected.append((name, ("detailed", TRACES_DIR, (filename,), tstop, dt, 0.5, repeat)))
+    if only in (None, "l5tpc"):
+        selected.append(("cADpyr_L5TPC", ("l5tpc", AP_DIR, (), tstop, dt, 0.5, repeat)))
+    return selected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tstop", type=float, default=500.0, help="simulated time per run (ms)")
+    parser.add_argument("--dt", type=float, default=0.025, help="integration time step (ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per model")
+    parser.add_argument("--only", choices=["toy", "detailed", "l5tpc"], help="benchmark one group of models")
+    parser.add_argument("--compare", action="store_true", help="compare with the last run with the same settings")
+    args = parser.parse_args()
+
+    config = {"tstop": args.tstop, "dt": args.dt, "only": args.only}
+    history = bench_utils.load_history("simulation", config)
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for name, case in cases(args.only, args.tstop, args.dt, args.repeat):
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(run_case, (case,))
+
+        entry = results[name]
+        if "skipped" in entry:
+            print(f"{name:24s} skipped ({entry['skipped']})")
+            continue
+        print(f"{name:24s} {entry['compartments']:6d} compartments  "
+              f"load {entry['load_s'] * 1000:8.1f} ms  morphology {entry['morphology_s'] * 1000:8.1f} ms  "
+              f"biophysics {entry['biophysics_s'] * 1000:8.1f} ms  finitialize {entry['finitialize_s'] * 1000:7.2f} ms  "
+              f"run {entry['run_s'] * 1000:9.1f} ms  {entry['sim_ms_per_s']:10.1f} sim-ms/s  "
+              f"peak RSS {entry['peak_rss_mb']:7.1f} MB")
+
+    if args.compare and history:
+        print("\nCompared with the previous run:")
+        for key in ("run_s", "finitialize_s", "morphology_s", "peak_rss_mb"):
+            for bench, before, now, ratio, regressed in bench_utils.compare(results, history[-1]["results"], key):
+                flag = "REGRESSION" if regressed else ""
+                print(f"{bench:24s} {key:14s} {before:10.4g} -> {now:10.4g}  x{ratio:5.2f} {flag}")
+
+    bench_utils.save_results("simulation", config, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Shared helpers for the benchmark scripts: timing, peak memory and result history
+import datetime
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+CELLULAR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Modules used by several notebook folders, downloaded next to each notebook
+SHARED_DIR = os.path.join(CELLULAR_DIR, "shared")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(func, *args, repeat=5, **kwargs):
+    """
+    Time func(*args, **kwargs) repeat times and record the peak memory of one call.
+
+    Returns
+    -------
+    dictionary with the best and median wall-clock time [s], the peak traced
+    memory [MB] and the value returned by the last call
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = func(*args, **kwargs)
+        timings.append(time.perf_counter() - start)
+
+    # Memory is measured on a separate call, tracing slows the timed ones down
+    tracemalloc.start()
+    func(*args, **kwargs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "best_s": min(timings),
+        "median_s": float(np.median(timings)),
+        "peak_mb": peak / 1e6,
+        "value": value,
+    }
+
+
+def git_revision():
+    """Short hash of the checked out commit, None outside a git repository"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=CELLULAR_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name, config, results):
+    """Append one benchmark run to results/<name>.jsonl and return the record"""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    record = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "config": config,
+        "results": results,
+    }
+    with open(os.path.join(RESULTS_DIR, f"{name}.jsonl"), "a") as f:
+        f.write(json.dumps(record) + "\n")
+    return record
+
+
+def load_history(name, config):
+    """Previous runs of a benchmark with the same configuration, oldest first"""
+    path = os.path.join(RESULTS_DIR, f"{name}.jsonl")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [r for r in records if r["config"] == config]
+
+
+def compare(results, previous, key="best_s", tolerance=0.1):
+    """
+    Compare a run with a previous one and flag the entries that got slower (or used
+    more memory, with key="peak_mb") by more than tolerance.
+
+    Returns
+    -------
+    list of (benchmark, previous value, current value, ratio, regressed)
+    """
+    rows = []
+    for bench, entry in results.items():
+        if bench not in previous or key not in entry or key not in previous[bench]:
+            continue
+        before, now = previous[bench][key], entry[key]
+        ratio = now / before if before else np.inf
+        rows.append((bench, before, now, ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def print_report(results, previous=None):
+    """Print a results table, and the comparison with a previous run if given"""
+    for bench, entry in results.items():
+        extra = "  ".join(f"{k}={v:.4g}" for k, v in entry.items()
+                          if k not in ("best_s", "median_s", "peak_mb") and isinstance(v, (int, float)))
+        print(f"{bench:40s} best {entry['best_s'] * 1000:10.2f} ms  "
+              f"median {entry['median_s'] * 1000:10.2f} ms  peak {entry['peak_mb']:8.2f} MB  {extra}")
+
+    if previous:
+        print("\nCompared with the previous run:")
+        for key in ("best_s", "peak_mb"):
+            for bench, before, now, ratio, regressed in compare(results, previous, key):
+                flag = "REGRESSION" if regressed else ""
+                print(f"{bench:40s} {key:8s} {before:10.4g} -> {now:10.4g}  x{ratio:5.2f} {flag}")
@@ -0,0 +1,92 @@
+# Synthetic recordings in the formats of 04_Analysis_of_traces, at configurable scale
+import os
+
+import h5py
+import numpy as np
+
+DT_H5 = 0.0001  # sampling interval of the connection files (s)
+DT_DAT = 0.1  # sampling interval of the .dat sweeps (ms)
+
+
+def epsp_shape(n_samples, tau_rise=0.001, tau_decay=0.02, dt=DT_H5):
+    """Double exponential EPSP with unit peak"""
+    t = np.arange(n_samples) * dt
+    shape = np.exp(-t / tau_decay) - np.exp(-t / tau_rise)
+    return shape / shape.max()
+
+
+def stimulation_indices(n_stimuli, n_samples):
+    """Train of 8 pulses at 20 Hz plus a recovery pulse, like the real protocol, scaled to n_stimuli"""
+    indices = 1000 + 500 * np.arange(n_stimuli)
+    if n_stimuli > 1:
+        indices[-1] = min(max(indices[-1], 10000), n_samples - 400)
+    return indices
+
+
+def make_connection(filename, n_sweeps=21, n_samples=13000, n_stimuli=9, noise=0.0001,
+                    amplitude=0.001, failure_rate=0.1, jitter=0.0003, seed=0):
+    """
+    Write a connection file with one dataset per sweep (v0, v1, ...), in volts.
+
+    Parameters
+    ----------
+    filename : path of the H5 file
+    n_sweeps, n_samples : number and length of the sweeps
+    n_stimuli : number of presynaptic stimulations per sweep
+    noise : standard deviation of the recording noise [V]
+    amplitude : mean EPSP amplitude [V]
+    failure_rate : probability that a stimulation gives no EPSP
+    jitter : standard deviation of the EPSP latency [s]
+    """
+    rng = np.random.default_rng(seed)
+    indices = stimulation_indices(n_stimuli, n_samples)
+    shape = epsp_shape(n_samples)
+
+    traces = np.full((n_sweeps, n_samples), -0.07) + rng.normal(0, noise, (n_sweeps, n_samples))
+    for sweep in range(n_sweeps):
+        for index in indices:
+            if rng.random() < failure_rate:
+                continue
+            onset = index + 20 + int(round(rng.normal(0, jitter) / DT_H5))
+            length = n_samples - onset
+            traces[sweep, onset:] += amplitude * rng.lognormal(0, 0.3) * shape[:length]
+
+    with h5py.File(filename, "w") as f:
+        for sweep, trace in enumerate(traces):
+            f.create_dataset(f"v{sweep}", data=trace)
+
+    return indices
+
+
+def make_sweeps(directory, protocol="exp_FirePattern", n_sweeps=2, n_samples=40999, noise=0.2,
+                spike_rate=10.0, first_number=1, seed=0):
+    """
+    Write response (ch6) and stimulus (ch7) .dat sweeps with interleaved float64
+    time [ms] and value, named <protocol>_ch<channel>_<number>.dat.
+
+    Returns
+    -------
+    list of response file names and list of stimulus file names
+    """
+    rng = np.random.default_rng(seed)
+    time = np.arange(n_samples) * DT_DAT
+    stim_start, stim_end = 0.1 * time[-1], 0.9 * time[-1]
+    in_stim = (time >= stim_start) & (time <= stim_end)
+
+    spike = 80 * np.exp(-np.arange(30) * DT_DAT / 0.5) * (1 - np.exp(-np.arange(30) * DT_DAT / 0.1))
+    resp_files, stim_files = [], []
+    for n in range(n_sweeps):
+        step = 0.1 * (n + 1)
+        voltage = -65 + 5 * in_stim * step + rng.normal(0, noise, n_samples)
+        n_spikes = rng.poisson(spike_rate * (stim_end - stim_start) / 1000 * step)
+        for onset in rng.integers(np.argmax(in_stim), np.argmax(in_stim) + in_stim.sum() - 30, n_spikes):
+            voltage[onset:onset + 30] += spike
+        current = step * in_stim
+
+        number = first_number + n
+        for channel, values, files in ((6, voltage, resp_files), (7, current, stim_files)):
+            fn = os.path.join(directory, f"{protocol}_ch{channel}_{number}.dat")
+            np.column_stack([time, values]).astype(np.float64).tofile(fn)
+            files.append(fn)
+
+    return resp_files, stim_files
@@ -0,0 +1,108 @@
+# Save the model state at stimulus onset once and restart every sweep from it.
+from neuron import h
+
+from early_stop import run_until
+
+
+def structure():
+    """
+    Sections (name, nseg, mechanisms), point processes per type and NetCons: what
+    SaveState.restore requires to be unchanged since the save
+    """
+    sections = [(sec.name(), sec.nseg, tuple(m.name() for m in sec(0.5))) for sec in h.allsec()]
+
+    point_processes = h.MechanismType(1)
+    name = h.ref("")
+    counts = {}
+    for i in range(int(point_processes.count())):
+        point_processes.select(i)
+        point_processes.selected(name)
+        counts[name[0]] = int(h.List(name[0]).count())
+    counts["NetCon"] = int(h.List("NetCon").count())
+
+    return sections, counts
+
+
+class Checkpoint:
+    """
+    Simulates from finitialize(v_init) up to t_checkpoint once and saves the full model
+    state with SaveState. run() restores that state and continues to t_stop, which gives
+    bit-identical results to a full run as long as nothing that acts before t_checkpoint
+    (stimuli, parameters) differs between sweeps.
+
+    Recording vectors passed as records keep their pre-checkpoint samples: after each
+    run the saved part is prepended, so they hold the whole sweep from t=0.
+
+        checkpoint = Checkpoint(stim.delay, -65, [rec_t, rec_v])
+        for amp in amplitudes:
+            stim.amp = amp
+            checkpoint.run(500)
+    """
+
+    def __init__(self, t_checkpoint, v_init, records=()):
+        self.v_init = v_init
+        self.records = [h.Vector().record(h._ref_t)] + list(records)
+        self.stop = None
+
+        h.load_file("stdrun.hoc")
+        h.finitialize(v_init)
+        # restore() aborts the process if a recording saved here was freed since, and
+        # recordings cannot be listed from Python. finitialize leaves at most one sample
+        # in every recording, so longer Vectors (e.g. results of earlier runs) are not
+        # recordings and only the short ones are kept alive
+        self.vectors = [vec for vec in h.List("Vector") if vec.size() <= 1]
+        h.continuerun(t_checkpoint)
+        self.t_checkpoint = t_checkpoint
+
+        self.state = h.SaveState()
+        self.state.save()
+        self.structure = structure()
+
+        # The last sample of each head is recorded again when the run restarts
+        self.heads = [h.Vector(vec.as_numpy()[:-1]) for vec in self.records]
+
+        # Nothing moved from v_init: the state does not depend on geometry or cm
+        self.at_rest = all(seg.v == v_init for sec in h.allsec() for seg in sec)
+
+    @property
+    def time(self):
+        """Time of the saved pre-checkpoint samples [ms]"""
+        return self.heads[0].as_numpy()
+
+    def compatible(self):
+        """False if sections, mechanisms, point processes or NetCons changed since the save"""
+        return structure() == self.structure
+
+    def run(self, t_stop, rest_records=(), conditions=()):
+        """
+        Restore the saved state and simulate up to t_stop.
+
+        Parameters
+        ----------
+        t_stop : final time [ms]
+        rest_records : (vector, value) pairs for recordings created after the checkpoint,
+                       their pre-checkpoint part is filled with value. Only allowed
+                       when the model was at rest (at_rest) up to the checkpoint.
+        conditions : early_stop conditions that can end the run before t_stop, the
+                     outcome is kept in self.stop
+
+        Returns
+        -------
+        recorded time from t=0 [ms] as a Vector
+        """
+        if rest_records and not self.at_rest:
+            raise ValueError("Recordings made after the checkpoint need a model at rest before it")
+
+        # finitialize also sets up recordings created since the save, restore overwrites the rest
+        h.finitialize(self.v_init)
+        self.state.restore()
+        h.frecord_init()  # restart the recordings at the restored time
+        self.stop = run_until(t_stop, conditions)
+
+        for vec, head in zip(self.records, self.heads):
+            vec.insrt(0, head)
+        for vec, value in rest_records:
+            vec.insrt(0, h.Vector(len(self.heads[0]), value))
+
+        return self.records[0]
+
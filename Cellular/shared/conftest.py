@@ -0,0 +1,17 @@
+import pytest
+from neuron import h
+
+h.load_file("stdrun.hoc")
+
+
+@pytest.fixture
+def hh_soma():
+    """Hodgkin-Huxley soma with a 0.1 nA step from 20 to 70 ms and its voltage recording"""
+    soma = h.Section(name="soma")
+    soma.L = soma.diam = 20
+    soma.insert("hh")
+    stim = h.IClamp(soma(0.5))
+    stim.delay, stim.dur, stim.amp = 20, 50, 0.1
+    v = h.Vector().record(soma(0.5)._ref_v)
+    h.dt = 0.025
+    yield soma, stim, v
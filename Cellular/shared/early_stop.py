@@ -0,0 +1,107 @@
+# Stop conditions that end a simulation before tstop once the question is answered.
+from neuron import h
+
+
+class SpikeCount:
+    """Met once n spikes crossed threshold at seg, detected by a NetCon threshold event"""
+
+    def __init__(self, seg, n=1, threshold=-20.0):
+        self.n = n
+        self.count = 0
+        # Create conditions before saving a checkpoint, SaveState also stores NetCons
+        self.netcon = h.NetCon(seg._ref_v, None, sec=seg.sec)
+        self.netcon.threshold = threshold
+        self.netcon.record(self._spike)
+        self.name = f"{n} spike(s) at {seg}"
+
+    def _spike(self):
+        self.count += 1
+        if self.count >= self.n:
+            h.stoprun = 1  # ends continuerun after the current step
+
+    def start(self):
+        self.count = 0
+
+    def met(self):
+        return self.count >= self.n
+
+
+class SteadyState:
+    """
+    Met once |dV/dt| at seg stayed below tolerance [mV/ms] for duration [ms], checked
+    at every interval. Checks begin at t = after, e.g. the stimulus onset, since a cell
+    at rest before the stimulus is already at steady state.
+    """
+
+    def __init__(self, seg, tolerance=1e-3, duration=20.0, after=0.0):
+        self.seg = seg
+        self.tolerance = tolerance
+        self.duration = duration
+        self.after = after
+        self.name = f"steady state at {seg}"
+
+    def start(self):
+        self.last = None  # (t, v) of the previous check
+        self.quiet_since = None
+
+    def met(self):
+        if h.t < self.after:
+            return False
+        t, v = h.t, self.seg.v
+        if self.last is not None:
+            dvdt = abs(v - self.last[1]) / (t - self.last[0])
+            if dvdt >= self.tolerance:
+                self.quiet_since = None
+            elif self.quiet_since is None:
+                self.quiet_since = self.last[0]
+        self.last = (t, v)
+        return self.quiet_since is not None and t - self.quiet_since >= self.duration
+
+
+class Predicate:
+    """Met when func() returns True, checked at every interval"""
+
+    def __init__(self, func, name=None):
+        self.func = func
+        self.name = name or getattr(func, "__name__", "predicate")
+
+    def start(self):
+        pass
+
+    def met(self):
+        return bool(self.func())
+
+
+def run_until(t_stop, conditions=(), interval=1.0):
+    """
+    Continue the current simulation (after finitialize or a restored state) up to
+    t_stop, or until one of the conditions is met. Without conditions this is
+    h.continuerun(t_stop). The fixed-step integration is not changed by the checks,
+    so a run that is not stopped gives the same result as continuerun.
+
+    Parameters
+    ----------
+    t_stop : final time [ms]
+    conditions : SpikeCount, SteadyState, Predicate or any object with start() and met()
+    interval : time between checks of the periodic conditions [ms]
+
+    Returns
+    -------
+    dictionary with t_end [ms], truncated (bool) and reason (name of the met condition)
+    """
+    h.load_file("stdrun.hoc")
+    if not conditions:
+        h.continuerun(t_stop)
+        return {"t_end": h.t, "truncated": False, "reason": None}
+
+    for condition in conditions:
+        condition.start()
+
+    # continuerun itself stops half a step before its end time
+    while h.t < t_stop - h.dt / 2:
+        h.continuerun(min(h.t + interval, t_stop))
+        for condition in conditions:
+            if condition.met():
+                return {"t_end": h.t, "truncated": h.t < t_stop - h.dt / 2, "reason": condition.name}
+
+    return {"t_end": h.t, "truncated": False, "reason": None}
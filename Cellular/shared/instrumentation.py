@@ -0,0 +1,176 @@
+# Opt-in timing instrumentation: nested spans, call counts and counters.
+#
+#     import instrumentation
+#     with instrumentation.profile():
+#         ...  # code that calls instrumented functions
+#     instrumentation.summary()
+#     instrumentation.to_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_enabled = False
+_records = []  # finished spans
+_local = threading.local()
+
+
+def enable():
+    """Start recording spans"""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording spans, the recorded ones are kept"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Forget all recorded spans"""
+    del _records[:]
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def profile(clear=True):
+    """Record spans inside a with block"""
+    if clear:
+        reset()
+    enable()
+    try:
+        yield
+    finally:
+        disable()
+
+
+@contextmanager
+def span(name):
+    """Time a block of code as a span nested in the currently open one"""
+    if not _enabled:
+        yield None
+        return
+
+    stack = _stack()
+    record = {
+        "name": name,
+        "path": "/".join([parent["name"] for parent in stack] + [name]),
+        "start": time.perf_counter(),
+        "counters": {},
+        "thread": threading.get_ident(),
+    }
+    stack.append(record)
+    try:
+        yield record
+    finally:
+        record["duration"] = time.perf_counter() - record["start"]
+        stack.pop()
+        _records.append(record)
+
+
+def instrument(name=None):
+    """Decorator recording every call of a function as a span. Costs one flag check when disabled."""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add(counter, value=1):
+    """Add value to a counter (e.g. bytes_read, neuron_steps) of the innermost open span"""
+    if not _enabled:
+        return
+    stack = _stack()
+    if stack:
+        counters = stack[-1]["counters"]
+        counters[counter] = counters.get(counter, 0) + value
+
+
+def aggregate():
+    """
+    Totals per span path.
+
+    Returns
+    -------
+    dictionary {path: {"calls", "total_s", "self_s", "counters"}} in order of first appearance
+    """
+    totals = {}
+    for record in sorted(_records, key=lambda r: r["start"]):
+        entry = totals.setdefault(record["path"], {"calls": 0, "total_s": 0.0, "self_s": 0.0, "counters": {}})
+        entry["calls"] += 1
+        entry["total_s"] += record["duration"]
+        entry["self_s"] += record["duration"]
+        for counter, value in record["counters"].items():
+            entry["counters"][counter] = entry["counters"].get(counter, 0) + value
+
+    # Time spent in children is not self time of the parent
+    for path, entry in totals.items():
+        parent = path.rpartition("/")[0]
+        if parent in totals:
+            totals[parent]["self_s"] -= entry["total_s"]
+
+    return totals
+
+
+def summary(width=40):
+    """Print a flame-style tree of the recorded spans, with a bar proportional to the total time"""
+    totals = aggregate()
+    if not totals:
+        print("No spans recorded, wrap the code in instrumentation.profile()")
+        return
+
+    longest = max(entry["total_s"] for entry in totals.values())
+    for path in sorted(totals, key=lambda p: p.split("/")):
+        entry = totals[path]
+        depth = path.count("/")
+        bar = "#" * max(int(round(width * entry["total_s"] / longest)), 1)
+        counters = "  ".join(f"{k}={v:g}" for k, v in entry["counters"].items())
+        print(f"{'  ' * depth}{path.rpartition('/')[2]:<{40 - 2 * depth}s} "
+              f"{entry['total_s'] * 1000:10.2f} ms  self {entry['self_s'] * 1000:10.2f} ms  "
+              f"x{entry['calls']:<5d} {bar:<{width}s} {counters}")
+
+
+def to_json(filename):
+    """Save the aggregated spans as JSON"""
+    with open(filename, "w") as f:
+        json.dump(aggregate(), f, indent=2)
+
+
+def to_chrome_trace(filename):
+    """Save every span in the Chrome trace event format"""
+    origin = min((record["start"] for record in _records), default=0.0)
+    events = [
+        {
+            "name": record["name"],
+            "ph": "X",
+            "ts": (record["start"] - origin) * 1e6,
+            "dur": record["duration"] * 1e6,
+            "pid": os.getpid(),
+            "tid": record["thread"],
+            "args": record["counters"],
+        }
+        for record in _records
+    ]
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
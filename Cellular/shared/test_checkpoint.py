@@ -0,0 +1,98 @@
+import pytest
+from neuron import h
+
+from checkpoint import Checkpoint
+from early_stop import SpikeCount
+
+
+def full_run(v, t_stop=100):
+    h.finitialize(-65)
+    h.continuerun(t_stop)
+    return v.to_python()
+
+
+def test_run_is_bit_identical_to_full_run(hh_soma):
+    soma, stim, v = hh_soma
+    checkpoint = Checkpoint(stim.delay, -65, [v])
+
+    for amp in [0.0, 0.05, 0.1, 0.3]:
+        stim.amp = amp
+        time = checkpoint.run(100).to_python()
+        restarted = v.to_python()
+
+        reference = full_run(v)
+        assert restarted == reference
+        assert time == pytest.approx([i * h.dt for i in range(len(reference))], abs=1e-9)
+
+
+def test_run_with_conditions(hh_soma):
+    soma, stim, v = hh_soma
+    reference = full_run(v)
+    # The NetCon of the condition is part of the saved state
+    condition = SpikeCount(soma(0.5))
+    checkpoint = Checkpoint(stim.delay, -65, [v])
+
+    checkpoint.run(100, conditions=[condition])
+
+    assert checkpoint.stop["truncated"]
+    assert len(v) < len(reference)
+    assert v.to_python() == reference[:len(v)]
+
+
+def test_rest_records(hh_soma):
+    soma, stim, v = hh_soma
+    assert not Checkpoint(stim.delay, -65, [v]).at_rest
+
+    soma.uninsert("hh")
+    soma.insert("pas")
+    soma.e_pas = -65
+    checkpoint = Checkpoint(stim.delay, -65, [v])
+    assert checkpoint.at_rest
+
+    # A recording made after the save gets its pre-checkpoint part filled in
+    late = h.Vector().record(soma(0.5)._ref_v)
+    checkpoint.run(100, rest_records=[(late, -65)])
+    assert late.to_python() == v.to_python() == full_run(v)
+
+
+def test_compatible_after_dropped_recording(hh_soma):
+    soma, stim, v = hh_soma
+    checkpoint = Checkpoint(stim.delay, -65, [])
+    # A recording freed after the save made restore abort the process
+    del v
+    assert checkpoint.compatible()
+    checkpoint.run(100)
+
+
+def test_keeps_only_recordings_alive(hh_soma):
+    soma, stim, v = hh_soma
+    earlier = h.Vector(full_run(v))
+    checkpoint = Checkpoint(stim.delay, -65, [])
+
+    kept = [vec.hname() for vec in checkpoint.vectors]
+    assert v.hname() in kept
+    assert earlier.hname() not in kept
+
+
+def test_incompatible_after_structural_changes(hh_soma):
+    soma, stim, v = hh_soma
+    checkpoint = Checkpoint(stim.delay, -65, [v])
+    assert checkpoint.compatible()
+
+    dend = h.Section(name="dend")
+    assert not checkpoint.compatible()
+    del dend
+    assert checkpoint.compatible()
+
+    soma.insert("pas")
+    assert not checkpoint.compatible()
+    soma.uninsert("pas")
+
+    extra = h.IClamp(soma(0.5))
+    assert not checkpoint.compatible()
+    del extra
+
+    netcon = h.NetCon(soma(0.5)._ref_v, None, sec=soma)
+    assert not checkpoint.compatible()
+    del netcon
+    assert checkpoint.compatible()
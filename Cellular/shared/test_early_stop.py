@@ -0,0 +1,55 @@
+import numpy as np
+from neuron import h
+
+from early_stop import Predicate, SpikeCount, SteadyState, run_until
+
+
+def full_run(v, t_stop=100):
+    h.finitialize(-65)
+    h.continuerun(t_stop)
+    return v.to_python()
+
+
+def test_unstopped_run_matches_continuerun(hh_soma):
+    soma, stim, v = hh_soma
+    reference = full_run(v)
+
+    h.finitialize(-65)
+    outcome = run_until(100, [Predicate(lambda: False)], interval=0.7)
+
+    assert outcome == {"t_end": h.t, "truncated": False, "reason": None}
+    assert abs(h.t - 100) < h.dt / 2
+    assert v.to_python() == reference
+
+
+def test_spike_count_stops_after_n_spikes(hh_soma):
+    soma, stim, v = hh_soma
+    reference = full_run(v)
+
+    h.finitialize(-65)
+    condition = SpikeCount(soma(0.5), n=2)
+    outcome = run_until(100, [condition])
+
+    assert outcome["truncated"] and outcome["reason"] == condition.name
+    assert condition.count == 2
+    # The run ends within a couple of steps of the second threshold crossing, the
+    # samples so far are unchanged
+    crossings = np.flatnonzero(np.diff((np.array(reference) >= -20).astype(int)) == 1)
+    assert crossings[1] < len(v) <= crossings[1] + 3
+    assert v.to_python() == reference[:len(v)]
+
+
+def test_steady_state_after_the_step(hh_soma):
+    soma, stim, v = hh_soma
+    soma.gnabar_hh = 0  # no spikes, the step settles
+    stim.dur = 1000
+
+    h.finitialize(-65)
+    condition = SteadyState(soma(0.5), tolerance=1e-3, duration=10, after=stim.delay)
+    outcome = run_until(500, [condition])
+
+    assert outcome["truncated"] and outcome["reason"] == condition.name
+    assert stim.delay + condition.duration < outcome["t_end"] < 500
+    t_end = outcome["t_end"]
+    full_run(v, 500)
+    assert abs(v[int(round(t_end / h.dt))] - v[-1]) < 0.05
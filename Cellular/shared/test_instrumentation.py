@@ -0,0 +1,42 @@
+import json
+
+import instrumentation
+
+
+@instrumentation.instrument()
+def inner():
+    instrumentation.add("bytes_read", 10)
+
+
+@instrumentation.instrument("outer")
+def outer(n):
+    for _ in range(n):
+        inner()
+    return n
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    assert outer(2) == 2
+    assert instrumentation.aggregate() == {}
+
+
+def test_nested_spans_and_counters(tmp_path):
+    with instrumentation.profile():
+        outer(3)
+        outer(1)
+    assert not instrumentation.is_enabled()
+
+    totals = instrumentation.aggregate()
+    assert list(totals) == ["outer", "outer/inner"]
+    assert totals["outer"]["calls"] == 2
+    assert totals["outer/inner"]["calls"] == 4
+    assert totals["outer/inner"]["counters"] == {"bytes_read": 40}
+    assert totals["outer"]["counters"] == {}
+    # Self time of the parent leaves out its children
+    assert abs(totals["outer"]["self_s"] + totals["outer/inner"]["total_s"] - totals["outer"]["total_s"]) < 1e-9
+
+    instrumentation.to_chrome_trace(tmp_path / "trace.json")
+    with open(tmp_path / "trace.json") as f:
+        events = json.load(f)["traceEvents"]
+    assert sorted(event["name"] for event in events) == ["inner"] * 4 + ["outer"] * 2